@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  benchmarks/__init__.py
+#
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are
+#  met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following disclaimer
+#    in the documentation and/or other materials provided with the
+#    distribution.
+#  * Neither the name of the project nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+#  "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+#  LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+#  A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+#  OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+#  SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+#  LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+#  DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+#  THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+#  (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+#  OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+
+
+from __future__ import unicode_literals
+
+import collections
+import gc
+import math
+import os
+import statistics
+import sys
+import timeit
+
+lib_directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib')
+if os.path.isdir(os.path.join(lib_directory, 'c1218')):
+	sys.path.insert(0, lib_directory)
+
+SUITES = ('crc', 'protocol', 'decoding', 'modules')
+"""The modules which define the benchmarks, in the order they are run."""
+
+Benchmark = collections.namedtuple('Benchmark', ('name', 'setup', 'number', 'params'))
+_registry = collections.OrderedDict()
+
+def register(name, setup, number=1000, **params):
+	"""
+	Register a benchmark. The setup function is called with the
+	:py:class:`~benchmarks.fixtures.Fixtures` instance and the parameters
+	and must return the function to time. Work done in the setup function
+	is not included in the results.
+
+	:param str name: The name of the benchmark.
+	:param setup: The function which prepares the benchmark.
+	:param int number: The number of calls to make in each timing run.
+	:return: The registered benchmark.
+	:rtype: :py:class:`.Benchmark`
+	"""
+	if params:
+		name += '[' + ','.join("{0}={1}".format(key, value) for key, value in sorted(params.items())) + ']'
+	if name in _registry:
+		raise ValueError('a benchmark named ' + name + ' is already registered')
+	benchmark = Benchmark(name, setup, number, params)
+	_registry[name] = benchmark
+	return benchmark
+
+def benchmark(name, number=1000, **params):
+	"""
+	A decorator to register the decorated setup function as a benchmark,
+	see :py:func:`.register` for details.
+	"""
+	def decorator(setup):
+		register(name, setup, number=number, **params)
+		return setup
+	return decorator
+
+def load(suites=SUITES):
+	"""
+	Import the suites so their benchmarks are registered and return all of
+	the registered benchmarks.
+
+	:param tuple suites: The names of the suites to load.
+	:rtype: list
+	"""
+	for suite in suites:
+		__import__(__name__ + '.' + suite)
+	return list(_registry.values())
+
+def run(benchmark, fixtures, repeat=5, scale=1.0):
+	"""
+	Run a benchmark and return the timing results. The time of each call is
+	measured *repeat* times over the configured number of calls, after a
+	single call to warm up any caches.
+
+	:param benchmark: The benchmark to run.
+	:type benchmark: :py:class:`.Benchmark`
+	:param fixtures: The shared fixtures.
+	:type fixtures: :py:class:`~benchmarks.fixtures.Fixtures`
+	:param int repeat: The number of timing runs to make.
+	:param float scale: The factor to multiply the number of calls by.
+	:rtype: dict
+	"""
+	function = benchmark.setup(fixtures, **benchmark.params)
+	number = max(int(math.ceil(benchmark.number * scale)), 1)
+	function()
+	# timeit disables the garbage collector while timing, so start each
+	# benchmark without garbage left behind by the previous one
+	gc.collect()
+	timings = [timing / number for timing in timeit.repeat(function, number=number, repeat=repeat)]
+	return collections.OrderedDict((
+		('name', benchmark.name),
+		('params', benchmark.params),
+		('number', number),
+		('repeat', repeat),
+		('min', min(timings)),
+		('median', statistics.median(timings)),
+		('mean', statistics.mean(timings)),
+		('stdev', statistics.stdev(timings) if len(timings) > 1 else 0.0),
+		('timings', timings)
+	))
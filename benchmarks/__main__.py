@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  benchmarks/__main__.py
+#
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are
+#  met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following disclaimer
+#    in the documentation and/or other materials provided with the
+#    distribution.
+#  * Neither the name of the project nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+#  "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+#  LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+#  A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+#  OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+#  SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+#  LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+#  DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+#  THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+#  (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+#  OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+
+
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import argparse
+import collections
+import datetime
+import fnmatch
+import json
+import logging
+import platform
+import sys
+
+import benchmarks
+from benchmarks.fixtures import Fixtures
+
+import termineter
+
+def compare(baseline, results):
+	baseline = dict((result['name'], result) for result in baseline['benchmarks'])
+	print("{0:<64} {1:>12} {2:>12} {3:>8}".format('benchmark', 'before (us)', 'after (us)', 'change'), file=sys.stderr)
+	for result in results:
+		before = baseline.get(result['name'])
+		if before is None:
+			continue
+		change = (result['min'] - before['min']) / before['min']
+		print("{0:<64} {1:>12.2f} {2:>12.2f} {3:>+7.1%}".format(result['name'], before['min'] * 1e6, result['min'] * 1e6, change), file=sys.stderr)
+
+def main():
+	parser = argparse.ArgumentParser(prog='benchmarks', description='Termineter benchmark suite', conflict_handler='resolve')
+	parser.add_argument('-c', '--compare', dest='compare', type=argparse.FileType('r'), help='compare the results to a previous run')
+	parser.add_argument('-l', '--list', dest='list', action='store_true', default=False, help='list the benchmarks and exit')
+	parser.add_argument('-o', '--output', dest='output', type=argparse.FileType('w'), default=sys.stdout, help='the file to write the json results to')
+	parser.add_argument('-r', '--repeat', dest='repeat', type=int, default=5, help='the number of timing runs for each benchmark')
+	parser.add_argument('-s', '--scale', dest='scale', type=float, default=1.0, help='the factor to scale the number of iterations by')
+	parser.add_argument('patterns', metavar='pattern', nargs='*', default=['*'], help='the names of the benchmarks to run (glob patterns)')
+	arguments = parser.parse_args()
+	# keep the framework's logging out of the measurements
+	logging.getLogger('').setLevel(logging.CRITICAL)
+
+	selected = [benchmark for benchmark in benchmarks.load() if any(fnmatch.fnmatch(benchmark.name, pattern) or benchmark.name.startswith(pattern + '.') for pattern in arguments.patterns)]
+	if arguments.list:
+		for benchmark in selected:
+			print(benchmark.name)
+		return 0
+
+	results = []
+	with Fixtures() as fixtures:
+		for benchmark in selected:
+			result = benchmarks.run(benchmark, fixtures, repeat=arguments.repeat, scale=arguments.scale)
+			print("{0:<64} {1:>12.2f} us".format(benchmark.name, result['min'] * 1e6), file=sys.stderr)
+			results.append(result)
+
+	report = collections.OrderedDict((
+		('metadata', collections.OrderedDict((
+			('termineter', termineter.__version__),
+			('python', platform.python_version()),
+			('implementation', platform.python_implementation()),
+			('platform', platform.platform()),
+			('timestamp', datetime.datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ')),
+			('repeat', arguments.repeat),
+			('scale', arguments.scale)
+		))),
+		('benchmarks', results)
+	))
+	json.dump(report, arguments.output, indent=2)
+	arguments.output.write('\n')
+	if arguments.compare:
+		compare(json.load(arguments.compare), results)
+	return 0
+
+if __name__ == '__main__':
+	sys.exit(main())
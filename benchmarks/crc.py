@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  benchmarks/crc.py
+#
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are
+#  met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following disclaimer
+#    in the documentation and/or other materials provided with the
+#    distribution.
+#  * Neither the name of the project nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+#  "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+#  LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+#  A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+#  OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+#  SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+#  LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+#  DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+#  THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+#  (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+#  OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+
+
+from __future__ import unicode_literals
+
+from benchmarks import register
+from benchmarks.fixtures import random_bytes
+from c1218.utilities import CRC16HDLC, data_checksum, packet_checksum
+
+try:
+	import crcelk
+except ImportError:
+	crcelk = None
+
+SIZES = (8, 64, 512, 8191)
+
+def bench_crc16hdlc(fixtures, size):
+	data = random_bytes(size)
+	return lambda: CRC16HDLC(data).digest()
+
+def bench_crc16hdlc_incremental(fixtures, size):
+	chunks = [random_bytes(64, seed) for seed in range(max(size // 64, 1))]
+	def function():
+		crc = CRC16HDLC()
+		for chunk in chunks:
+			crc.update(chunk)
+		return crc.digest()
+	return function
+
+def bench_packet_checksum(fixtures, size):
+	data = random_bytes(size)
+	return lambda: packet_checksum(data)
+
+def bench_data_checksum(fixtures, size):
+	data = random_bytes(size)
+	return lambda: data_checksum(data)
+
+def bench_crcelk(fixtures, size):
+	data = random_bytes(size)
+	if crcelk.CRC_HDLC.calc_bytes(data) != CRC16HDLC(data).value:
+		raise RuntimeError("checksum mismatch on {0} bytes of data".format(size))
+	return lambda: crcelk.CRC_HDLC.calc_bytes(data)
+
+for size in SIZES:
+	register('crc.crc16hdlc', bench_crc16hdlc, number=max(200000 // size, 50), size=size)
+	register('crc.crc16hdlc_incremental', bench_crc16hdlc_incremental, number=max(200000 // size, 50), size=size)
+	register('crc.packet_checksum', bench_packet_checksum, number=max(200000 // size, 50), size=size)
+	register('crc.data_checksum', bench_data_checksum, number=max(20000 // size, 20), size=size)
+	# the previous implementation is measured for reference when it is installed
+	if crcelk is not None:
+		register('crc.crcelk', bench_crcelk, number=max(10000 // size, 5), size=size)
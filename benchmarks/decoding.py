@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  benchmarks/decoding.py
+#
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are
+#  met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following disclaimer
+#    in the documentation and/or other materials provided with the
+#    distribution.
+#  * Neither the name of the project nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+#  "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+#  LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+#  A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+#  OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+#  SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+#  LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+#  DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+#  THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+#  (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+#  OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+
+
+from __future__ import unicode_literals
+
+from benchmarks import register
+from benchmarks.fixtures import TableConnection
+from c1219.access.general import C1219GeneralAccess
+from c1219.access.log import C1219LogAccess
+from c1219.access.security import C1219SecurityAccess
+
+def bench_general(fixtures):
+	conn = TableConnection(fixtures.tables(history_entries=0))
+	return lambda: C1219GeneralAccess(conn)
+
+def bench_log(fixtures, entries):
+	conn = TableConnection(fixtures.tables(history_entries=entries))
+	return lambda: C1219LogAccess(conn).logs
+
+def bench_security(fixtures, passwords, permissions):
+	conn = TableConnection(fixtures.tables(history_entries=0, passwords=passwords, permissions=permissions))
+	return lambda: C1219SecurityAccess(conn)
+
+register('decoding.general', bench_general, number=5000)
+for entries in (64, 1024, 8192):
+	register('decoding.log', bench_log, number=max(100000 // entries, 5), entries=entries)
+for passwords, permissions in ((16, 256), (255, 4096)):
+	register('decoding.security', bench_security, number=max(200000 // permissions, 20), passwords=passwords, permissions=permissions)
@@ -0,0 +1,254 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  benchmarks/fixtures.py
+#
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are
+#  met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following disclaimer
+#    in the documentation and/or other materials provided with the
+#    distribution.
+#  * Neither the name of the project nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+#  "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+#  LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+#  A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+#  OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+#  SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+#  LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+#  DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+#  THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+#  (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+#  OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+
+
+from __future__ import unicode_literals
+
+import binascii
+import io
+import os
+import random
+import shutil
+import struct
+import tempfile
+
+from c1218.connection import Connection
+from c1218.data import C1218_RESPONSE_CODES
+from c1218.errors import C1218ReadTableError
+from c1218.simulator import MeterSimulator
+from c1218.urlhandler import protocol_simulator
+from c1219.constants import *
+from c1219.data import C1219_TABLES
+
+# the seed for all of the random data, so every run uses the same fixtures
+SEED = 0x1218
+
+HISTORY_DATA_LENGTH = 4
+"""The size of the arguments of each synthetic history log entry."""
+
+def random_bytes(size, seed=SEED):
+	"""
+	Return *size* bytes of random data which are the same for each seed.
+
+	:param int size: The number of bytes to return.
+	:param seed: The seed, or a :py:class:`random.Random` instance to use.
+	:rtype: bytes
+	"""
+	rand = seed if isinstance(seed, random.Random) else random.Random(seed)
+	return bytes(bytearray(rand.getrandbits(8) for _ in range(size)))
+
+def synthetic_tables(history_entries=512, passwords=16, permissions=256, keys=8, filler_tables=64, filler_size=256, seed=SEED):
+	"""
+	Build a consistent set of C12.19 tables for a little endian device. The
+	general configuration, manufacturer identification, mode status and
+	device identification tables are included along with the security and
+	log tables sized by the arguments. Filler tables of random data are
+	added from table 100 onwards.
+
+	:param int history_entries: The number of history log entries.
+	:param int passwords: The number of passwords in the security table.
+	:param int permissions: The number of entries in the access control table.
+	:param int keys: The number of keys in the key table.
+	:param int filler_tables: The number of tables of random data.
+	:param int filler_size: The size of each table of random data.
+	:param int seed: The seed for the random data.
+	:return: The table data keyed by table id.
+	:rtype: dict
+	"""
+	rand = random.Random(seed)
+	tables = {}
+	# utf-8 characters, little endian, ltime format 2, an electric meter
+	# implementing version 1.0 of the standard with 16 tables and 8
+	# procedures in use
+	tables[GEN_CONFIG_TBL] = struct.pack('<BBBBBBBBBBBBBBBBBBB', 0x06, 0x02, 0, 0, 0, 0, 0, 2, 0, 0, 0, 1, 0, 2, 0, 1, 0, 0, 0) + b'\xff\x7f\x0f'
+	tables[GENERAL_MFG_ID_TBL] = b'SIML' + b'BENCH   ' + b'\x01\x00\x02\x03' + b'0000000000001218'
+	tables[ED_MODE_STATUS_TBL] = b'\x01\x00\x00\x00\x00'
+	tables[DEVICE_IDENT_TBL] = b'BENCHMARK METER     '
+
+	tables[ACT_SECURITY_LIMITING_TBL] = struct.pack('<BBBBH', passwords, 20, keys, 16, permissions)
+	tables[SECURITY_TBL] = b''.join(random_bytes(20, rand) + struct.pack('B', idx & 0xff) for idx in range(passwords))
+	tables[ACCESS_CONTROL_TBL] = b''.join(struct.pack('<HBB', (idx & 0x7ff) | ((idx & 1) << 12) | 0x2000, 0x01, 0x02) for idx in range(permissions))
+	tables[KEY_TBL] = random_bytes(16 * keys, rand)
+
+	# event numbers, time stamps and sequence numbers are recorded
+	tables[ACT_LOG_TBL] = struct.pack('<BBBBBHH', 0x07, 8, 0, HISTORY_DATA_LENGTH, 0, history_entries, 0)
+	entries = []
+	for idx in range(history_entries):
+		ltime = struct.pack('BBBBBB', 24, (idx % 12) + 1, (idx % 28) + 1, idx % 24, idx % 60, idx % 60)
+		entries.append(ltime + struct.pack('<HHHH', idx, idx, idx % 8, idx % 40) + random_bytes(HISTORY_DATA_LENGTH, rand))
+	tables[HISTORY_LOG_DATA_TBL] = struct.pack('<BHHIH', 0x01, history_entries, max(history_entries - 1, 0), history_entries, 0) + b''.join(entries)
+
+	for tableid in range(100, 100 + filler_tables):
+		tables[tableid] = random_bytes(filler_size, rand)
+	return tables
+
+def mutate_tables(tables, fraction=0.1, seed=SEED):
+	"""
+	Return a copy of the tables with a fraction of them changed, as a
+	second snapshot of the same device would be.
+
+	:param dict tables: The tables to copy.
+	:param float fraction: The fraction of the tables to change.
+	:rtype: dict
+	"""
+	rand = random.Random(seed)
+	tables = dict(tables)
+	for tableid in rand.sample(sorted(tables), int(len(tables) * fraction)):
+		data = bytearray(tables[tableid])
+		for _ in range(max(len(data) // 16, 1)):
+			data[rand.randrange(len(data))] = rand.getrandbits(8)
+		tables[tableid] = bytes(data)
+	return tables
+
+def write_csv(tables, path):
+	"""
+	Write tables to a CSV file in the format used by the dump_tables module.
+
+	:param dict tables: The tables to write.
+	:param str path: The path of the file to write.
+	"""
+	with io.open(path, 'w') as file_h:
+		for tableid in sorted(tables):
+			data = tables[tableid]
+			file_h.write(','.join([str(tableid), C1219_TABLES.get(tableid, 'UNKNOWN'), str(len(data)), binascii.b2a_hex(data).decode('utf-8')]) + os.linesep)
+
+class TableConnection(object):
+	"""
+	An in-memory stand in for a :py:class:`~c1218.connection.Connection`
+	which serves tables to the C12.19 access classes without the link layer.
+
+	:param dict tables: The table data keyed by table id.
+	"""
+	def __init__(self, tables, c1219_endian='<'):
+		self.tables = tables
+		self.c1219_endian = c1219_endian
+
+	def get_table_data(self, tableid, octetcount=None, offset=None):
+		if tableid not in self.tables:
+			raise C1218ReadTableError('could not read table id: ' + str(tableid), C1218_RESPONSE_CODES['iar'])
+		data = self.tables[tableid]
+		if offset is not None or octetcount is not None:
+			offset = offset or 0
+			data = data[offset:offset + (octetcount or len(data))]
+		return data
+
+	def get_tables(self, tableids, optional=()):
+		tables = {}
+		errors = {}
+		for tableid in tuple(tableids) + tuple(optional):
+			try:
+				tables[tableid] = self.get_table_data(tableid)
+			except C1218ReadTableError as error:
+				if tableid not in optional:
+					raise
+				errors[tableid] = error
+		return tables, errors
+
+class Fixtures(object):
+	"""
+	The fixtures shared by the benchmarks. Everything is created the first
+	time that it is used and released by :py:meth:`.close`.
+	"""
+	def __init__(self):
+		self.directory = tempfile.mkdtemp(prefix='termineter-benchmarks-')
+		self._tables = {}
+		self._simulators = []
+		self._framework = None
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		self.close()
+
+	def tables(self, **kwargs):
+		"""
+		Return synthetic tables, see :py:func:`.synthetic_tables` for the
+		arguments.
+
+		:rtype: dict
+		"""
+		key = tuple(sorted(kwargs.items()))
+		if key not in self._tables:
+			self._tables[key] = synthetic_tables(**kwargs)
+		return self._tables[key]
+
+	def path(self, name):
+		return os.path.join(self.directory, name)
+
+	def loopback_url(self, tables, latency=0.0):
+		"""
+		Start a simulated meter serving *tables* in this process and return
+		the URL to connect to it with.
+
+		:param dict tables: The tables for the meter to serve.
+		:param float latency: The response latency of the meter.
+		:rtype: str
+		"""
+		simulator = MeterSimulator(tables, latency=latency)
+		name = "benchmark-{0}".format(len(self._simulators))
+		protocol_simulator.register(name, simulator)
+		self._simulators.append((name, simulator))
+		return 'simulator://' + name
+
+	def loopback_connection(self, tables, latency=0.0, pktsize=512, nbrpkts=2):
+		"""
+		Return a logged in connection to a simulated meter serving *tables*.
+		Table caching is disabled so every read reaches the meter.
+
+		:rtype: :py:class:`~c1218.connection.Connection`
+		"""
+		conn = Connection(self.loopback_url(tables, latency), c1218_settings={'pktsize': pktsize, 'nbrpkts': nbrpkts}, enable_cache=False)
+		conn.start()
+		conn.login()
+		return conn
+
+	@property
+	def framework(self):
+		"""
+		A framework instance which writes its output to memory.
+
+		:rtype: :py:class:`~termineter.core.Framework`
+		"""
+		if self._framework is None:
+			import termineter.core
+			self._framework = termineter.core.Framework(stdout=io.StringIO())
+		return self._framework
+
+	def close(self):
+		for name, simulator in self._simulators:
+			protocol_simulator.unregister(name)
+			simulator.close()
+		self._simulators = []
+		if self._framework is not None and self._framework.serial_connection is not None:
+			self._framework.serial_disconnect()
+		shutil.rmtree(self.directory, ignore_errors=True)
@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  benchmarks/modules.py
+#
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are
+#  met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following disclaimer
+#    in the documentation and/or other materials provided with the
+#    distribution.
+#  * Neither the name of the project nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+#  "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+#  LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+#  A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+#  OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+#  SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+#  LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+#  DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+#  THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+#  (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+#  OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+
+
+from __future__ import unicode_literals
+
+from benchmarks import register
+from benchmarks.fixtures import mutate_tables, write_csv
+
+def bench_dump_tables(fixtures, tables):
+	frmwk = fixtures.framework
+	frmwk.advanced_options.set_option_value('CACHE_TABLES', 'false')
+	frmwk.options.set_option_value('SERIAL_CONNECTION', fixtures.loopback_url(fixtures.tables(filler_tables=tables)))
+	frmwk.test_serial_connection()
+	module = frmwk.modules['dump_tables']
+	module.options.set_option_value('FILE', fixtures.path("dump-{0}.csv".format(tables)))
+	module.options.set_option_value('LOWER', '0')
+	module.options.set_option_value('UPPER', str(100 + tables))
+	return lambda: frmwk.run(module)
+
+def bench_diff_tables(fixtures, tables, size):
+	first = fixtures.tables(history_entries=0, filler_tables=tables, filler_size=size)
+	first_file = fixtures.path("diff-{0}-{1}-first.csv".format(tables, size))
+	second_file = fixtures.path("diff-{0}-{1}-second.csv".format(tables, size))
+	write_csv(first, first_file)
+	write_csv(mutate_tables(first), second_file)
+	module = fixtures.framework.modules['diff_tables']
+	module.options.set_option_value('FIRST_FILE', first_file)
+	module.options.set_option_value('SECOND_FILE', second_file)
+	module.options.set_option_value('REPORT_FILE', fixtures.path("diff-{0}-{1}.html".format(tables, size)))
+	return lambda: fixtures.framework.run(module)
+
+register('modules.dump_tables', bench_dump_tables, number=3, tables=64)
+register('modules.diff_tables', bench_diff_tables, number=3, tables=256, size=1024)
+register('modules.diff_tables', bench_diff_tables, number=3, tables=1024, size=256)
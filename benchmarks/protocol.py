@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  benchmarks/protocol.py
+#
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are
+#  met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following disclaimer
+#    in the documentation and/or other materials provided with the
+#    distribution.
+#  * Neither the name of the project nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+#  "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+#  LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+#  A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+#  OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+#  SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+#  LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+#  DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+#  THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+#  (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+#  OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+
+
+from __future__ import unicode_literals
+
+import struct
+
+from benchmarks import register
+from benchmarks.fixtures import random_bytes
+from c1218.data import *
+from c1218.decoder import FrameDecoder
+from c1222.data import C1222EPSEM, C1222Packet, C1222UserInformation, C1222WriteRequest, build_packet, encode_ap_titles
+from c1222.utilities import data_checksum
+
+_write_data = random_bytes(496)
+
+REQUESTS = (
+	('ident', lambda: C1218IdentRequest()),
+	('negotiate', lambda: C1218NegotiateRequest(512, 8, baudrate=9600)),
+	('logon', lambda: C1218LogonRequest('0000', 2)),
+	('security', lambda: C1218SecurityRequest(b'\x00' * 20)),
+	('read', lambda: C1218ReadRequest(1)),
+	('read_partial', lambda: C1218ReadRequest(74, offset=1024, octetcount=496)),
+	('write', lambda: C1218WriteRequest(5, b'\x20' * 20)),
+	('write_partial', lambda: C1218WriteRequest(100, _write_data, offset=1024)),
+)
+
+def bench_request_build(fixtures, request):
+	factory = dict(REQUESTS)[request]
+	return lambda: factory().build()
+
+def bench_request_from_bytes(fixtures, request):
+	data = dict(REQUESTS)[request]().build()
+	request_class = C1218_REQUEST_IDS[data[0]]
+	return lambda: request_class.from_bytes(data)
+
+def bench_packet_build(fixtures, size):
+	data = random_bytes(size)
+	return lambda: C1218Packet(data).build()
+
+def bench_packet_from_bytes(fixtures, size):
+	frame = C1218Packet(random_bytes(size)).build()
+	return lambda: C1218Packet.from_bytes(frame)
+
+def bench_packet_segment(fixtures, size):
+	data = random_bytes(size)
+	return lambda: [packet.build() for packet in C1218Packet.segment(data, 512 - PACKET_OVERHEAD)]
+
+def bench_decoder_feed(fixtures, size, chunk):
+	# a stream of acknowledged frames, as seen by a sniffer of a table read
+	frame = C1218Packet(random_bytes(size)).build()
+	stream = (ACK + frame) * 16
+	chunks = [stream[offset:offset + chunk] for offset in range(0, len(stream), chunk)]
+	def function():
+		decoder = FrameDecoder()
+		for data in chunks:
+			decoder.feed(data)
+	return function
+
+def bench_c1222_packet_build(fixtures, size):
+	# the ap titles are encoded once per association by the connection
+	ap_titles = encode_ap_titles('2.16.124.113620.1.22.0', '2.16.124.113620.1.22.1')
+	request = C1222WriteRequest(100, random_bytes(size)).build()
+	return lambda: build_packet(ap_titles, 123456, C1222UserInformation(C1222EPSEM(request)))
+
+def bench_c1222_packet_from_bytes(fixtures, size):
+	# a read response, as received by the connection
+	data = random_bytes(size)
+	response = b'\x00' + struct.pack('>H', size) + data + data_checksum(data)
+	packet = build_packet(encode_ap_titles('2.16.124.113620.1.22.1', '2.16.124.113620.1.22.0'), 123456, C1222UserInformation(C1222EPSEM(response)))
+	return lambda: C1222EPSEM.from_bytes(C1222Packet.from_bytes(packet).data.data)
+
+def bench_loopback_read(fixtures, size, pktsize):
+	conn = fixtures.loopback_connection({100: random_bytes(size)}, pktsize=pktsize, nbrpkts=8)
+	return lambda: conn.get_table_data(100)
+
+def bench_loopback_read_chunked(fixtures, size):
+	conn = fixtures.loopback_connection({100: random_bytes(size)}, pktsize=512, nbrpkts=2)
+	return lambda: b''.join(conn.iter_table_data(100))
+
+def bench_loopback_write(fixtures, size):
+	data = random_bytes(size)
+	conn = fixtures.loopback_connection({100: data}, pktsize=512, nbrpkts=8)
+	return lambda: conn.set_table_data(100, data)
+
+def bench_loopback_session(fixtures):
+	conn = fixtures.loopback_connection({})
+	def function():
+		conn.stop()
+		conn.start()
+		conn.login()
+	return function
+
+for request, _ in REQUESTS:
+	register('protocol.request_build', bench_request_build, number=20000, request=request)
+	register('protocol.request_from_bytes', bench_request_from_bytes, number=20000, request=request)
+for size in (16, 496, 8183):
+	register('protocol.packet_build', bench_packet_build, number=max(1000000 // size, 200), size=size)
+	register('protocol.packet_from_bytes', bench_packet_from_bytes, number=max(1000000 // size, 200), size=size)
+register('protocol.packet_segment', bench_packet_segment, number=500, size=8192)
+for size in (16, 496):
+	register('protocol.c1222_packet_build', bench_c1222_packet_build, number=20000, size=size)
+	register('protocol.c1222_packet_from_bytes', bench_c1222_packet_from_bytes, number=20000, size=size)
+for size, chunk in ((16, 1), (496, 64), (496, 4096), (8183, 4096)):
+	register('protocol.decoder_feed', bench_decoder_feed, number=max(200000 // (size * 16), 20), size=size, chunk=chunk)
+# tables which fit in the packets negotiated for each packet size
+for size, pktsize in ((64, 64), (400, 64), (64, 512), (1024, 512), (3072, 512)):
+	register('protocol.loopback_read', bench_loopback_read, number=max(20000 // size, 10), size=size, pktsize=pktsize)
+register('protocol.loopback_read_chunked', bench_loopback_read_chunked, number=20, size=16384)
+register('protocol.loopback_write', bench_loopback_write, number=200, size=1024)
+register('protocol.loopback_session', bench_loopback_session, number=200)
@@ -0,0 +1,665 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  c1218/async_connection.py
+#
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are
+#  met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following disclaimer
+#    in the documentation and/or other materials provided with the
+#    distribution.
+#  * Neither the name of the project nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+#  "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+#  LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+#  A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+#  OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+#  SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+#  LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+#  DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+#  THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+#  (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+#  OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+
+from __future__ import unicode_literals
+
+
+import asyncio
+import binascii
+import collections
+import logging
+import os
+import random
+import struct
+import urllib.parse
+
+from c1218.cache import DEFAULT_CACHE_SIZE
+from c1218.connection import TableCacheMixin
+from c1218.data import *
+from c1218.decoder import Frame, FrameDecoder
+from c1218.errors import C1218NegotiateError, C1218IOError, C1218ReadTableError, C1218WriteTableError
+from c1218.utilities import RoundTripEstimator, check_data_checksum
+from c1219.data import C1219ProcedureInit
+from c1219.errors import C1219ProcedureError
+
+import serial
+
+class _AsyncioStream(object):
+	def __init__(self, reader, writer, on_close=None):
+		self.reader = reader
+		self.writer = writer
+		self._on_close = on_close
+
+	@property
+	def serial(self):
+		# set when the transport is provided by pyserial-asyncio
+		return getattr(self.writer.transport, 'serial', None)
+
+	async def read(self, size):
+		return await self.reader.read(size)
+
+	async def write(self, data):
+		self.writer.write(data)
+		await self.writer.drain()
+
+	async def flush(self):
+		# drain only waits for the buffer to fall below the high water mark
+		transport = self.writer.transport
+		while transport.get_write_buffer_size():
+			await asyncio.sleep(0.001)
+		if self.serial is not None:
+			await asyncio.get_event_loop().run_in_executor(None, self.serial.flush)
+
+	def close(self):
+		self.writer.close()
+		if self._on_close is not None:
+			self._on_close()
+
+class _ExecutorStream(object):
+	"""
+	Adapt a blocking pySerial instance for use with asyncio by performing the
+	reads and writes in the event loop's default executor. This is used for
+	the pySerial URL handlers such as rfc2217:// which do not expose a file
+	descriptor that the event loop can watch.
+	"""
+	def __init__(self, serial_h, loop):
+		self.serial = serial_h
+		self.serial.timeout = 0.1
+		self.loop = loop
+		self._pending = None
+
+	def _read(self, size):
+		while self.serial.is_open:
+			data = self.serial.read(1)
+			if not data:
+				continue
+			waiting = self.serial.in_waiting
+			if waiting:
+				data += self.serial.read(min(waiting, size - 1))
+			return data
+		return b''
+
+	async def read(self, size):
+		# the executor can't be interrupted, so a read which was cancelled by
+		# a timeout is picked up again by the next call instead of losing data
+		if self._pending is None:
+			self._pending = self.loop.run_in_executor(None, self._read, size)
+		data = await asyncio.shield(self._pending)
+		self._pending = None
+		return data
+
+	async def write(self, data):
+		await self.loop.run_in_executor(None, self.serial.write, data)
+
+	async def flush(self):
+		await self.loop.run_in_executor(None, self.serial.flush)
+
+	def close(self):
+		self.serial.close()
+
+class AsyncConnection(TableCacheMixin):
+	def __init__(self, device, c1218_settings={}, serial_settings=None, toggle_control=True, enable_cache=True, cache_size=DEFAULT_CACHE_SIZE, cache_directory=None):
+		"""
+		This is a C12.18 driver which uses asyncio, allowing a single event
+		loop to communicate with many devices at once. It requires Python 3.5
+		or later. The methods which communicate with the device are
+		coroutines but otherwise mirror those of
+		:py:class:`~c1218.connection.Connection`. The connection must be
+		opened with :py:meth:`.open` before it is used.
+
+		Devices are connected to depending on the connection string:
+
+		* ``socket://host:port`` and ``unix:///path`` are connected to using
+		  asyncio's native streams.
+		* Serial devices are connected to using pyserial-asyncio, which must
+		  be installed, for example with the ``async`` extra of the package.
+		* Any other pySerial URL (such as ``rfc2217://``) is opened with
+		  pySerial and read from in the event loop's executor.
+
+		:param str device: A connection string for the device.
+		:param dict c1218_settings: A settings dictionary to configure the C1218
+		  parameters of 'nbrpkts', 'pktsize' and 'baudrate'  If not provided the
+		  default settings of 2 (nbrpkts), 512 (pktsize) and 9600 (baudrate)
+		  will be used.
+		:param dict serial_settings: A PySerial settings dictionary to be applied to
+		  the serial connection instance.
+		:param bool toggle_control: Enables or disables automatically settings
+		  the toggle bit in C12.18 frames.
+		:param bool enable_cache: Cache tables in memory according to their
+		  policies (see :py:class:`~c1218.cache.TableCache`).
+		:param int cache_size: The maximum number of bytes of table data to cache.
+		:param str cache_directory: A directory in which to persist the static
+		  tables of each device between connections.
+		"""
+		self.logger = logging.getLogger('c1218.async_connection')
+		self.loggerio = logging.getLogger('c1218.async_connection.io')
+		self.device = device
+		self.serial_settings = serial_settings
+		self.toggle_control = toggle_control
+		self._toggle_bit = False
+		self._stream = None
+		self._lock = asyncio.Lock()
+		self._decoder = FrameDecoder()
+		self._rx_items = collections.deque()
+
+		self.c1218_pktsize = (c1218_settings.get('pktsize') or 512)
+		self.c1218_nbrpkts = (c1218_settings.get('nbrpkts') or 2)
+		self.c1218_baudrate = (c1218_settings.get('baudrate') or DEFAULT_BAUDRATE)
+		self.c1218_session_pktsize = DEFAULT_PACKET_SIZE
+		self.c1218_session_nbrpkts = DEFAULT_NUMBER_PACKETS
+		self._base_baudrate = None
+		self._ack_timer = RoundTripEstimator(initial=ACK_TIMEOUT, maximum=ACK_TIMEOUT)
+		self._response_timer = RoundTripEstimator(initial=RESPONSE_TIMEOUT, maximum=RESPONSE_TIMEOUT)
+
+		self._init_table_cache(enable_cache, cache_size, cache_directory)
+		self.logged_in = False
+		self._initialized = False
+		self.c1219_endian = '<'
+
+	def __repr__(self):
+		return '<' + self.__class__.__name__ + ' Device: ' + self.device + ' >'
+
+	async def __aenter__(self):
+		await self.open()
+		return self
+
+	async def __aexit__(self, exc_type, exc_value, traceback):
+		await self.close(force_stop=exc_type is not None)
+
+	@property
+	def byte_time(self):
+		"""
+		The time in seconds that it takes to transmit one byte, this is 0 for
+		connections which are not serial ports.
+		"""
+		serial_h = self._stream.serial if self._stream else None
+		if serial_h is None or not getattr(serial_h, 'baudrate', None):
+			return 0.0
+		bits = 1 + (serial_h.bytesize or 8) + (serial_h.stopbits or 1)
+		if serial_h.parity not in (None, serial.PARITY_NONE):
+			bits += 1
+		return bits / float(serial_h.baudrate)
+
+	async def open(self):
+		"""
+		Open the connection to the device.
+		"""
+		loop = asyncio.get_event_loop()
+		url = urllib.parse.urlsplit(self.device)
+		if url.scheme == 'socket':
+			reader, writer = await asyncio.open_connection(url.hostname, url.port)
+			self._stream = _AsyncioStream(reader, writer)
+		elif url.scheme == 'unix':
+			self._stream = await self._open_unix(url)
+		elif url.scheme == '' or len(url.scheme) == 1:
+			# a local serial port (single letter schemes are windows drives)
+			try:
+				import serial_asyncio
+			except ImportError:
+				raise C1218IOError('the pyserial-asyncio package is required to use serial ports')
+			reader, writer = await serial_asyncio.open_serial_connection(url=self.device)
+			self._stream = _AsyncioStream(reader, writer)
+		else:
+			serial_h = await loop.run_in_executor(None, serial.serial_for_url, self.device)
+			self._stream = _ExecutorStream(serial_h, loop)
+		self.logger.debug('successfully opened device: ' + self.device)
+
+		serial_h = self._stream.serial
+		if serial_h is not None:
+			if self.serial_settings:
+				self.logger.debug('applying pySerial settings dictionary')
+				serial_settings = dict(self.serial_settings)
+				for old_name, new_name in (('interCharTimeout', 'inter_byte_timeout'), ('writeTimeout', 'write_timeout')):
+					if old_name in serial_settings:
+						serial_settings[new_name] = serial_settings.pop(old_name)
+				serial_h.apply_settings(serial_settings)
+			self._base_baudrate = serial_h.baudrate
+			try:
+				serial_h.rts = True
+				serial_h.dtr = False
+			except (IOError, ValueError):
+				self.logger.warning('could not set the RTS and DTR lines')
+		return self
+
+	async def _open_unix(self, url):
+		options = urllib.parse.parse_qs(url.query)
+		if options.get('mode', ['client'])[0] != 'server':
+			reader, writer = await asyncio.open_unix_connection(url.path)
+			return _AsyncioStream(reader, writer)
+		if os.path.exists(url.path):
+			os.unlink(url.path)
+		connected = asyncio.get_event_loop().create_future()
+		def on_connect(reader, writer):
+			if connected.done():
+				writer.close()
+			else:
+				connected.set_result((reader, writer))
+		server = await asyncio.start_unix_server(on_connect, path=url.path)
+		try:
+			reader, writer = await connected
+		finally:
+			server.close()
+		return _AsyncioStream(reader, writer, on_close=lambda: os.path.exists(url.path) and os.unlink(url.path))
+
+	async def send(self, data):
+		"""
+		This sends a C12.18 request and waits for an ACK response to each
+		frame. Data which is larger than the negotiated packet size is
+		segmented into a multi-packet transmission.
+
+		:param data: the data to be transmitted
+		:type data: str, :py:class:`~c1218.data.C1218Request`, :py:class:`~c1218.data.C1218Packet`
+		"""
+		if isinstance(data, C1218Packet):
+			packets = [data]
+		else:
+			packets = C1218Packet.segment(data, self.c1218_session_pktsize - PACKET_OVERHEAD)
+			if len(packets) > self.c1218_session_nbrpkts:
+				self.loggerio.error("data requires {0} packets but only {1} were negotiated".format(len(packets), self.c1218_session_nbrpkts))
+				raise C1218IOError("data requires {0} packets but only {1} were negotiated".format(len(packets), self.c1218_session_nbrpkts))
+		for packet in packets:
+			if self.toggle_control:
+				control = ord(packet.control) & ~CONTROL_TOGGLE
+				if self._toggle_bit:
+					control |= CONTROL_TOGGLE
+				packet.set_control(control)
+				self._toggle_bit = not self._toggle_bit
+			await self._send_frame(packet.build())
+
+	async def _send_frame(self, data):
+		if self.loggerio.isEnabledFor(logging.DEBUG):
+			self.loggerio.debug("sending frame,  length: {0:<3} data: {1}".format(len(data), binascii.b2a_hex(data).decode('utf-8')))
+		loop = asyncio.get_event_loop()
+		self._rx_discard()
+		transmit_time = len(data) * self.byte_time
+		for attempt in range(0, 3):
+			started = loop.time()
+			await self._stream.write(data)
+			response = await self._recv_item(transmit_time + self._ack_timer.timeout)
+			if response is None:
+				self.loggerio.error('received empty response after writing data')
+				self._ack_timer.backoff()
+			elif response == NACK:
+				self.loggerio.warning('received a NACK after writing data')
+			elif response != ACK:
+				self.loggerio.error('received a frame instead of an ACK after writing data')
+			else:
+				if attempt == 0:
+					self._ack_timer.update(max(loop.time() - started - transmit_time, 0))
+				return
+		self.loggerio.critical('failed 3 times to correctly send a frame')
+		raise C1218IOError('failed 3 times to correctly send a frame')
+
+	async def recv(self, full_frame=False):
+		"""
+		Receive a C12.18 response, the payload data is returned. Multi-packet
+		transmissions are reassembled and retransmitted packets are discarded.
+
+		:param bool full_frame: If set to True, the raw C12.18 frames are
+		  returned instead of just the payload.
+		"""
+		payloadbuffer = bytearray()
+		framebuffer = bytearray()
+		expected_sequence = None
+		while True:
+			control, sequence, payload, frame = await self._recv_frame()
+			if not control & CONTROL_MULTI_PACKET:
+				payloadbuffer = bytearray(payload)
+				framebuffer = bytearray(frame)
+				break
+			if control & CONTROL_FIRST_PACKET:
+				if expected_sequence is not None:
+					self.loggerio.warning('received a new first packet, restarting the multi-packet reassembly')
+				payloadbuffer = bytearray()
+				framebuffer = bytearray()
+			elif expected_sequence is None:
+				self.loggerio.critical('received a multi-packet continuation without a first packet')
+				raise C1218IOError('received a multi-packet continuation without a first packet')
+			elif sequence == expected_sequence + 1:
+				self.loggerio.warning("discarding retransmitted packet with sequence number {0}".format(sequence))
+				continue
+			elif sequence != expected_sequence:
+				self.loggerio.critical("received packet with sequence number {0}, expected {1}".format(sequence, expected_sequence))
+				raise C1218IOError("received packet with sequence number {0}, expected {1}".format(sequence, expected_sequence))
+			payloadbuffer += payload
+			framebuffer += frame
+			if sequence == 0:
+				break
+			expected_sequence = sequence - 1
+		if full_frame:
+			payloadbuffer = framebuffer
+		return bytes(payloadbuffer)
+
+	async def _recv_frame(self):
+		loop = asyncio.get_event_loop()
+		waiting = loop.time()
+		tries = 3
+		while tries:
+			needed = self._decoder.needed
+			if needed:
+				timeout = needed * self.byte_time + min(self._ack_timer.timeout, INTER_CHARACTER_TIMEOUT)
+			else:
+				timeout = self._response_timer.timeout + FRAME_HEADER_SIZE * self.byte_time
+			item = await self._recv_item(timeout)
+			if item is None:
+				if needed:
+					# the start byte may have been noise, try to decode the data after it
+					self._rx_items.extend(self._decoder.timeout())
+					if self._rx_items:
+						continue
+					self._decoder.reset()
+					await self._stream.write(NACK)
+					self.loggerio.warning('timed out while receiving the frame')
+				else:
+					self.loggerio.error('did not receive \\xee as the first byte of the frame')
+					self._response_timer.backoff()
+					waiting = None
+				tries -= 1
+				continue
+			if not isinstance(item, Frame):
+				self.loggerio.warning('discarding an unexpected ' + ('ACK' if item == ACK else 'NACK') + ' while waiting for a frame')
+				continue
+			if waiting is not None:
+				self._response_timer.update(max(loop.time() - waiting - len(item.data) * self.byte_time, 0))
+				waiting = None
+			if item.valid:
+				await self._stream.write(ACK)
+				if self.loggerio.isEnabledFor(logging.DEBUG):
+					self.loggerio.debug("received frame, length: {0:<3} data: {1}".format(len(item.data), binascii.b2a_hex(item.data).decode('utf-8')))
+				return item.control, item.sequence, item.payload, item.data
+			await self._stream.write(NACK)
+			self.loggerio.warning('crc does not match on received frame')
+			tries -= 1
+		self.loggerio.critical('failed 3 times to correctly receive a frame')
+		raise C1218IOError('failed 3 times to correctly receive a frame')
+
+	async def _recv_item(self, timeout):
+		"""
+		Wait for the next frame, ACK or NACK to be decoded from the data
+		received from the device. None is returned if nothing was decoded
+		before the timeout expired.
+		"""
+		loop = asyncio.get_event_loop()
+		deadline = loop.time() + timeout
+		while not self._rx_items:
+			remaining = deadline - loop.time()
+			if remaining <= 0:
+				return None
+			try:
+				data = await asyncio.wait_for(self._stream.read(MAX_PAYLOAD_SIZE + PACKET_OVERHEAD), remaining)
+			except asyncio.TimeoutError:
+				return None
+			if not data:
+				self.loggerio.critical('the connection was closed by the device')
+				raise C1218IOError('the connection was closed by the device')
+			self._rx_items.extend(self._decoder.feed(data))
+		return self._rx_items.popleft()
+
+	def _rx_discard(self):
+		if self._decoder.pending or self._rx_items:
+			self.loggerio.warning('discarding unexpected data from the receive buffer')
+		self._decoder.reset()
+		self._rx_items.clear()
+
+	async def transaction(self, request):
+		"""
+		Send a request and receive the response to it. Requests made by
+		concurrent tasks are serialized.
+
+		:param request: The request to send.
+		:type request: :py:class:`~c1218.data.C1218Request`
+		:return: The response data.
+		:rtype: bytes
+		"""
+		async with self._lock:
+			await self.send(request)
+			return await self.recv()
+
+	async def set_baudrate(self, baudrate):
+		"""
+		Switch the serial connection to a new baud rate. This has no effect
+		for connections which are not serial ports. Any pending output, such
+		as the acknowledgement of the negotiate response, is flushed before
+		the change is made.
+
+		:param int baudrate: The baud rate to switch to.
+		"""
+		serial_h = self._stream.serial
+		if serial_h is None:
+			self.logger.debug('ignoring the baud rate change for a connection which is not a serial port')
+			return
+		await self._stream.flush()
+		self.logger.info("switching the serial connection from {0} to {1} baud".format(serial_h.baudrate, baudrate))
+		serial_h.baudrate = baudrate
+
+	async def start(self):
+		"""
+		Send an identity request and then a negotiation request. The packet
+		size, number of packets and baud rate accepted by the device are
+		adopted as the limits for the session.
+		"""
+		self._rx_discard()
+		data = await self.transaction(C1218IdentRequest())
+		if data[0] != 0x00:
+			self.logger.error('received incorrect response to identification service request')
+			return False
+
+		self._initialized = True
+		data = await self.transaction(C1218NegotiateRequest(self.c1218_pktsize, self.c1218_nbrpkts, baudrate=self.c1218_baudrate))
+		if data[0] != 0x00:
+			self.logger.error('received incorrect response to negotiate service request')
+			await self.stop()
+			raise C1218NegotiateError('received incorrect response to negotiate service request', data[0])
+		if len(data) < 4:
+			self.logger.error('received truncated response to negotiate service request')
+			await self.stop()
+			raise C1218NegotiateError('received truncated response to negotiate service request')
+		pktsize, nbrpkts = struct.unpack('>HB', data[1:4])
+		if not PACKET_OVERHEAD < pktsize <= self.c1218_pktsize or not 0 < nbrpkts <= self.c1218_nbrpkts:
+			self.logger.warning("device negotiated invalid parameters (pktsize: {0} nbrpkts: {1}), using the requested values".format(pktsize, nbrpkts))
+			pktsize = self.c1218_pktsize
+			nbrpkts = self.c1218_nbrpkts
+		self.c1218_session_pktsize = pktsize
+		self.c1218_session_nbrpkts = nbrpkts
+		self.logger.info("negotiated session parameters, pktsize: {0} nbrpkts: {1}".format(pktsize, nbrpkts))
+		if len(data) > 4:
+			baudrate = next((rate for rate, code in C1218_BAUDRATE_CODES.items() if code == data[4]), None)
+			if baudrate is None:
+				self.logger.warning("device negotiated an unknown baud rate code: {0}".format(data[4]))
+			elif self._stream.serial is not None and baudrate != self._stream.serial.baudrate:
+				await self.set_baudrate(baudrate)
+		return True
+
+	async def stop(self, force=False):
+		"""
+		Send a terminate request.
+
+		:param bool force: ignore the remote devices response
+		"""
+		self._table_cache.save()
+		self._table_cache.clear()
+		if self._initialized:
+			try:
+				data = await self.transaction(C1218TerminateRequest())
+			except C1218IOError:
+				if not force:
+					raise
+				self.logger.warning('the device did not respond to the terminate request')
+				data = None
+			if data == b'\x00' or force:
+				self._initialized = False
+				self.logged_in = False
+				self._toggle_bit = False
+				self.c1218_session_pktsize = DEFAULT_PACKET_SIZE
+				self.c1218_session_nbrpkts = DEFAULT_NUMBER_PACKETS
+				if self._base_baudrate is not None and self._stream.serial.baudrate != self._base_baudrate:
+					await self.set_baudrate(self._base_baudrate)
+				return True
+		return False
+
+	async def close(self, force_stop=False):
+		"""
+		Send a terminate request and then disconnect from the device.
+
+		:param bool force_stop: Ignore the remote device's response to the
+		  terminate request.
+		"""
+		if self._stream is None:
+			return
+		try:
+			if self._initialized:
+				await self.stop(force_stop)
+		finally:
+			self._table_cache.save()
+			self.logged_in = False
+			self._stream.close()
+			self._stream = None
+
+	async def login(self, username='0000', userid=0, password=None):
+		"""
+		Log into the connected device.
+
+		:param str username: the username to log in with (len(username) <= 10)
+		:param int userid: the userid to log in with (0x0000 <= userid <= 0xffff)
+		:param str password: password to log in with (len(password) <= 20)
+		:rtype: bool
+		"""
+		if password and len(password) > 20:
+			self.logger.error('password longer than 20 characters received')
+			raise Exception('password longer than 20 characters, login failed')
+
+		data = await self.transaction(C1218LogonRequest(username, userid))
+		if data != b'\x00':
+			self.logger.warning('login failed, username and user id rejected')
+			return False
+
+		if password is not None:
+			data = await self.transaction(C1218SecurityRequest(password))
+			if data != b'\x00':
+				self.logger.warning('login failed, password rejected')
+				return False
+
+		self.logged_in = True
+		return True
+
+	async def logoff(self):
+		"""
+		Send a logoff request.
+
+		:rtype: bool
+		"""
+		data = await self.transaction(C1218LogoffRequest())
+		if data == b'\x00':
+			self._initialized = False
+			return True
+		return False
+
+	async def get_table_data(self, tableid, octetcount=None, offset=None):
+		"""
+		Read data from a table. If successful, all of the data from the
+		requested table will be returned.
+
+		:param int tableid: The table number to read from (0x0000 <= tableid <= 0xffff)
+		:param int octetcount: Limit the amount of data read, only works if
+		  the meter supports this type of reading.
+		:param int offset: The offset at which to start to read the data from.
+		"""
+		partial = octetcount is not None or offset is not None
+		if self.caching_enabled and not partial:
+			data = self._table_cache.get(tableid)
+			if data is not None:
+				self.logger.info('returning cached table #' + str(tableid))
+				return data
+		data = await self.transaction(C1218ReadRequest(tableid, offset, octetcount))
+		status = data[0]
+		if status != 0x00:
+			details = (C1218_RESPONSE_CODES.get(status) or 'unknown response code')
+			self.logger.error('could not read table id: ' + str(tableid) + ', error: ' + details)
+			raise C1218ReadTableError('could not read table id: ' + str(tableid) + ', error: ' + details, status)
+		if len(data) < 4:
+			self.logger.error('could not read table id: ' + str(tableid) + ', error: data read was corrupt, invalid length (less than 4)')
+			raise C1218ReadTableError('could not read table id: ' + str(tableid) + ', error: data read was corrupt, invalid length (less than 4)')
+		length = struct.unpack('>H', data[1:3])[0]
+		chksum = data[-1]
+		data = data[3:-1]
+		if len(data) != length:
+			self.logger.error('could not read table id: ' + str(tableid) + ', error: data read was corrupt, invalid length')
+			raise C1218ReadTableError('could not read table id: ' + str(tableid) + ', error: data read was corrupt, invalid length')
+		if not check_data_checksum(data, chksum):
+			self.logger.error('could not read table id: ' + str(tableid) + ', error: data read was corrupt, invalid check sum')
+			raise C1218ReadTableError('could not read table id: ' + str(tableid) + ', error: data read was corrupt, invalid checksum')
+
+		if self.caching_enabled and not partial:
+			self._cache_table(tableid, data)
+		return data
+
+	async def set_table_data(self, tableid, data, offset=None):
+		"""
+		Write data to a table.
+
+		:param int tableid: The table number to write to (0x0000 <= tableid <= 0xffff)
+		:param str data: The data to write into the table.
+		:param int offset: The offset at which to start to write the data (0x000000 <= octetcount <= 0xffffff).
+		"""
+		self._table_cache.invalidate(tableid)
+		data = await self.transaction(C1218WriteRequest(tableid, data, offset))
+		if data[0] != 0x00:
+			status = data[0]
+			details = (C1218_RESPONSE_CODES.get(status) or 'unknown response code')
+			self.logger.error('could not write data to the table, error: ' + details)
+			raise C1218WriteTableError('could not write data to the table, error: ' + details, status)
+		return
+
+	async def run_procedure(self, process_number, std_vs_mfg, params=b''):
+		"""
+		Initiate a C1219 procedure, the request is written to table 7 and
+		the response is read from table 8.
+
+		:param int process_number: The numeric procedure identifier (0 <= process_number <= 2047).
+		:param bool std_vs_mfg: Whether the procedure is manufacturer specified
+		  or not. True is manufacturer specified.
+		:param bytes params: The parameters to pass to the procedure initiation request.
+		:return: A tuple of the result code and the response data.
+		:rtype: tuple
+		"""
+		seqnum = random.randint(2, 254)
+		self.logger.info('starting procedure: ' + str(process_number) + ' (' + hex(process_number) + ') sequence number: ' + str(seqnum) + ' (' + hex(seqnum) + ')')
+		procedure_request = C1219ProcedureInit(self.c1219_endian, process_number, std_vs_mfg, 0, seqnum, params).build()
+		await self.set_table_data(7, procedure_request)
+		self._table_cache.invalidate()
+
+		response = await self.get_table_data(8)
+		if response[:3] == procedure_request[:3]:
+			return response[3], response[4:]
+		else:
+			self.logger.error('invalid response from procedure response table (table #8)')
+			raise C1219ProcedureError('invalid response from procedure response table (table #8)')
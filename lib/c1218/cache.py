@@ -0,0 +1,307 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  c1218/cache.py
+#
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are
+#  met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following disclaimer
+#    in the documentation and/or other materials provided with the
+#    distribution.
+#  * Neither the name of the project nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+#  "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+#  LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+#  A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+#  OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+#  SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+#  LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+#  DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+#  THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+#  (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+#  OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+
+from __future__ import unicode_literals
+
+
+import binascii
+import collections
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+
+from c1219.constants import *
+
+POLICY_NONE = 'none'
+POLICY_STATIC = 'static'
+POLICY_VOLATILE = 'volatile'
+
+DEFAULT_CACHE_SIZE = 262144
+DEFAULT_VOLATILE_TTL = 5.0
+
+# static tables hold the configuration of the device and the dimension and
+# actual limits which only change when it is reprogrammed, volatile tables are
+# measurements which are only reused for a short time
+DEFAULT_POLICIES = {
+	GEN_CONFIG_TBL: (POLICY_STATIC, None),
+	GENERAL_MFG_ID_TBL: (POLICY_STATIC, None),
+	2: (POLICY_STATIC, None),
+	ED_MODE_STATUS_TBL: (POLICY_VOLATILE, DEFAULT_VOLATILE_TTL),
+	DEVICE_IDENT_TBL: (POLICY_STATIC, None),
+	6: (POLICY_STATIC, None),
+	10: (POLICY_STATIC, None),
+	11: (POLICY_STATIC, None),
+	12: (POLICY_STATIC, None),
+	DIM_REGS_TBL: (POLICY_STATIC, None),
+	ACT_REGS_TBL: (POLICY_STATIC, None),
+	DATA_SELECTION_TBL: (POLICY_STATIC, None),
+	CURRENT_REG_DATA_TBL: (POLICY_VOLATILE, DEFAULT_VOLATILE_TTL),
+	PREVIOUS_SEASON_DATA_TBL: (POLICY_VOLATILE, DEFAULT_VOLATILE_TTL),
+	PREVIOUS_DEMAND_RESET_DATA_TBL: (POLICY_VOLATILE, DEFAULT_VOLATILE_TTL),
+	SELF_READ_DATA_TBL: (POLICY_VOLATILE, DEFAULT_VOLATILE_TTL),
+	PRESENT_REGISTER_DATA_TBL: (POLICY_VOLATILE, DEFAULT_VOLATILE_TTL),
+	DIM_DISP_TBL: (POLICY_STATIC, None),
+	ACT_DISP_TBL: (POLICY_STATIC, None),
+	DIM_SECURITY_LIMITING_TBL: (POLICY_STATIC, None),
+	ACT_SECURITY_LIMITING_TBL: (POLICY_STATIC, None),
+	50: (POLICY_STATIC, None),
+	51: (POLICY_STATIC, None),
+	52: (POLICY_VOLATILE, 1.0),
+	60: (POLICY_STATIC, None),
+	61: (POLICY_STATIC, None),
+	70: (POLICY_STATIC, None),
+	ACT_LOG_TBL: (POLICY_STATIC, None),
+	90: (POLICY_STATIC, None),
+	ACT_TELEPHONE_TBL: (POLICY_STATIC, None),
+}
+
+CacheEntry = collections.namedtuple('CacheEntry', ('data', 'policy', 'expires'))
+
+def device_cache_key(general_mfg_table):
+	"""
+	Build the key which identifies a device from the data of its
+	GENERAL_MFG_ID_TBL. The key is made from the manufacturer, model and
+	serial number and is safe to use as a file name.
+
+	:param bytes general_mfg_table: The data of table #1.
+	:rtype: str
+	"""
+	if len(general_mfg_table) < 24:
+		return None
+	manufacturer = general_mfg_table[0:4].decode('ascii', 'replace').strip()
+	model = general_mfg_table[4:12].decode('ascii', 'replace').strip()
+	serial_number = binascii.b2a_hex(general_mfg_table[16:32].rstrip(b'\x00 ')).decode('ascii')
+	return re.sub(r'[^A-Za-z0-9_.-]', '_', '-'.join((manufacturer, model, serial_number)))
+
+class TableCache(object):
+	"""
+	A bounded, least recently used cache of table data. How each table is
+	cached is determined by its policy, tables with the static policy are
+	kept until they are invalidated while tables with the volatile policy
+	expire once their time to live has elapsed. Tables without a policy are
+	never cached. Once the total size of the cached data exceeds the maximum
+	size, the least recently used tables are evicted.
+
+	If a directory is specified, the static tables of each device are
+	persisted to a file named by the device's key (see :py:func:`.device_cache_key`)
+	so they can be reused by later connections to the same device.
+
+	:param int max_size: The maximum number of bytes of table data to cache.
+	:param dict policies: A dictionary of table ids to tuples of the policy and
+	  the time to live in seconds, if not specified :py:data:`.DEFAULT_POLICIES`
+	  is used.
+	:param str directory: The directory to persist static tables in.
+	"""
+	def __init__(self, max_size=DEFAULT_CACHE_SIZE, policies=None, directory=None):
+		self.logger = logging.getLogger('c1218.cache')
+		self.max_size = max_size
+		self.policies = dict(DEFAULT_POLICIES if policies is None else policies)
+		self.directory = directory
+		self.device_key = None
+		self.size = 0
+		self._entries = collections.OrderedDict()
+		self._lock = threading.RLock()
+		self._dirty = False
+
+	def __contains__(self, tableid):
+		return self.get(tableid) is not None
+
+	def __len__(self):
+		return len(self._entries)
+
+	def __repr__(self):
+		return "<{0} tables: {1} size: {2:,} >".format(self.__class__.__name__, len(self._entries), self.size)
+
+	def set_policy(self, tableid, policy, ttl=None):
+		"""
+		Set the policy used to cache a table, changing the policy invalidates
+		any data which is already cached for the table.
+
+		:param int tableid: The table number to set the policy for.
+		:param str policy: One of :py:data:`.POLICY_NONE`, :py:data:`.POLICY_STATIC`
+		  or :py:data:`.POLICY_VOLATILE`.
+		:param float ttl: The time to live in seconds for volatile tables.
+		"""
+		if policy not in (POLICY_NONE, POLICY_STATIC, POLICY_VOLATILE):
+			raise ValueError('unknown cache policy: ' + str(policy))
+		if policy == POLICY_VOLATILE and ttl is None:
+			ttl = DEFAULT_VOLATILE_TTL
+		self.invalidate(tableid)
+		if policy == POLICY_NONE:
+			self.policies.pop(tableid, None)
+		else:
+			self.policies[tableid] = (policy, ttl)
+
+	def get(self, tableid):
+		"""
+		Get the cached data for a table. If the table is not cached or the
+		data has expired, None is returned.
+
+		:param int tableid: The table number to retrieve.
+		:rtype: bytes
+		"""
+		with self._lock:
+			entry = self._entries.get(tableid)
+			if entry is None:
+				return None
+			if entry.expires is not None and entry.expires <= time.monotonic():
+				self._remove(tableid)
+				return None
+			self._entries.move_to_end(tableid)
+			return entry.data
+
+	def put(self, tableid, data):
+		"""
+		Store the data of a table according to its policy. Returns True if the
+		data was cached.
+
+		:param int tableid: The table number the data was read from.
+		:param bytes data: The data of the table.
+		:rtype: bool
+		"""
+		policy, ttl = self.policies.get(tableid, (POLICY_NONE, None))
+		if policy == POLICY_NONE or len(data) > self.max_size:
+			return False
+		expires = None
+		if policy == POLICY_VOLATILE:
+			expires = time.monotonic() + ttl
+		with self._lock:
+			self._remove(tableid)
+			self._entries[tableid] = CacheEntry(bytes(data), policy, expires)
+			self.size += len(data)
+			if policy == POLICY_STATIC:
+				self._dirty = True
+			while self.size > self.max_size:
+				evicted = next(iter(self._entries))
+				self.logger.debug("evicting table #{0} from the cache".format(evicted))
+				self._remove(evicted)
+		return True
+
+	def invalidate(self, tableid=None):
+		"""
+		Remove a table from the cache, or all of the tables if *tableid* is
+		not specified. Invalidated tables are also removed from the persisted
+		cache the next time that it is saved.
+
+		:param int tableid: The table number to remove.
+		"""
+		with self._lock:
+			if tableid is None:
+				self.logger.debug('invalidating all cached tables')
+				self._dirty = self._dirty or any(entry.policy == POLICY_STATIC for entry in self._entries.values())
+				self._entries.clear()
+				self.size = 0
+			elif tableid in self._entries:
+				self.logger.debug("invalidating cached table #{0}".format(tableid))
+				self._remove(tableid)
+
+	def clear(self):
+		"""
+		Remove all tables from the cache without affecting the persisted
+		cache and forget the device that it belongs to.
+		"""
+		with self._lock:
+			self._entries.clear()
+			self.size = 0
+			self.device_key = None
+			self._dirty = False
+
+	def _remove(self, tableid):
+		entry = self._entries.pop(tableid, None)
+		if entry is None:
+			return
+		self.size -= len(entry.data)
+		if entry.policy == POLICY_STATIC:
+			self._dirty = True
+
+	def _get_path(self, device_key):
+		return os.path.join(self.directory, device_key + '.json')
+
+	def set_device(self, device_key):
+		"""
+		Set the key of the device that the cached tables belong to. If the
+		cache is persistent, the previously saved tables for the device are
+		loaded. Tables cached for a different device are discarded.
+
+		:param str device_key: The key of the device, see :py:func:`.device_cache_key`.
+		"""
+		with self._lock:
+			if device_key == self.device_key:
+				return
+			if self.device_key is not None:
+				self.save()
+				self.clear()
+			self.device_key = device_key
+			if self.directory is None or device_key is None:
+				return
+			path = self._get_path(device_key)
+			if not os.path.isfile(path):
+				return
+			try:
+				with open(path, 'r') as file_h:
+					tables = json.load(file_h)['tables']
+				tables = dict((int(tableid), binascii.a2b_hex(data)) for tableid, data in tables.items())
+			except (IOError, OSError, ValueError, KeyError, TypeError, binascii.Error) as error:
+				self.logger.warning("failed to load the table cache from {0}: {1}".format(path, error))
+				return
+			for tableid, data in tables.items():
+				if tableid not in self._entries and self.policies.get(tableid, (POLICY_NONE, None))[0] == POLICY_STATIC:
+					self.put(tableid, data)
+			self._dirty = False
+			self.logger.info("loaded {0} tables from the cache for device {1}".format(len(tables), device_key))
+
+	def save(self):
+		"""
+		Write the static tables of the current device to the cache directory
+		if they have been changed since they were loaded.
+		"""
+		with self._lock:
+			if self.directory is None or self.device_key is None or not self._dirty:
+				return
+			tables = dict((str(tableid), binascii.b2a_hex(entry.data).decode('ascii')) for tableid, entry in self._entries.items() if entry.policy == POLICY_STATIC)
+			path = self._get_path(self.device_key)
+			try:
+				if not os.path.isdir(self.directory):
+					os.makedirs(self.directory)
+				file_d, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+				with os.fdopen(file_d, 'w') as file_h:
+					json.dump({'device': self.device_key, 'tables': tables}, file_h)
+				os.replace(tmp_path, path)
+			except (IOError, OSError) as error:
+				self.logger.warning("failed to save the table cache to {0}: {1}".format(path, error))
+				return
+			self._dirty = False
+			self.logger.info("saved {0} tables to the cache for device {1}".format(len(tables), self.device_key))
@@ -32,14 +32,22 @@
 
 from __future__ import unicode_literals
 
+import collections
+import hashlib
 import logging
+import math
 import random
 import sys
+import threading
 import time
 
+from c1218.cache import DEFAULT_CACHE_SIZE, TableCache, device_cache_key
 from c1218.data import *
 from c1218.errors import C1218NegotiateError, C1218IOError, C1218ReadTableError, C1218WriteTableError
-from c1218.utilities import check_data_checksum, packet_checksum
+from c1218.metrics import SERVICE_NAMES, ConnectionMetrics
+from c1218.trace import TRACE_RX, TRACE_RX_FRAME, TRACE_TX
+from c1218.utilities import RoundTripEstimator, check_data_checksum, packet_checksum
+from c1219.constants import GENERAL_MFG_ID_TBL
 from c1219.data import C1219ProcedureInit
 from c1219.errors import C1219ProcedureError
 
@@ -51,8 +59,10 @@ if hasattr(serial, 'protocol_handler_packages') and not 'c1218.urlhandler' in se
 if hasattr(logging, 'NullHandler'):
 	logging.getLogger('c1218').addHandler(logging.NullHandler())
 
+RECV_BUFFER_SIZE = 2 * (MAX_PAYLOAD_SIZE + PACKET_OVERHEAD)
+
 class ConnectionBase(object):
-	def __init__(self, device, c1218_settings={}, serial_settings=None, toggle_control=True, **kwargs):
+	def __init__(self, device, c1218_settings={}, serial_settings=None, toggle_control=True, trace=None, metrics=None, **kwargs):
 		"""
 		This is a C12.18 driver for serial connections.  It relies on PySerial
 		to communicate with an ANSI Type-2 Optical probe to communicate
@@ -62,19 +72,30 @@ class ConnectionBase(object):
 		  library.  If PySerial is new enough, the serial_for_url function
 		  will be used to allow the user to use a rfc2217 bridge.
 		:param dict c1218_settings: A settings dictionary to configure the C1218
-		  parameters of 'nbrpkts' and 'pktsize'  If not provided the default
-		  settings of 2 (nbrpkts) and 512 (pktsize) will be used.
+		  parameters of 'nbrpkts', 'pktsize' and 'baudrate'  If not provided the
+		  default settings of 2 (nbrpkts), 512 (pktsize) and 9600 (baudrate)
+		  will be used.
 		:param dict serial_settings: A PySerial settings dictionary to be applied to
 		  the serial connection instance.
 		:param bool toggle_control: Enables or diables automatically settings
 		  the toggle bit in C12.18 frames.
+		:param trace: A recorder to write the traffic of the connection to.
+		:type trace: :py:class:`~c1218.trace.TraceRecorder`
+		:param metrics: The metrics to record the link and service statistics
+		  in, a new instance is created if one is not specified.
+		:type metrics: :py:class:`~c1218.metrics.ConnectionMetrics`
 		"""
 		self.logger = logging.getLogger('c1218.connection')
 		self.loggerio = logging.getLogger('c1218.connection.io')
 		self.toggle_control = toggle_control
 		self._toggle_bit = False
+		self.trace = trace
+		self.metrics = ConnectionMetrics() if metrics is None else metrics
+		self._service = None
+		self._service_started = None
 		if hasattr(serial, 'serial_for_url'):
-			self.serial_h = serial.serial_for_url(device)
+			# the port is opened once the settings are applied so it is only configured once
+			self.serial_h = serial.serial_for_url(device, do_not_open=True)
 		else:
 			self.logger.warning('serial library does not have serial_for_url functionality, it\'s not the latest version')
 			self.serial_h = serial.Serial(device)
@@ -83,19 +104,20 @@ class ConnectionBase(object):
 
 		self.c1218_pktsize = (c1218_settings.get('pktsize') or 512)
 		self.c1218_nbrpkts = (c1218_settings.get('nbrpkts') or 2)
+		self.c1218_baudrate = (c1218_settings.get('baudrate') or DEFAULT_BAUDRATE)
+		self.c1218_session_pktsize = DEFAULT_PACKET_SIZE
+		self.c1218_session_nbrpkts = DEFAULT_NUMBER_PACKETS
 
 		if serial_settings:
 			self.logger.debug('applying pySerial settings dictionary')
-			self.serial_h.parity = serial_settings['parity']
-			self.serial_h.baudrate = serial_settings['baudrate']
-			self.serial_h.bytesize = serial_settings['bytesize']
-			self.serial_h.xonxoff = serial_settings['xonxoff']
-			self.serial_h.interCharTimeout = serial_settings['interCharTimeout']
-			self.serial_h.rtscts = serial_settings['rtscts']
-			self.serial_h.timeout = serial_settings['timeout']
-			self.serial_h.stopbits = serial_settings['stopbits']
-			self.serial_h.dsrdtr = serial_settings['dsrdtr']
-			self.serial_h.writeTimeout = serial_settings['writeTimeout']
+			serial_settings = dict(serial_settings)
+			for old_name, new_name in (('interCharTimeout', 'inter_byte_timeout'), ('writeTimeout', 'write_timeout')):
+				if old_name in serial_settings:
+					serial_settings[new_name] = serial_settings.pop(old_name)
+			self.serial_h.apply_settings(serial_settings)
+		if not self.serial_h.is_open:
+			self.serial_h.open()
+		self._base_baudrate = self.serial_h.baudrate
 
 		try:
 			self.serial_h.setRTS(True)
@@ -110,6 +132,20 @@ class ConnectionBase(object):
 		else:
 			self.logger.debug('set DTR to False')
 
+		self._rx_buffer = bytearray(RECV_BUFFER_SIZE)
+		self._rx_start = 0
+		self._rx_end = 0
+		self._rx_wait_started = None
+		initial_timeout = self.serial_h.timeout or ACK_TIMEOUT
+		self._ack_timer = RoundTripEstimator(initial=min(initial_timeout, ACK_TIMEOUT), maximum=ACK_TIMEOUT)
+		self._response_timer = RoundTripEstimator(initial=min(initial_timeout, RESPONSE_TIMEOUT), maximum=RESPONSE_TIMEOUT)
+
+		self._lock = threading.RLock()
+		self._awaiting_response = False
+		self._last_activity = time.monotonic()
+		self._keepalive_thread = None
+		self._keepalive_stop = threading.Event()
+
 		self.logged_in = False
 		self._initialized = False
 		self.c1219_endian = '<'
@@ -119,84 +155,318 @@ class ConnectionBase(object):
 
 	def send(self, data):
 		"""
-		This sends a raw C12.18 frame and waits checks for an ACK response.
-		In the event that a NACK is received, this function will attempt
-		to resend the frame up to 3 times.
+		This sends a C12.18 request and waits checks for an ACK response to
+		each frame. Data which is larger than the negotiated packet size is
+		segmented into a multi-packet transmission. In the event that a NACK
+		is received, this function will attempt to resend the frame up to 3
+		times.
 
 		:param data: the data to be transmitted
-		:type data: str, :py:class:`~c1218.data.C1218Packet`
+		:type data: str, :py:class:`~c1218.data.C1218Request`, :py:class:`~c1218.data.C1218Packet`
 		"""
-		if not isinstance(data, C1218Packet):
-			data = C1218Packet(data)
-		if self.toggle_control:  # bit wise, fuck yeah
-			if self._toggle_bit:
-				data.set_control(ord(data.control) | 0x20)
-				self._toggle_bit = False
-			elif not self._toggle_bit:
-				if ord(data.control) & 0x20:
-					data.set_control(ord(data.control) ^ 0x20)
-				self._toggle_bit = True
-		elif self.toggle_control and not isinstance(data, C1218Packet):
-			self.loggerio.warning('toggle bit is on but the data is not a C1218Packet instance')
-		data = data.build()
-		self.loggerio.debug("sending frame,  length: {0:<3} data: {1}".format(len(data), binascii.b2a_hex(data).decode('utf-8')))
-		for pktcount in range(0, 3):
+		with self._lock:
+			# the response to this request must be received before the
+			# keepalive thread is allowed to send anything
+			self._awaiting_response = True
+			started = time.monotonic()
+			self._service = None
+			self._send(data)
+			self._service_started = started
+			self._last_activity = time.monotonic()
+
+	def _send(self, data):
+		if isinstance(data, C1218Packet):
+			packets = [data]
+		else:
+			packets = self._segment(data)
+		payload = packets[0].data
+		if payload and (not ord(packets[0].control) & CONTROL_MULTI_PACKET or ord(packets[0].control) & CONTROL_FIRST_PACKET):
+			service = SERVICE_NAMES.get(payload[0])
+			tableid = None
+			if service in ('read', 'write') and len(payload) >= 3:
+				tableid = struct.unpack('>H', payload[1:3])[0]
+			if service is not None:
+				self._service = (service, tableid)
+		for packet in packets:
+			if self.toggle_control:
+				control = ord(packet.control) & ~CONTROL_TOGGLE
+				if self._toggle_bit:
+					control |= CONTROL_TOGGLE
+				packet.set_control(control)
+				self._toggle_bit = not self._toggle_bit
+			self._send_frame(packet.build())
+
+	def _segment(self, data):
+		packets = C1218Packet.segment(data, self.c1218_session_pktsize - PACKET_OVERHEAD)
+		if len(packets) > self.c1218_session_nbrpkts:
+			self.loggerio.error("data requires {0} packets but only {1} were negotiated".format(len(packets), self.c1218_session_nbrpkts))
+			raise C1218IOError("data requires {0} packets but only {1} were negotiated".format(len(packets), self.c1218_session_nbrpkts))
+		return packets
+
+	def _send_frame(self, data):
+		if self.loggerio.isEnabledFor(logging.DEBUG):
+			self.loggerio.debug("sending frame,  length: {0:<3} data: {1}".format(len(data), binascii.b2a_hex(data).decode('utf-8')))
+		self._rx_discard()
+		self._rx_wait_started = None
+		transmit_time = len(data) * self.byte_time
+		for attempt in range(0, 3):
+			self._set_read_timeout(transmit_time + self._ack_timer.timeout)
+			started = time.monotonic()
 			self.write(data)
+			self.metrics.increment('frames_sent')
+			if attempt:
+				self.metrics.increment('retransmissions')
 			response = self.serial_h.read(1)
+			if response:
+				self.metrics.increment('bytes_received')
+				if self.trace is not None:
+					self.trace.record(TRACE_RX, response)
 			if response == NACK:
+				self.metrics.increment('nacks_received')
 				self.loggerio.warning('received a NACK after writing data')
-				time.sleep(0.10)
 			elif len(response) == 0:
+				self.metrics.increment('ack_timeouts')
 				self.loggerio.error('received empty response after writing data')
-				time.sleep(0.10)
+				self._ack_timer.backoff()
 			elif response != ACK:
+				self.metrics.increment('invalid_acks')
 				self.loggerio.error('received unknown response: ' + hex(ord(response)) + ' after writing data')
 			else:
+				if attempt == 0:
+					self._ack_timer.update(max(time.monotonic() - started - transmit_time, 0))
+				self._rx_wait_started = time.monotonic()
 				return
 		self.loggerio.critical('failed 3 times to correctly send a frame')
 		raise C1218IOError('failed 3 times to correctly send a frame')
 
 	def recv(self, full_frame=False):
 		"""
-		Receive a C1218Packet, the payload data is returned.
+		Receive a C12.18 response, the payload data is returned. Multi-packet
+		transmissions are reassembled, the sequence numbers of each packet
+		are validated and retransmitted packets are discarded.
 
-		:param bool full_frame: If set to True, the entire C1218 frame is
+		:param bool full_frame: If set to True, the raw C12.18 frames are
 		  returned instead of just the payload.
 		"""
-		payloadbuffer = b''
+		with self._lock:
+			data = None
+			try:
+				data = self._recv(full_frame)
+				return data
+			finally:
+				self._awaiting_response = False
+				self._last_activity = time.monotonic()
+				if self._service is not None:
+					service, tableid = self._service
+					self._service = None
+					if data and full_frame:
+						data = data[FRAME_HEADER_SIZE:]
+					self.metrics.observe_service(service, self._last_activity - self._service_started, (data[0] if data else None), tableid=tableid)
+
+	def _recv(self, full_frame):
+		payloadbuffer = bytearray()
+		framebuffer = bytearray()
+		expected_sequence = None
+		while True:
+			control, sequence, payload, frame = self._recv_frame()
+			if not control & CONTROL_MULTI_PACKET:
+				if expected_sequence is not None:
+					self.loggerio.warning('received a single packet while reassembling a multi-packet transmission')
+				if sequence != 0:
+					self.loggerio.warning("received a single packet with a non-zero sequence number ({0})".format(sequence))
+				payloadbuffer = bytearray(payload)
+				framebuffer = bytearray(frame)
+				break
+			if control & CONTROL_FIRST_PACKET:
+				if expected_sequence is not None:
+					self.loggerio.warning('received a new first packet, restarting the multi-packet reassembly')
+				if sequence + 1 > self.c1218_session_nbrpkts:
+					self.loggerio.warning("multi-packet transmission of {0} packets exceeds the negotiated {1}".format(sequence + 1, self.c1218_session_nbrpkts))
+				payloadbuffer = bytearray()
+				framebuffer = bytearray()
+			elif expected_sequence is None:
+				self.loggerio.critical('received a multi-packet continuation without a first packet')
+				raise C1218IOError('received a multi-packet continuation without a first packet')
+			elif sequence == expected_sequence + 1:
+				self.loggerio.warning("discarding retransmitted packet with sequence number {0}".format(sequence))
+				continue
+			elif sequence != expected_sequence:
+				self.loggerio.critical("received packet with sequence number {0}, expected {1}".format(sequence, expected_sequence))
+				raise C1218IOError("received packet with sequence number {0}, expected {1}".format(sequence, expected_sequence))
+			payloadbuffer += payload
+			framebuffer += frame
+			if sequence == 0:
+				break
+			expected_sequence = sequence - 1
+		if full_frame:
+			payloadbuffer = framebuffer
+		if sys.version_info[0] == 2:
+			return payloadbuffer
+		return bytes(payloadbuffer)
+
+	def _recv_frame(self):
 		tries = 3
 		while tries:
-			tmpbuffer = self.serial_h.read(1)
-			if tmpbuffer != b'\xee':
-				self.loggerio.error('did not receive \\xee as the first byte of the frame')
-				self.loggerio.debug('received \\x' + binascii.b2a_hex(tmpbuffer).decode('utf-8') + ' instead')
-				tries -= 1
+			buffer = self._rx_buffer
+			position = buffer.find(b'\xee', self._rx_start, self._rx_end)
+			if position == -1:
+				if self._rx_end > self._rx_start:
+					self.loggerio.warning("discarding {0} bytes received before the start of the frame".format(self._rx_end - self._rx_start))
+				self._rx_start = self._rx_end = 0
+				if not self._rx_fill(FRAME_HEADER_SIZE, self._response_timer.timeout + FRAME_HEADER_SIZE * self.byte_time):
+					self.metrics.increment('response_timeouts')
+					self.loggerio.error('did not receive \\xee as the first byte of the frame')
+					self._response_timer.backoff()
+					self._rx_wait_started = None
+					tries -= 1
 				continue
-			tmpbuffer += self.serial_h.read(5)
-			sequence, length = struct.unpack('>xxxBH', tmpbuffer)
-			payload = self.serial_h.read(length)
-			tmpbuffer += payload
-			chksum = self.serial_h.read(2)
-			if chksum == packet_checksum(tmpbuffer):
-				self.serial_h.write(ACK)
-				data = tmpbuffer + chksum
-				self.loggerio.debug("received frame, length: {0:<3} data: {1}".format(len(data), binascii.b2a_hex(data).decode('utf-8')))
-				payloadbuffer += payload
-				if sequence == 0:
-					if full_frame:
-						payloadbuffer = data
-					if sys.version_info[0] == 2:
-						payloadbuffer = bytearray(payloadbuffer)
-					return payloadbuffer
-				else:
-					tries = 3
-			else:
-				self.serial_h.write(NACK)
-				self.loggerio.warning('crc does not match on received frame')
-				tries -= 1
+			if position != self._rx_start:
+				self.loggerio.warning("discarding {0} bytes received before the start of the frame".format(position - self._rx_start))
+				self._rx_start = position
+			available = self._rx_end - position
+			if self._rx_wait_started is not None:
+				self._response_timer.update(max(time.monotonic() - self._rx_wait_started - available * self.byte_time, 0))
+				self._rx_wait_started = None
+			if available < FRAME_HEADER_SIZE:
+				if self._rx_fill_remaining(FRAME_HEADER_SIZE - available) < FRAME_HEADER_SIZE - available:
+					self._recv_frame_failed('timed out while receiving the frame header')
+					tries -= 1
+				continue
+			control, sequence, length = struct.unpack_from('>xxBBH', buffer, position)
+			if length > MAX_PAYLOAD_SIZE:
+				self.loggerio.warning("discarding frame with an invalid length of {0} bytes, resynchronizing".format(length))
+				self._rx_start = position + 1
+				continue
+			frame_size = length + PACKET_OVERHEAD
+			if available < frame_size:
+				if self._rx_fill_remaining(frame_size - available) < frame_size - available:
+					self._recv_frame_failed('timed out while receiving the frame')
+					tries -= 1
+				continue
+			if self._rx_check_frame(position, frame_size):
+				self._rx_start = position + frame_size
+				self.write(ACK)
+				self.metrics.increment('frames_received')
+				self._rx_wait_started = time.monotonic()
+				data = bytes(buffer[position:position + frame_size])
+				if self.trace is not None:
+					self.trace.record(TRACE_RX_FRAME, data)
+				if self.loggerio.isEnabledFor(logging.DEBUG):
+					self.loggerio.debug("received frame, length: {0:<3} data: {1}".format(len(data), binascii.b2a_hex(data).decode('utf-8')))
+				return control, sequence, memoryview(data)[FRAME_HEADER_SIZE:-2], data
+			self.metrics.increment('crc_errors')
+			self._rx_start = position + 1
+			if self._rx_resync():
+				self.metrics.increment('resyncs')
+				self.loggerio.warning('crc does not match on received frame, resynchronized on a later start byte')
+				continue
+			self._rx_start = position + frame_size
+			self.write(NACK)
+			self.metrics.increment('nacks_sent')
+			self.loggerio.warning('crc does not match on received frame')
+			tries -= 1
 		self.loggerio.critical('failed 3 times to correctly receive a frame')
 		raise C1218IOError('failed 3 times to correctly receive a frame')
 
+	def _recv_frame_failed(self, message):
+		self.metrics.increment('frame_timeouts')
+		self._rx_start += 1
+		if self._rx_resync():
+			self.metrics.increment('resyncs')
+			self.loggerio.warning(message + ', resynchronized on a later start byte')
+			return
+		self._rx_start = self._rx_end = 0
+		self.write(NACK)
+		self.metrics.increment('nacks_sent')
+		self.loggerio.warning(message)
+
+	def _rx_check_frame(self, position, frame_size):
+		with memoryview(self._rx_buffer) as view:
+			frame = view[position:position + frame_size - 2]
+			valid = packet_checksum(frame) == view[position + frame_size - 2:position + frame_size]
+			frame.release()
+		return valid
+
+	def _rx_resync(self):
+		"""
+		Search the data which has already been received for a complete frame
+		with a valid checksum, this recovers from noise which contained a
+		start byte. The read position is moved to the frame if one is found.
+		"""
+		buffer = self._rx_buffer
+		position = buffer.find(b'\xee', self._rx_start, self._rx_end)
+		while position != -1 and self._rx_end - position >= PACKET_OVERHEAD:
+			length = struct.unpack_from('>H', buffer, position + 4)[0]
+			if length <= MAX_PAYLOAD_SIZE and self._rx_end - position >= length + PACKET_OVERHEAD and self._rx_check_frame(position, length + PACKET_OVERHEAD):
+				self._rx_start = position
+				return True
+			position = buffer.find(b'\xee', position + 1, self._rx_end)
+		return False
+
+	def _rx_fill_remaining(self, size):
+		# the rest of a frame which has started arriving is due as fast as the
+		# baud rate allows, anything longer than the link turnaround on top of
+		# that means the data was lost
+		return self._rx_fill(size, size * self.byte_time + min(self._ack_timer.timeout, INTER_CHARACTER_TIMEOUT))
+
+	def _rx_fill(self, size, timeout):
+		"""
+		Read at least *size* bytes from the serial connection into the
+		receive buffer, along with any other data which is already waiting.
+		Returns the number of bytes that were read which will be less than
+		*size* if the read timed out.
+		"""
+		self._set_read_timeout(timeout)
+		if self._rx_start == self._rx_end:
+			self._rx_start = self._rx_end = 0
+		elif len(self._rx_buffer) - self._rx_end < size:
+			pending = self._rx_end - self._rx_start
+			self._rx_buffer[:pending] = self._rx_buffer[self._rx_start:self._rx_end]
+			self._rx_start, self._rx_end = 0, pending
+		free = len(self._rx_buffer) - self._rx_end
+		if free < size:
+			self._rx_buffer.extend(bytearray(size - free))
+			free = size
+		size = max(size, min(getattr(self.serial_h, 'in_waiting', 0), free))
+		with memoryview(self._rx_buffer) as view:
+			target = view[self._rx_end:self._rx_end + size]
+			if hasattr(self.serial_h, 'readinto'):
+				count = self.serial_h.readinto(target)
+			else:
+				data = self.serial_h.read(size)
+				count = len(data)
+				target[:count] = data
+			if count:
+				self.metrics.increment('bytes_received', count)
+				if self.trace is not None:
+					self.trace.record(TRACE_RX, target[:count].tobytes())
+			target.release()
+		self._rx_end += count
+		return count
+
+	def _set_read_timeout(self, timeout):
+		# changing the timeout reconfigures the port, so avoid doing so for
+		# differences smaller than the resolution of the timers
+		timeout = round(timeout, 2)
+		if self.serial_h.timeout != timeout:
+			self.serial_h.timeout = timeout
+
+	@property
+	def byte_time(self):
+		"""
+		The time in seconds that it takes to transmit one byte at the current
+		serial settings.
+		"""
+		bits = 1 + (self.serial_h.bytesize or 8) + (self.serial_h.stopbits or 1)
+		if self.serial_h.parity not in (None, serial.PARITY_NONE):
+			bits += 1
+		return bits / float(self.serial_h.baudrate)
+
+	def _rx_discard(self):
+		if self._rx_end > self._rx_start:
+			self.loggerio.warning("discarding {0} unexpected bytes from the receive buffer".format(self._rx_end - self._rx_start))
+		self._rx_start = self._rx_end = 0
+
 	def write(self, data):
 		"""
 		Write raw data to the serial connection. The CRC must already be
@@ -205,6 +475,9 @@ class ConnectionBase(object):
 
 		:param str data: The raw data to write to the serial connection.
 		"""
+		if self.trace is not None:
+			self.trace.record(TRACE_TX, data)
+		self.metrics.increment('bytes_sent', len(data))
 		return self.serial_h.write(data)
 
 	def read(self, size):
@@ -215,12 +488,100 @@ class ConnectionBase(object):
 		:param int size: The number of bytes to read from the serial connection.
 		"""
 		data = self.serial_h.read(size)
+		if data:
+			self.metrics.increment('bytes_received', len(data))
+			if self.trace is not None:
+				self.trace.record(TRACE_RX, data)
 		self.logger.debug('read data, length: ' + str(len(data)) + ' data: ' + binascii.b2a_hex(data).decode('utf-8'))
-		self.serial_h.write(ACK)
+		self.write(ACK)
 		if sys.version_info[0] == 2:
 			data = bytearray(data)
 		return data
 
+	def set_baudrate(self, baudrate):
+		"""
+		Change the baud rate of the serial connection. Any pending output,
+		such as the acknowledgement of the negotiate response, is flushed
+		before the change is made.
+
+		:param int baudrate: The new baud rate to use.
+		"""
+		self.serial_h.flush()
+		self.logger.info("switching the serial connection from {0} to {1} baud".format(self.serial_h.baudrate, baudrate))
+		self.serial_h.baudrate = baudrate
+
+	def wait(self, seconds):
+		"""
+		Send a wait request, asking the device to extend the channel traffic
+		timeout and keep the session open for the specified number of seconds.
+
+		:param int seconds: The number of seconds to wait for (1 <= seconds <= 255).
+		:rtype: bool
+		"""
+		with self._lock:
+			self.send(C1218WaitRequest(seconds))
+			data = self.recv()
+		return data == b'\x00'
+
+	def start_keepalive(self, fraction, channel_timeout=CHANNEL_TRAFFIC_TIMEOUT):
+		"""
+		Start a background thread which keeps the session open by sending a
+		wait request whenever the connection has been idle for the specified
+		fraction of the device's channel traffic timeout. The wait requests
+		are never sent while a request is awaiting its response.
+
+		:param float fraction: The fraction of the channel traffic timeout
+		  after which to send a wait request (0 < fraction < 1).
+		:param float channel_timeout: The channel traffic timeout of the device
+		  in seconds.
+		"""
+		if not 0 < fraction < 1:
+			raise ValueError('fraction must be between 0 and 1')
+		self.stop_keepalive()
+		interval = fraction * channel_timeout
+		seconds = min(max(int(math.ceil(channel_timeout)), 1), 0xff)
+		self._keepalive_stop.clear()
+		self._keepalive_thread = threading.Thread(target=self._keepalive_loop, args=(interval, seconds), name='c1218-keepalive')
+		self._keepalive_thread.daemon = True
+		self._keepalive_thread.start()
+		self.logger.info("started the keepalive thread, idle interval: {0:.2f} seconds".format(interval))
+
+	def stop_keepalive(self):
+		"""
+		Stop the keepalive thread if it is running.
+		"""
+		thread = self._keepalive_thread
+		if thread is None:
+			return
+		self._keepalive_stop.set()
+		if thread is not threading.current_thread():
+			thread.join()
+		self._keepalive_thread = None
+		self.logger.info('stopped the keepalive thread')
+
+	def _keepalive_loop(self, interval, seconds):
+		while not self._keepalive_stop.is_set():
+			delay = self._last_activity + interval - time.monotonic()
+			if delay > 0:
+				self._keepalive_stop.wait(delay)
+				continue
+			if not self._lock.acquire(timeout=interval):
+				continue
+			try:
+				# the connection may have been used while waiting for the lock
+				if self._keepalive_stop.is_set() or self._awaiting_response or not self._initialized:
+					continue
+				if time.monotonic() - self._last_activity < interval:
+					continue
+				self.logger.debug("sending a keepalive wait request for {0} seconds".format(seconds))
+				if not self.wait(seconds):
+					self.logger.warning('the device rejected the keepalive wait request')
+			except C1218IOError as error:
+				self.logger.error('the keepalive wait request failed, stopping the keepalive thread: ' + str(error))
+				return
+			finally:
+				self._lock.release()
+
 	def close(self, force_stop=False):
 		"""
 		Send a terminate request and then disconnect from the serial device.
@@ -228,12 +589,274 @@ class ConnectionBase(object):
 		that it is possible to ignore remote device response and still update
 		_initialized member.
 		"""
+		self.stop_keepalive()
 		if self._initialized:
 			self.stop(force_stop)
 		self.logged_in = False
 		return self.serial_h.close()
 
-class Connection(ConnectionBase):
+class TableCacheMixin(object):
+	"""
+	The handling of the table cache which is shared by the connection
+	classes, regardless of how they communicate with the device.
+	"""
+	def _init_table_cache(self, enable_cache, cache_size, cache_directory):
+		self.caching_enabled = enable_cache
+		self._table_cache = TableCache(max_size=cache_size, directory=cache_directory)
+		if enable_cache:
+			self.logger.info('selective table caching has been enabled')
+
+	def flush_table_cache(self):
+		self.logger.info('flushing all cached tables')
+		self._table_cache.clear()
+
+	def set_table_cache_policy(self, cache_policy):
+		if self.caching_enabled == cache_policy:
+			return
+		self.caching_enabled = cache_policy
+		if cache_policy:
+			self.logger.info('selective table caching has been enabled')
+		else:
+			self.flush_table_cache()
+			self.logger.info('selective table caching has been disabled')
+		return
+
+	def _cache_table(self, tableid, data):
+		if tableid == GENERAL_MFG_ID_TBL:
+			self._table_cache.set_device(device_cache_key(data))
+		if self._table_cache.put(tableid, data):
+			self.logger.info('caching table #' + str(tableid))
+
+class TableAccessMixin(TableCacheMixin):
+	"""
+	The table and procedure methods which are shared by the synchronous
+	connection classes. They are implemented using the
+	:py:meth:`get_table_data` and :py:meth:`set_table_data` methods and the
+	*_lock* attribute of the class.
+	"""
+	def _init_table_cache(self, enable_cache, cache_size, cache_directory):
+		super(TableAccessMixin, self)._init_table_cache(enable_cache, cache_size, cache_directory)
+		self._partial_reads_supported = None
+		self._partial_writes_supported = None
+		self._write_progress = {}
+
+	def _get_read_chunk_size(self):
+		# the number of octets to request with each partial read by default
+		raise NotImplementedError()
+
+	def _get_write_chunk_size(self):
+		# the number of octets to send with each partial write by default
+		raise NotImplementedError()
+
+	@property
+	def partial_reads_supported(self):
+		"""
+		Whether the device supports partial reads of tables, this is None
+		until it has been determined by :py:meth:`.iter_table_data`.
+		"""
+		return self._partial_reads_supported
+
+	def get_tables(self, tableids, optional=()):
+		"""
+		Read the data from multiple tables. Duplicate table ids are only read
+		once, tables which are present in the cache are returned from it and
+		the remainder are read back to back while holding the connection so
+		no other requests are interleaved with them. Table ids which are only
+		specified in *optional* are read after the required tables.
+
+		If a required table can not be read, the
+		:py:exc:`~c1218.errors.C1218ReadTableError` is raised, errors for
+		optional tables are returned instead.
+
+		:param tableids: The table numbers which must be read.
+		:param optional: The table numbers which may fail to be read.
+		:return: A dictionary of table data keyed by table id, and a
+		  dictionary of the errors for optional tables which could not be read.
+		:rtype: tuple
+		"""
+		optional = frozenset(optional)
+		tableids = list(collections.OrderedDict.fromkeys(tuple(tableids) + tuple(sorted(optional))))
+		tables = collections.OrderedDict()
+		errors = {}
+		if self.caching_enabled:
+			for tableid in tableids:
+				data = self._table_cache.get(tableid)
+				if data is not None:
+					tables[tableid] = data
+			if tables:
+				self.logger.info('returning cached tables #' + ', #'.join(str(tableid) for tableid in tables))
+		with self._lock:
+			for tableid in tableids:
+				if tableid in tables:
+					continue
+				try:
+					tables[tableid] = self.get_table_data(tableid)
+				except C1218ReadTableError as error:
+					if tableid not in optional:
+						raise
+					errors[tableid] = error
+		return tables, errors
+
+	def iter_table_data(self, tableid, chunk_size=None, retries=3, offset=0, octetcount=None):
+		"""
+		Read data from a table in chunks using partial reads, yielding each
+		chunk as it is received. Chunks which fail to be read because the
+		data was corrupted or the device was busy are retried individually.
+		If the first partial read is rejected, the table is read in its
+		entirety and the requested range is yielded as a single chunk. This
+		is the case for tables which are shorter than the chunk and for
+		devices which do not support partial reads, which are then read in
+		their entirety from then on.
+
+		:param int tableid: The table number to read from (0x0000 <= tableid <= 0xffff)
+		:param int chunk_size: The number of octets to request with each read,
+		  if not specified the default of the connection is used, which for
+		  C12.18 is the largest size that fits in the negotiated packets.
+		:param int retries: The number of times to attempt to read each chunk.
+		:param int offset: The offset at which to start to read the data from.
+		:param int octetcount: The number of octets to read, if not specified
+		  the data is read until the end of the table.
+		"""
+		end = None if octetcount is None else offset + octetcount
+		if self._partial_reads_supported is False or (offset == 0 and end is None and self.caching_enabled and tableid in self._table_cache):
+			yield self.get_table_data(tableid)[offset:end]
+			return
+		# whole tables which are read in chunks are cached once complete
+		cached = None
+		if offset == 0 and end is None and self.caching_enabled and tableid in self._table_cache.policies:
+			cached = []
+		if chunk_size is None:
+			chunk_size = self._get_read_chunk_size()
+		chunk_size = min(chunk_size, 0xffff)
+		first_chunk = True
+		while end is None or offset < end:
+			size = chunk_size if end is None else min(chunk_size, end - offset)
+			for attempt in range(1, retries + 1):
+				try:
+					chunk = self.get_table_data(tableid, octetcount=size, offset=offset)
+				except C1218ReadTableError as error:
+					if error.code in (C1218_RESPONSE_CODES['sns'], C1218_RESPONSE_CODES['iar']) and first_chunk:
+						self.logger.info('partial read of table #' + str(tableid) + ' failed, falling back to a full read')
+						data = self.get_table_data(tableid)
+						if error.code == C1218_RESPONSE_CODES['sns']:
+							# only the service not being supported applies to every table
+							self._partial_reads_supported = False
+						yield data[offset:end]
+						return
+					if error.code in (C1218_RESPONSE_CODES['iar'], C1218_RESPONSE_CODES['onp']) and not first_chunk:
+						chunk = b''
+						break
+					if error.code not in (None, C1218_RESPONSE_CODES['bsy'], C1218_RESPONSE_CODES['dnr']) or attempt == retries:
+						raise error
+				except C1218IOError:
+					if attempt == retries:
+						raise
+				else:
+					break
+				self.logger.warning("retrying read of table #{0} at offset {1} (attempt {2} of {3})".format(tableid, offset, attempt + 1, retries))
+			self._partial_reads_supported = True
+			first_chunk = False
+			if len(chunk):
+				if cached is not None:
+					cached.append(chunk)
+				yield chunk
+			offset += len(chunk)
+			if len(chunk) < size:
+				break
+		if cached is not None:
+			self._cache_table(tableid, b''.join(cached))
+
+	def set_table_data_chunked(self, tableid, data, offset=0, chunk_size=None, retries=3, progress=None):
+		"""
+		Write data to a table in chunks using partial writes. Chunks which fail
+		to be written because of a communications error or because the device
+		was busy are retried individually. The progress of the write is
+		recorded after each acknowledged chunk so that if it is interrupted,
+		writing the same data again resumes where it left off. If the device
+		does not support partial writes and the data starts at offset 0, it is
+		written with a single full write.
+
+		:param int tableid: The table number to write to (0x0000 <= tableid <= 0xffff)
+		:param bytes data: The data to write into the table.
+		:param int offset: The offset at which to start to write the data (0x000000 <= octetcount <= 0xffffff).
+		:param int chunk_size: The number of octets to send with each write,
+		  if not specified the default of the connection is used, which for
+		  C12.18 is the largest size that fits in the negotiated packets.
+		:param int retries: The number of times to attempt to write each chunk.
+		:param dict progress: The dictionary to record the progress of the
+		  write in. If not specified, the progress is tracked by the connection.
+		"""
+		if progress is None:
+			progress = self._write_progress.setdefault(tableid, {})
+		digest = hashlib.sha1(data).hexdigest()
+		if (progress.get('tableid'), progress.get('offset'), progress.get('digest')) != (tableid, offset, digest):
+			progress.clear()
+			progress.update(tableid=tableid, offset=offset, digest=digest, written=0)
+		elif progress['written']:
+			self.logger.info("resuming write to table #{0} after {1} of {2} octets".format(tableid, progress['written'], len(data)))
+		if chunk_size is None:
+			chunk_size = self._get_write_chunk_size()
+		chunk_size = min(chunk_size, 0xffff)
+		while progress['written'] < len(data):
+			written = progress['written']
+			chunk = data[written:written + chunk_size]
+			full_write = self._partial_writes_supported is False and offset == 0 and written == 0
+			if full_write:
+				chunk = data
+			for attempt in range(1, retries + 1):
+				try:
+					if full_write:
+						self.set_table_data(tableid, chunk)
+					else:
+						self.set_table_data(tableid, chunk, offset + written)
+				except C1218WriteTableError as error:
+					if error.code in (C1218_RESPONSE_CODES['sns'], C1218_RESPONSE_CODES['iar']) and offset == 0 and written == 0 and self._partial_writes_supported is None:
+						self.logger.info('partial write to table #' + str(tableid) + ' failed, falling back to a full write')
+						self._partial_writes_supported = False
+						chunk = data
+						self.set_table_data(tableid, chunk)
+						break
+					if error.code not in (C1218_RESPONSE_CODES['bsy'], C1218_RESPONSE_CODES['dnr']) or attempt == retries:
+						raise error
+				except C1218IOError:
+					if attempt == retries:
+						raise
+				else:
+					if not full_write:
+						self._partial_writes_supported = True
+					break
+				self.logger.warning("retrying write to table #{0} at offset {1} (attempt {2} of {3})".format(tableid, offset + written, attempt + 1, retries))
+			progress['written'] = written + len(chunk)
+		progress.clear()
+		return
+
+	def run_procedure(self, process_number, std_vs_mfg, params=b''):
+		"""
+		Initiate a C1219 procedure, the request is written to table 7 and
+		the response is read from table 8.
+
+		:param int process_number: The numeric procedure identifier (0 <= process_number <= 2047).
+		:param bool std_vs_mfg: Whether the procedure is manufacturer specified
+		  or not. True is manufacturer specified.
+		:param bytes params: The parameters to pass to the procedure initiation request.
+		:return: A tuple of the result code and the response data.
+		:rtype: tuple
+		"""
+		seqnum = random.randint(2, 254)
+		self.logger.info('starting procedure: ' + str(process_number) + ' (' + hex(process_number) + ') sequence number: ' + str(seqnum) + ' (' + hex(seqnum) + ')')
+		procedure_request = C1219ProcedureInit(self.c1219_endian, process_number, std_vs_mfg, 0, seqnum, params).build()
+		self.set_table_data(7, procedure_request)
+		# procedures can change the contents of any table
+		self._table_cache.invalidate()
+
+		response = self.get_table_data(8)
+		if response[:3] == procedure_request[:3]:
+			return response[3], response[4:]
+		else:
+			self.logger.error('invalid response from procedure response table (table #8)')
+			raise C1219ProcedureError('invalid response from procedure response table (table #8)')
+
+class Connection(TableAccessMixin, ConnectionBase):
 	def __init__(self, *args, **kwargs):
 		"""
 		This is a C12.18 driver for serial connections.  It relies on PySerial
@@ -244,46 +867,56 @@ class Connection(ConnectionBase):
 		  library.  If PySerial is new enough, the serial_for_url function
 		  will be used to allow the user to use a rfc2217 bridge.
 		:param dict c1218_settings: A settings dictionary to configure the C1218
-		  parameters of 'nbrpkts' and 'pktsize'  If not provided the default
-		  settings of 2 (nbrpkts) and 512 (pktsize) will be used.
+		  parameters of 'nbrpkts', 'pktsize' and 'baudrate'  If not provided the
+		  default settings of 2 (nbrpkts), 512 (pktsize) and 9600 (baudrate)
+		  will be used.
 		:param dict serial_settings: A PySerial settings dictionary to be applied to
 		  the serial connection instance.
 		:param bool toggle_control: Enables or disables automatically settings
 		  the toggle bit in C12.18 frames.
-		:param bool enable_cache: Cache specific, read only tables in memory,
-		  the first time the table is read it will be stored for retreival
-		  on subsequent requests.  This is enabled only for specific tables
-		  (currently only 0 and 1).
+		:param bool enable_cache: Cache tables in memory according to their
+		  policies (see :py:class:`~c1218.cache.TableCache`), the first time a
+		  table is read it will be stored for retrieval on subsequent requests.
+		:param int cache_size: The maximum number of bytes of table data to cache.
+		:param str cache_directory: A directory in which to persist the static
+		  tables of each device between connections.
+		:param float keepalive: If set, send wait requests in the background
+		  to keep the session open once it has been idle for this fraction of
+		  the channel traffic timeout (see :py:meth:`.start_keepalive`).
+		:param float channel_timeout: The channel traffic timeout of the device
+		  in seconds, used with *keepalive*.
 		"""
 		enable_cache = kwargs.pop('enable_cache', True)
+		cache_size = kwargs.pop('cache_size', DEFAULT_CACHE_SIZE)
+		cache_directory = kwargs.pop('cache_directory', None)
+		self.keepalive = kwargs.pop('keepalive', None)
+		self.channel_timeout = kwargs.pop('channel_timeout', CHANNEL_TRAFFIC_TIMEOUT)
 		super(Connection, self).__init__(*args, **kwargs)
-		self.caching_enabled = enable_cache
-		self._cacheable_tables = [0, 1]
-		self._table_cache = {}
-		if enable_cache:
-			self.logger.info('selective table caching has been enabled')
+		self._init_table_cache(enable_cache, cache_size, cache_directory)
+		self._session_resumed = False
+		self._credentials = None
 
-	def flush_table_cache(self):
-		self.logger.info('flushing all cached tables')
-		self._table_cache = {}
+	def close(self, force_stop=False):
+		self._table_cache.save()
+		return super(Connection, self).close(force_stop)
 
-	def set_table_cache_policy(self, cache_policy):
-		if self.caching_enabled == cache_policy:
-			return
-		self.caching_enabled = cache_policy
-		if cache_policy:
-			self.logger.info('selective table caching has been enabled')
-		else:
-			self.flush_table_cache()
-			self.logger.info('selective table caching has been disabled')
-		return
+	def _get_read_chunk_size(self):
+		return self.c1218_session_nbrpkts * (self.c1218_session_pktsize - PACKET_OVERHEAD) - READ_RESPONSE_OVERHEAD
+
+	def _get_write_chunk_size(self):
+		return self.c1218_session_nbrpkts * (self.c1218_session_pktsize - PACKET_OVERHEAD) - WRITE_REQUEST_OVERHEAD
 
 	def start(self):
 		"""
-		Send an identity request and then a negotiation request.
+		Send an identity request and then a negotiation request. The packet
+		size, number of packets and baud rate accepted by the device are
+		adopted as the limits for the session. If a different baud rate was
+		agreed upon, the serial connection is switched to it once the
+		negotiate response has been acknowledged.
 		"""
 		self.serial_h.flushOutput()
 		self.serial_h.flushInput()
+		self._rx_discard()
 		self.send(C1218IdentRequest())
 		data = self.recv()
 		if data[0] != 0x00:
@@ -291,12 +924,32 @@ class Connection(ConnectionBase):
 			return False
 
 		self._initialized = True
-		self.send(C1218NegotiateRequest(self.c1218_pktsize, self.c1218_nbrpkts, baudrate=9600))
+		self.send(C1218NegotiateRequest(self.c1218_pktsize, self.c1218_nbrpkts, baudrate=self.c1218_baudrate))
 		data = self.recv()
 		if data[0] != 0x00:
 			self.logger.error('received incorrect response to negotiate service request')
 			self.stop()
 			raise C1218NegotiateError('received incorrect response to negotiate service request', data[0])
+		if len(data) < 4:
+			self.logger.error('received truncated response to negotiate service request')
+			self.stop()
+			raise C1218NegotiateError('received truncated response to negotiate service request')
+		pktsize, nbrpkts = struct.unpack('>HB', data[1:4])
+		if not PACKET_OVERHEAD < pktsize <= self.c1218_pktsize or not 0 < nbrpkts <= self.c1218_nbrpkts:
+			self.logger.warning("device negotiated invalid parameters (pktsize: {0} nbrpkts: {1}), using the requested values".format(pktsize, nbrpkts))
+			pktsize = self.c1218_pktsize
+			nbrpkts = self.c1218_nbrpkts
+		self.c1218_session_pktsize = pktsize
+		self.c1218_session_nbrpkts = nbrpkts
+		self.logger.info("negotiated session parameters, pktsize: {0} nbrpkts: {1}".format(pktsize, nbrpkts))
+		if len(data) > 4:
+			baudrate = next((rate for rate, code in C1218_BAUDRATE_CODES.items() if code == data[4]), None)
+			if baudrate is None:
+				self.logger.warning("device negotiated an unknown baud rate code: {0}".format(data[4]))
+			elif baudrate != self.serial_h.baudrate:
+				self.set_baudrate(baudrate)
+		if self.keepalive:
+			self.start_keepalive(self.keepalive, self.channel_timeout)
 		return True
 
 	def stop(self, force=False):
@@ -305,15 +958,66 @@ class Connection(ConnectionBase):
 
 		:param bool force: ignore the remote devices response
 		"""
+		self.stop_keepalive()
+		# the next session may be with a different device
+		self._table_cache.save()
+		self._table_cache.clear()
 		if self._initialized:
-			self.send(C1218TerminateRequest())
-			data = self.recv()
+			try:
+				self.send(C1218TerminateRequest())
+				data = self.recv()
+			except C1218IOError:
+				if not force:
+					raise
+				self.logger.warning('the device did not respond to the terminate request')
+				data = None
 			if data == b'\x00' or force:
 				self._initialized = False
+				self.logged_in = False
 				self._toggle_bit = False
+				self.c1218_session_pktsize = DEFAULT_PACKET_SIZE
+				self.c1218_session_nbrpkts = DEFAULT_NUMBER_PACKETS
+				if self.serial_h.baudrate != self._base_baudrate:
+					self.set_baudrate(self._base_baudrate)
 				return True
 		return False
 
+	def resume_session(self):
+		"""
+		Mark the current session as being resumed after a period in which it
+		may have been terminated by the device, such as when it is reused
+		between module runs. If the device rejects the next request because
+		the session is no longer active, the session is re-established and
+		logged into again before the request is retried.
+		"""
+		self._session_resumed = True
+
+	def _request(self, request):
+		with self._lock:
+			if not self._session_resumed:
+				self.send(request)
+				return self.recv()
+			self._session_resumed = False
+			try:
+				self.send(request)
+				data = self.recv()
+			except C1218IOError:
+				data = None
+			if data is not None and data[:1] != struct.pack('B', C1218_RESPONSE_CODES['isss']):
+				return data
+			self.logger.warning('the device rejected the resumed session, re-establishing it')
+			self._restart_session()
+			self.send(request)
+			return self.recv()
+
+	def _restart_session(self):
+		credentials = self._credentials if self.logged_in else None
+		self.stop(force=True)
+		if not self.start():
+			raise C1218IOError('failed to re-establish the session')
+		if credentials is not None and not self.login(*credentials):
+			raise C1218IOError('failed to log in after re-establishing the session')
+
 	def login(self, username='0000', userid=0, password=None):
 		"""
 		Log into the connected device.
@@ -327,8 +1031,7 @@ class Connection(ConnectionBase):
 			self.logger.error('password longer than 20 characters received')
 			raise Exception('password longer than 20 characters, login failed')
 
-		self.send(C1218LogonRequest(username, userid))
-		data = self.recv()
+		data = self._request(C1218LogonRequest(username, userid))
 		if data != b'\x00':
 			self.logger.warning('login failed, username and user id rejected')
 			return False
@@ -341,6 +1044,7 @@ class Connection(ConnectionBase):
 				return False
 
 		self.logged_in = True
+		self._credentials = (username, userid, password)
 		return True
 
 	def logoff(self):
@@ -349,10 +1053,10 @@ class Connection(ConnectionBase):
 
 		:rtype: bool
 		"""
-		self.send(C1218LogoffRequest())
-		data = self.recv()
+		data = self._request(C1218LogoffRequest())
 		if data == b'\x00':
 			self._initialized = False
+			self.logged_in = False
 			return True
 		return False
 
@@ -366,11 +1070,13 @@ class Connection(ConnectionBase):
 		  the meter supports this type of reading.
 		:param int offset: The offset at which to start to read the data from.
 		"""
-		if self.caching_enabled and tableid in self._cacheable_tables and tableid in self._table_cache.keys():
-			self.logger.info('returning cached table #' + str(tableid))
-			return self._table_cache[tableid]
-		self.send(C1218ReadRequest(tableid, offset, octetcount))
-		data = self.recv()
+		partial = octetcount is not None or offset is not None
+		if self.caching_enabled and not partial:
+			data = self._table_cache.get(tableid)
+			if data is not None:
+				self.logger.info('returning cached table #' + str(tableid))
+				return data
+		data = self._request(C1218ReadRequest(tableid, offset, octetcount))
 		status = data[0]
 		if status != 0x00:
 			status = status
@@ -393,9 +1099,8 @@ class Connection(ConnectionBase):
 			self.logger.error('could not read table id: ' + str(tableid) + ', error: data read was corrupt, invalid check sum')
 			raise C1218ReadTableError('could not read table id: ' + str(tableid) + ', error: data read was corrupt, invalid checksum')
 
-		if self.caching_enabled and tableid in self._cacheable_tables and not tableid in self._table_cache.keys():
-			self.logger.info('caching table #' + str(tableid))
-			self._table_cache[tableid] = data
+		if self.caching_enabled and not partial:
+			self._cache_table(tableid, data)
 		return data
 
 	def set_table_data(self, tableid, data, offset=None):
@@ -406,35 +1111,11 @@ class Connection(ConnectionBase):
 		:param str data: The data to write into the table.
 		:param int offset: The offset at which to start to write the data (0x000000 <= octetcount <= 0xffffff).
 		"""
-		self.send(C1218WriteRequest(tableid, data, offset))
-		data = self.recv()
+		self._table_cache.invalidate(tableid)
+		data = self._request(C1218WriteRequest(tableid, data, offset))
 		if data[0] != 0x00:
 			status = data[0]
 			details = (C1218_RESPONSE_CODES.get(status) or 'unknown response code')
 			self.logger.error('could not write data to the table, error: ' + details)
 			raise C1218WriteTableError('could not write data to the table, error: ' + details, status)
 		return
-
-	def run_procedure(self, process_number, std_vs_mfg, params=''):
-		"""
-		Initiate a C1219 procedure, the request is written to table 7 and
-		the response is read from table 8.
-
-		:param int process_number: The numeric procedure identifier (0 <= process_number <= 2047).
-		:param bool std_vs_mfg: Whether the procedure is manufacturer specified
-		  or not. True is manufacturer specified.
-		:param bytes params: The parameters to pass to the procedure initiation request.
-		:return: A tuple of the result code and the response data.
-		:rtype: tuple
-		"""
-		seqnum = random.randint(2, 254)
-		self.logger.info('starting procedure: ' + str(process_number) + ' (' + hex(process_number) + ') sequence number: ' + str(seqnum) + ' (' + hex(seqnum) + ')')
-		procedure_request = C1219ProcedureInit(self.c1219_endian, process_number, std_vs_mfg, 0, seqnum, params).build()
-		self.set_table_data(7, procedure_request)
-
-		response = self.get_table_data(8)
-		if response[:3] == procedure_request[:3]:
-			return response[3], response[4:]
-		else:
-			self.logger.error('invalid response from procedure response table (table #8)')
-			raise C1219ProcedureError('invalid response from procedure response table (table #8)')
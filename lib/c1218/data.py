@@ -35,11 +35,43 @@ from __future__ import unicode_literals
 import binascii
 import struct
 
-from c1218.utilities import check_data_checksum, data_checksum, packet_checksum
+from c1218.utilities import check_data_checksum, data_checksum, packet_checksum, packet_checksum_into
 
 ACK = b'\x06'
 NACK = b'\x15'
 
+CONTROL_MULTI_PACKET = 0x80
+CONTROL_FIRST_PACKET = 0x40
+CONTROL_TOGGLE = 0x20
+
+FRAME_HEADER_SIZE = 6  # start, identity, control, sequence and length (2)
+PACKET_OVERHEAD = FRAME_HEADER_SIZE + 2  # header and crc (2)
+MAX_PAYLOAD_SIZE = 8183
+READ_RESPONSE_OVERHEAD = 4  # status, count (2) and checksum
+WRITE_REQUEST_OVERHEAD = 9  # service, table id (2), offset (3), count (2) and checksum
+DEFAULT_PACKET_SIZE = 64
+DEFAULT_NUMBER_PACKETS = 1
+DEFAULT_BAUDRATE = 9600
+
+# link layer timeouts in seconds
+ACK_TIMEOUT = 2.0
+RESPONSE_TIMEOUT = 2.0
+INTER_CHARACTER_TIMEOUT = 0.5
+CHANNEL_TRAFFIC_TIMEOUT = 6.0
+
+C1218_BAUDRATE_CODES = {
+	300: 1,
+	600: 2,
+	1200: 3,
+	2400: 4,
+	4800: 5,
+	9600: 6,
+	14400: 7,
+	19200: 8,
+	28800: 9,
+	57600: 10,
+}
+
 C1218_RESPONSE_CODES = {
 	0: 'ok (Acknowledge)',
 	1: 'err (Error)',
@@ -66,7 +98,32 @@ C1218_RESPONSE_CODES = {
 	'isss': 10,
 }
 
+# the fields of each request are packed with precompiled structures, the
+# three byte offsets are split into the high byte and the low word
+_UINT8 = struct.Struct('B')
+_FRAME_HEADER = struct.Struct('>BBBBH')
+_LOGON_REQUEST = struct.Struct('>BH10s')
+_SECURITY_REQUEST = struct.Struct('>B20s')
+_NEGOTIATE_REQUEST = struct.Struct('>BHB')
+_NEGOTIATE_BAUD_REQUEST = struct.Struct('>BHBB')
+_WAIT_REQUEST = struct.Struct('>BB')
+_READ_REQUEST = struct.Struct('>BH')
+_READ_PARTIAL_REQUEST = struct.Struct('>BHBHH')
+_WRITE_REQUEST = struct.Struct('>BHH')
+_WRITE_PARTIAL_REQUEST = struct.Struct('>BHBHH')
+
+def _to_byte(value):
+	if isinstance(value, int):
+		return value
+	return _UINT8.unpack(value)[0]
+
 class C1218Request(object):
+	"""
+	The base class for C12.18 requests. The data of a request is built the
+	first time that it is needed and then reused until one of the fields of
+	the request is changed.
+	"""
+	__slots__ = ('_frame',)
 	def __repr__(self):
 		return '<' + self.__class__.__name__ + ' >'
 
@@ -77,6 +134,12 @@ class C1218Request(object):
 		return len(self.build())
 
 	def build(self):
+		frame = self._frame
+		if frame is None:
+			frame = self._frame = self._build()
+		return frame
+
+	def _build(self):
 		raise NotImplementedError('no build method defined')
 
 	@classmethod
@@ -97,15 +160,17 @@ class C1218Request(object):
 		return name[5:-7]
 
 class C1218LogonRequest(C1218Request):
+	__slots__ = ('_userid', '_username')
 	logon = b'\x50'
 	def __init__(self, username='', userid=0):
-		self._userid = b'\x00\x00'
+		self._frame = None
+		self._userid = 0
 		self._username = b'\x20\x20\x20\x20\x20\x20\x20\x20\x20\x20'
 		self.set_username(username)
 		self.set_userid(userid)
 
-	def build(self):
-		return self.logon + self._userid + self._username
+	def _build(self):
+		return _LOGON_REQUEST.pack(0x50, self._userid, self._username)
 
 	@classmethod
 	def from_bytes(cls, data):
@@ -113,8 +178,7 @@ class C1218LogonRequest(C1218Request):
 			raise Exception('invalid data (size)')
 		if data[0] != 0x50:
 			raise Exception('invalid start byte')
-		userid = struct.unpack('>H', data[1:3])[0]
-		username = data[3:]
+		_, userid, username = _LOGON_REQUEST.unpack(data)
 		return cls(username, userid)
 
 	def set_userid(self, userid):
@@ -124,11 +188,12 @@ class C1218LogonRequest(C1218Request):
 			ValueError('userid must be between 0x0000 and 0xffff')
 		if not 0x0000 <= userid <= 0xffff:
 			raise ValueError('userid must be between 0x0000 and 0xffff')
-		self._userid = struct.pack('>H', userid)
+		self._userid = userid
+		self._frame = None
 
 	@property
 	def userid(self):
-		return struct.unpack('>H', self._userid)[0]
+		return self._userid
 
 	def set_username(self, value):
 		if len(value) > 10:
@@ -136,19 +201,22 @@ class C1218LogonRequest(C1218Request):
 		if not isinstance(value, bytes):
 			value = value.encode('utf-8')
 		self._username = value + (b'\x20' * (10 - len(value)))
+		self._frame = None
 
 	@property
 	def username(self):
 		return self._username
 
 class C1218SecurityRequest(C1218Request):
+	__slots__ = ('_password',)
 	security = b'\x51'
 	def __init__(self, password=''):
+		self._frame = None
 		self._password = b'\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00'
 		self.set_password(password)
 
-	def build(self):
-		return self.security + self._password
+	def _build(self):
+		return _SECURITY_REQUEST.pack(0x51, self._password)
 
 	@classmethod
 	def from_bytes(cls, data):
@@ -165,12 +233,14 @@ class C1218SecurityRequest(C1218Request):
 		if not isinstance(value, bytes):
 			value = value.encode('utf-8')
 		self._password = value + (b'\x00' * (20 - len(value)))
+		self._frame = None
 
 	@property
 	def password(self):
 		return self._password
 
 class C1218LogoffRequest(C1218Request):
+	__slots__ = ()
 	logoff = b'\x52'
 	def build(self):
 		return self.logoff
@@ -184,20 +254,22 @@ class C1218LogoffRequest(C1218Request):
 		return cls()
 
 class C1218NegotiateRequest(C1218Request):
-	negotiate = b'\x60'
+	__slots__ = ('_code', '_pktsize', '_nbrpkt', '_baudrate')
 	def __init__(self, pktsize, nbrpkt, baudrate=None):
-		self._pktsize = b'\x01\x00'
+		self._frame = None
+		self._code = 0x60
+		self._pktsize = 256
 		self._nbrpkt = 1
-		self._baudrate = b''
+		self._baudrate = None
 		self.set_pktsize(pktsize)
 		self.set_nbrpkt(nbrpkt)
 		if baudrate:
 			self.set_baudrate(baudrate)
 
-	def build(self):
-		pktsize = struct.pack('>H', self._pktsize)
-		nbrpkt = struct.pack('B', self._nbrpkt)
-		return self.negotiate + pktsize + nbrpkt + self._baudrate
+	def _build(self):
+		if self._baudrate is None:
+			return _NEGOTIATE_REQUEST.pack(self._code, self._pktsize, self._nbrpkt)
+		return _NEGOTIATE_BAUD_REQUEST.pack(self._code, self._pktsize, self._nbrpkt, self._baudrate)
 
 	@classmethod
 	def from_bytes(cls, data):
@@ -219,33 +291,60 @@ class C1218NegotiateRequest(C1218Request):
 			if baudrate == 0 or baudrate > 10:
 				raise Exception('invalid data (invalid baudrate)')
 		request = cls(pktsize, nbrpkt, baudrate)
-		request.negotiate = struct.pack('B', data[0])
+		request.negotiate = data[0]
 		return request
 
+	@property
+	def negotiate(self):
+		return _UINT8.pack(self._code)
+
+	@negotiate.setter
+	def negotiate(self, value):
+		self._code = _to_byte(value)
+		self._frame = None
+
 	def set_pktsize(self, pktsize):
 		self._pktsize = pktsize
+		self._frame = None
+
+	@property
+	def pktsize(self):
+		return self._pktsize
 
 	def set_nbrpkt(self, nbrpkt):
 		self._nbrpkt = nbrpkt
+		self._frame = None
+
+	@property
+	def nbrpkt(self):
+		return self._nbrpkt
 
 	def set_baudrate(self, baudrate):
-		c1218_baudrate_codes = {300: 1, 600: 2, 1200: 3, 2400: 4, 4800: 5, 9600: 6, 14400: 7, 19200: 8, 28800: 9, 57600: 10}
-		if baudrate in c1218_baudrate_codes:
-			self._baudrate = struct.pack('B', c1218_baudrate_codes[baudrate])
+		if baudrate in C1218_BAUDRATE_CODES:
+			self._baudrate = C1218_BAUDRATE_CODES[baudrate]
 		elif 0 < baudrate < 11:
-			self._baudrate = struct.pack('B', baudrate)
+			self._baudrate = baudrate
 		else:
 			raise Exception('invalid data (invalid baudrate)')
-		self.negotiate = b'\x61'
+		self._code = 0x61
+		self._frame = None
+
+	@property
+	def baudrate(self):
+		if self._baudrate is None:
+			return None
+		return next(rate for rate, rate_code in C1218_BAUDRATE_CODES.items() if rate_code == self._baudrate)
 
 class C1218WaitRequest(C1218Request):
+	__slots__ = ('_time',)
 	wait = b'\x70'
 	def __init__(self, time=1):
-		self._time = b'\x01'
+		self._frame = None
+		self._time = 1
 		self.set_time(time)
 
-	def build(self):
-		return self.wait + self._time
+	def _build(self):
+		return _WAIT_REQUEST.pack(0x70, self._time)
 
 	@classmethod
 	def from_bytes(cls, data):
@@ -256,9 +355,13 @@ class C1218WaitRequest(C1218Request):
 		return cls(data[1])
 
 	def set_time(self, time):
-		self._time = struct.pack('B', time)
+		if not 0x00 <= time <= 0xff:
+			raise ValueError('time must be between 0x00 and 0xff')
+		self._time = time
+		self._frame = None
 
 class C1218IdentRequest(C1218Request):
+	__slots__ = ()
 	ident = b'\x20'
 	def build(self):
 		return self.ident
@@ -272,6 +375,7 @@ class C1218IdentRequest(C1218Request):
 		return cls()
 
 class C1218TerminateRequest(C1218Request):
+	__slots__ = ()
 	terminate = b'\x21'
 	def build(self):
 		return self.terminate
@@ -285,19 +389,22 @@ class C1218TerminateRequest(C1218Request):
 		return cls()
 
 class C1218ReadRequest(C1218Request):
-	read = b'\x30'
+	__slots__ = ('_code', '_tableid', '_offset', '_octetcount')
 	def __init__(self, tableid, offset=None, octetcount=None):
-		self._tableid = b'\x00\x01'
-		self._offset = b''
-		self._octetcount = b''
+		self._frame = None
+		self._code = 0x30
+		self._tableid = 1
+		self._offset = None
+		self._octetcount = None
 		self.set_tableid(tableid)
 		if offset is not None or octetcount is not None:
-			self.read = b'\x3f'
 			self.set_offset(offset or 0)
 			self.set_octetcount(octetcount or 0)
 
-	def build(self):
-		return self.read + self._tableid + self._offset + self._octetcount
+	def _build(self):
+		if self._code == 0x30:
+			return _READ_REQUEST.pack(0x30, self._tableid)
+		return _READ_PARTIAL_REQUEST.pack(self._code, self._tableid, (self._offset or 0) >> 16, (self._offset or 0) & 0xffff, self._octetcount or 0)
 
 	@classmethod
 	def from_bytes(cls, data):
@@ -305,68 +412,81 @@ class C1218ReadRequest(C1218Request):
 			raise Exception('invalid data (size)')
 		if data[0] != 0x30 and data[0] != 0x3f:
 			raise Exception('invalid start byte')
-		tableid = struct.unpack('>H', data[1:3])[0]
 		if data[0] == 0x30:
+			tableid = _READ_REQUEST.unpack_from(data)[1]
 			offset = None
 			octetcount = None
 		elif data[0] == 0x3f:
-			offset = struct.unpack('>I', b'\x00' + data[3:6])[0]
-			octetcount = struct.unpack('>H', data[6:8])[0]
+			_, tableid, offset_high, offset_low, octetcount = _READ_PARTIAL_REQUEST.unpack_from(data)
+			offset = (offset_high << 16) | offset_low
 		request = cls(tableid, offset, octetcount)
-		request.read = struct.pack('B', data[0])
+		request.read = data[0]
 		return request
 
+	@property
+	def read(self):
+		return _UINT8.pack(self._code)
+
+	@read.setter
+	def read(self, value):
+		self._code = _to_byte(value)
+		self._frame = None
+
 	def set_tableid(self, tableid):
-		self._tableid = struct.pack('>H', tableid)
+		if not 0x0000 <= tableid <= 0xffff:
+			raise ValueError('tableid must be between 0x0000 and 0xffff')
+		self._tableid = tableid
+		self._frame = None
 
 	@property
 	def tableid(self):
-		return struct.unpack('>H', self._tableid)[0]
+		return self._tableid
 
 	def set_offset(self, offset):
-		if self._octetcount and self._offset:
-			self.read = b'\x3f'
-		self._offset = struct.pack('>I', (offset & 0xffffff))[1:]
+		self._code = 0x3f
+		self._offset = offset & 0xffffff
+		self._frame = None
 
 	@property
 	def offset(self):
-		if self._offset == b'':
-			return None
-		return struct.unpack('>I', b'\x00' + self._offset)[0]
+		return self._offset
 
 	def set_octetcount(self, octetcount):
-		if self._octetcount and self._offset:
-			self.read = b'\x3f'
-		self._octetcount = struct.pack('>H', octetcount)
+		self._code = 0x3f
+		self._octetcount = octetcount
+		self._frame = None
 
 	@property
 	def octetcount(self):
-		if self._octetcount == b'':
-			return None
-		return struct.unpack('>H', self._octetcount)[0]
+		return self._octetcount
 
 class C1218WriteRequest(C1218Request):
-	write = b'\x40'
+	__slots__ = ('_code', '_tableid', '_offset', '_data')
 	def __init__(self, tableid, data, offset=None):
-		self._tableid = b'\x00\x01'
-		self._offset = b''
-		self._datalen = b'\x00\x00'
+		self._frame = None
+		self._code = 0x40
+		self._tableid = 1
+		self._offset = None
 		self._data = b''
-		self._crc8 = b''
 		self.set_tableid(tableid)
 		self.set_data(data)
 		if offset is not None:
-			self.write = b'\x4f'
 			self.set_offset(offset)
 
-	def build(self):
-		packet = self.write
-		packet += self._tableid
-		packet += self._offset
-		packet += self._datalen
-		packet += self._data
-		packet += data_checksum(self._data)
-		return packet
+	def _build(self):
+		data = self._data
+		if self._code == 0x40:
+			header = _WRITE_REQUEST
+			fields = (0x40, self._tableid, len(data))
+		else:
+			header = _WRITE_PARTIAL_REQUEST
+			fields = (self._code, self._tableid, (self._offset or 0) >> 16, (self._offset or 0) & 0xffff, len(data))
+		end = header.size + len(data)
+		packet = bytearray(end + 1)
+		header.pack_into(packet, 0, *fields)
+		packet[header.size:end] = data
+		packet[end] = data_checksum(data)[0]
+		return bytes(packet)
 
 	@classmethod
 	def from_bytes(cls, data):
@@ -382,43 +502,64 @@ class C1218WriteRequest(C1218Request):
 		elif data[0] == 0x4f:
 			table_data = data[8:-1]
 			offset = struct.unpack('>I', b'\x00' + data[3:6])[0]
-		if check_data_checksum(table_data, chksum):
+		if not check_data_checksum(table_data, chksum):
 			raise Exception('invalid check sum')
 		request = cls(tableid, table_data, offset=offset)
 		request.write = data[0]
 		return request
 
+	@property
+	def write(self):
+		return _UINT8.pack(self._code)
+
+	@write.setter
+	def write(self, value):
+		self._code = _to_byte(value)
+		self._frame = None
+
 	def set_tableid(self, tableid):
-		self._tableid = struct.pack('>H', tableid)
+		if not 0x0000 <= tableid <= 0xffff:
+			raise ValueError('tableid must be between 0x0000 and 0xffff')
+		self._tableid = tableid
+		self._frame = None
 
 	@property
 	def tableid(self):
-		return struct.unpack('>H', self._tableid)[0]
+		return self._tableid
 
 	def set_offset(self, offset):
-		self._offset = struct.pack('>I', (offset & 0xffffff))[1:]
+		self._code = 0x4f
+		self._offset = offset & 0xffffff
+		self._frame = None
 
 	@property
 	def offset(self):
-		if self._offset == b'':
-			return None
-		return struct.unpack('>I', b'\x00' + self._offset)[0]
+		return self._offset
 
 	def set_data(self, data):
+		if not isinstance(data, bytes):
+			data = bytes(data)
 		self._data = data
-		self._datalen = struct.pack('>H', len(data))
+		self._frame = None
 
 	@property
 	def data(self):
 		return self._data
 
 class C1218Packet(C1218Request):
+	"""
+	A C12.18 packet which frames the data of a request or response. The
+	header, payload and CRC are written into a single buffer when the packet
+	is built and the result is reused until one of the fields is changed.
+	"""
+	__slots__ = ('_identity', '_control', '_sequence', '_length', '_data')
 	start = b'\xee'
-	identity = b'\x00'
-	control = b'\x00'
-	sequence = b'\x00'
 	def __init__(self, data=None, control=None, length=None):
-		self._length = b'\x00\x00'  # can never exceed 8183
+		self._frame = None
+		self._identity = 0
+		self._control = 0
+		self._sequence = 0
+		self._length = 0  # can never exceed MAX_PAYLOAD_SIZE
 		self._data = b''
 		if data:
 			self.set_data(data)
@@ -432,7 +573,7 @@ class C1218Packet(C1218Request):
 			repr_data = repr(self._data)
 		else:
 			repr_data = '0x' + binascii.b2a_hex(self._data).decode('utf-8')
-		crc = binascii.b2a_hex(packet_checksum(self.start + self.identity + self.control + self.sequence + self._length + self._data)).decode('utf-8')
+		crc = binascii.b2a_hex(self.build()[-2:]).decode('utf-8')
 		return '<C1218Packet data=' + repr_data + ' data_len=' + str(len(self._data)) + ' crc=0x' + crc + ' >'
 
 	@property
@@ -443,56 +584,125 @@ class C1218Packet(C1218Request):
 	def data(self, value):
 		self.set_data(value)
 
+	@property
+	def identity(self):
+		return _UINT8.pack(self._identity)
+
+	@identity.setter
+	def identity(self, value):
+		self._identity = _to_byte(value)
+		self._frame = None
+
+	@property
+	def control(self):
+		return _UINT8.pack(self._control)
+
+	@control.setter
+	def control(self, value):
+		self.set_control(value)
+
+	@property
+	def sequence(self):
+		return _UINT8.pack(self._sequence)
+
+	@sequence.setter
+	def sequence(self, value):
+		self.set_sequence(value)
+
 	@classmethod
 	def from_bytes(cls, data):
 		if len(data) < 8:
 			raise Exception('invalid data (size)')
 		if data[0] != 0xee:
 			raise Exception('invalid start byte')
-		identity = data[1]
-		control = data[2]
-		sequence = data[3]
-		length = struct.unpack('>H', data[4:6])[0]
+		_, identity, control, sequence, length = _FRAME_HEADER.unpack_from(data)
 		chksum = data[-2:]
 		if packet_checksum(data[:-2]) != chksum:
 			raise Exception('invalid check sum')
 		data = data[6:-2]
 		frame = C1218Packet(data, control, length)
-		frame.identity = struct.pack('B', identity)
-		frame.sequence = struct.pack('B', sequence)
+		frame._identity = identity
+		frame._sequence = sequence
 		return frame
 
+	@classmethod
+	def segment(cls, data, max_payload):
+		"""
+		Split data into the packets of a transmission, data which does not
+		fit into a single packet is split into a multi-packet transmission
+		with the control and sequence fields set.
+
+		:param data: The data to be transmitted.
+		:type data: str, :py:class:`~c1218.data.C1218Request`
+		:param int max_payload: The maximum payload size of each packet.
+		:rtype: list
+		"""
+		if isinstance(data, C1218Request):
+			data = data.build()
+		elif not isinstance(data, bytes):
+			data = data.encode('utf-8')
+		if len(data) <= max_payload:
+			return [cls(data)]
+		chunks = [data[offset:offset + max_payload] for offset in range(0, len(data), max_payload)]
+		packets = []
+		for idx, chunk in enumerate(chunks):
+			packet = cls(chunk)
+			control = CONTROL_MULTI_PACKET
+			if idx == 0:
+				control |= CONTROL_FIRST_PACKET
+			packet.set_control(control)
+			packet.set_sequence(len(chunks) - idx - 1)
+			packets.append(packet)
+		return packets
+
 	def set_control(self, control):
-		if isinstance(control, int):
-			if not (0x00 < control < 0xff):
-				raise ValueError('control must be between 0x00 and 0xff')
-			control = struct.pack('B', control)
-		if not isinstance(control, bytes):
+		if isinstance(control, bytes):
+			if len(control) != 1:
+				raise ValueError('control must be a single byte')
+			control = control[0]
+		if not isinstance(control, int):
 			raise ValueError('control must be an int or bytes instance')
-		self.control = control
+		if not (0x00 <= control <= 0xff):
+			raise ValueError('control must be between 0x00 and 0xff')
+		self._control = control
+		self._frame = None
+
+	def set_sequence(self, sequence):
+		if isinstance(sequence, bytes):
+			if len(sequence) != 1:
+				raise ValueError('sequence must be a single byte')
+			sequence = sequence[0]
+		if not isinstance(sequence, int):
+			raise ValueError('sequence must be an int or bytes instance')
+		if not (0x00 <= sequence <= 0xff):
+			raise ValueError('sequence must be between 0x00 and 0xff')
+		self._sequence = sequence
+		self._frame = None
 
 	def set_data(self, data):
 		if isinstance(data, C1218Request):
 			data = data.build()
+		elif isinstance(data, (bytearray, memoryview)):
+			data = bytes(data)
 		elif not isinstance(data, bytes):
 			data = data.encode('utf-8')
 		self._data = data
 		self.set_length(len(self._data))
 
 	def set_length(self, length):
-		if length > 8183:
-			raise ValueError('length can not exceed 8183')
-		self._length = struct.pack('>H', length)
-
-	def build(self):
-		packet = self.start
-		packet += self.identity
-		packet += self.control
-		packet += self.sequence
-		packet += self._length
-		packet += self._data
-		packet += packet_checksum(packet)
-		return packet
+		if length > MAX_PAYLOAD_SIZE:
+			raise ValueError('length can not exceed ' + str(MAX_PAYLOAD_SIZE))
+		self._length = length
+		self._frame = None
+
+	def _build(self):
+		data = self._data
+		end = FRAME_HEADER_SIZE + len(data)
+		packet = bytearray(end + 2)
+		_FRAME_HEADER.pack_into(packet, 0, 0xee, self._identity, self._control, self._sequence, self._length)
+		packet[FRAME_HEADER_SIZE:end] = data
+		packet_checksum_into(packet, end)
+		return bytes(packet)
 
 C1218_REQUEST_IDS = {
 	0x20: C1218IdentRequest,
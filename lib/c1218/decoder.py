@@ -0,0 +1,216 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  c1218/decoder.py
+#
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are
+#  met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following disclaimer
+#    in the documentation and/or other materials provided with the
+#    distribution.
+#  * Neither the name of the project nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+#  "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+#  LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+#  A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+#  OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+#  SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+#  LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+#  DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+#  THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+#  (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+#  OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+
+from __future__ import unicode_literals
+
+import collections
+import re
+import struct
+
+from c1218.data import ACK, NACK, FRAME_HEADER_SIZE, MAX_PAYLOAD_SIZE, PACKET_OVERHEAD
+from c1218.utilities import packet_checksum
+
+_FRAME_HEADER = struct.Struct('>xBBBH')
+_SIGNIFICANT_BYTE = re.compile(b'[\\x06\\x15\\xee]')
+
+class Frame(collections.namedtuple('Frame', ('identity', 'control', 'sequence', 'payload', 'crc', 'valid', 'data'))):
+	"""
+	A C12.18 frame which was decoded by a :py:class:`.FrameDecoder`.
+
+	.. py:attribute:: identity
+
+		The identity field of the frame.
+
+	.. py:attribute:: control
+
+		The control field of the frame.
+
+	.. py:attribute:: sequence
+
+		The sequence number of the frame.
+
+	.. py:attribute:: payload
+
+		The payload data of the frame.
+
+	.. py:attribute:: crc
+
+		The CRC as it was received at the end of the frame.
+
+	.. py:attribute:: valid
+
+		Whether or not the CRC matches the rest of the frame.
+
+	.. py:attribute:: data
+
+		The raw bytes of the entire frame.
+	"""
+	__slots__ = ()
+
+class FrameDecoder(object):
+	"""
+	An incremental decoder for a stream of C12.18 data which performs no I/O
+	of its own. Data is passed to :py:meth:`.feed` in whatever chunks the
+	transport produces it in and each call returns the items which were
+	completed by it. Items are either :py:class:`.Frame` instances or the
+	bare :py:data:`~c1218.data.ACK` and :py:data:`~c1218.data.NACK` bytes
+	which are sent in response to frames. Any other data which is received
+	outside of a frame is discarded.
+
+	Frames with an invalid CRC are returned with their *valid* attribute set
+	to False. If a later start byte within such a frame begins a complete
+	frame with a valid CRC, decoding resumes from it, otherwise the entire
+	corrupt frame is skipped. Since the decoder has no notion of time, the
+	owner should call :py:meth:`.timeout` when the remainder of a partially
+	received frame fails to arrive in time. The number of bytes which were
+	discarded is kept in the *discarded* attribute.
+	"""
+	__slots__ = ('_buffer', 'discarded')
+	def __init__(self):
+		self._buffer = bytearray()
+		self.discarded = 0
+
+	def __repr__(self):
+		return "<{0} pending={1} discarded={2} >".format(self.__class__.__name__, len(self._buffer), self.discarded)
+
+	@property
+	def pending(self):
+		"""
+		The number of bytes of an incomplete frame which are being held until
+		the rest of it is received.
+
+		:rtype: int
+		"""
+		return len(self._buffer)
+
+	@property
+	def needed(self):
+		"""
+		The number of bytes which are still needed to complete the frame
+		that is currently being received, or 0 when no frame has been started.
+		When the frame header has not been completely received yet, only the
+		number of bytes needed to complete the header is known.
+
+		:rtype: int
+		"""
+		size = len(self._buffer)
+		if not size:
+			return 0
+		if size < FRAME_HEADER_SIZE:
+			return FRAME_HEADER_SIZE - size
+		return _FRAME_HEADER.unpack_from(self._buffer)[3] + PACKET_OVERHEAD - size
+
+	def feed(self, data):
+		"""
+		Decode the next chunk of data which was received.
+
+		:param bytes data: The data which was received.
+		:return: The frames, ACKs and NACKs which were completed.
+		:rtype: list
+		"""
+		buffer = self._buffer
+		buffer += data
+		items = []
+		position = 0
+		end = len(buffer)
+		while position < end:
+			byte = buffer[position]
+			if byte != 0xee:
+				if byte == 0x06:
+					items.append(ACK)
+				elif byte == 0x15:
+					items.append(NACK)
+				else:
+					match = _SIGNIFICANT_BYTE.search(buffer, position)
+					next_position = end if match is None else match.start()
+					self.discarded += next_position - position
+					position = next_position
+					continue
+				position += 1
+				continue
+			if end - position < FRAME_HEADER_SIZE:
+				break
+			identity, control, sequence, length = _FRAME_HEADER.unpack_from(buffer, position)
+			if length > MAX_PAYLOAD_SIZE:
+				# the start byte must have been noise
+				self.discarded += 1
+				position += 1
+				continue
+			frame_end = position + length + PACKET_OVERHEAD
+			if end < frame_end:
+				break
+			frame = bytes(buffer[position:frame_end])
+			crc = frame[-2:]
+			valid = packet_checksum(frame[:-2]) == crc
+			items.append(Frame(identity, control, sequence, frame[FRAME_HEADER_SIZE:-2], crc, valid, frame))
+			if valid:
+				position = frame_end
+				continue
+			resync = self._find_frame(buffer, position + 1, frame_end)
+			position = frame_end if resync is None else resync
+		del buffer[:position]
+		return items
+
+	def reset(self):
+		"""
+		Discard the data of any frame which is incomplete.
+		"""
+		self.discarded += len(self._buffer)
+		del self._buffer[:]
+
+	def timeout(self):
+		"""
+		Handle the remainder of an incomplete frame not having arrived in
+		time. The start byte of the incomplete frame is dropped and any data
+		after it is decoded again, in case the start byte was noise.
+
+		:return: The frames, ACKs and NACKs which were completed.
+		:rtype: list
+		"""
+		if not self._buffer:
+			return []
+		data = bytes(self._buffer[1:])
+		del self._buffer[:]
+		self.discarded += 1
+		return self.feed(data)
+
+	@staticmethod
+	def _find_frame(buffer, start, stop):
+		end = len(buffer)
+		position = buffer.find(b'\xee', start, stop)
+		while position != -1 and end - position >= PACKET_OVERHEAD:
+			length = _FRAME_HEADER.unpack_from(buffer, position)[3]
+			frame_end = position + length + PACKET_OVERHEAD
+			if length <= MAX_PAYLOAD_SIZE and frame_end <= end and packet_checksum(bytes(buffer[position:frame_end - 2])) == buffer[frame_end - 2:frame_end]:
+				return position
+			position = buffer.find(b'\xee', position + 1, stop)
+		return None
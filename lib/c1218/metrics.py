@@ -0,0 +1,329 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  c1218/metrics.py
+#
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are
+#  met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following disclaimer
+#    in the documentation and/or other materials provided with the
+#    distribution.
+#  * Neither the name of the project nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+#  "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+#  LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+#  A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+#  OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+#  SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+#  LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+#  DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+#  THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+#  (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+#  OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+
+
+from __future__ import unicode_literals
+
+import bisect
+import collections
+import os
+import tempfile
+import threading
+import time
+
+from c1218.data import C1218_REQUEST_IDS, C1218_RESPONSE_CODES
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+"""The upper bounds in seconds of the buckets of the latency histograms."""
+
+LINK_COUNTERS = collections.OrderedDict((
+	('frames_sent', 'frames written to the device, including retransmissions'),
+	('frames_received', 'valid frames received from the device'),
+	('retransmissions', 'frames which were written to the device again'),
+	('nacks_received', 'negative acknowledgements received from the device'),
+	('nacks_sent', 'negative acknowledgements sent to the device'),
+	('ack_timeouts', 'frames which were not acknowledged in time'),
+	('invalid_acks', 'frames which were answered with an unknown byte'),
+	('crc_errors', 'frames received with an invalid checksum'),
+	('response_timeouts', 'responses which did not start in time'),
+	('frame_timeouts', 'frames which stopped arriving before they were complete'),
+	('resyncs', 'times a frame was found again after receiving noise'),
+	('bytes_sent', 'bytes written to the serial connection'),
+	('bytes_received', 'bytes read from the serial connection'),
+))
+"""The counters of link layer events and their descriptions."""
+
+SERVICE_NAMES = dict((code, request_class.__name__[5:-7].lower()) for code, request_class in C1218_REQUEST_IDS.items())
+"""The name of each service keyed by its request code."""
+
+_response_names = dict((code, name) for name, code in C1218_RESPONSE_CODES.items() if isinstance(name, str))
+
+def response_name(code):
+	"""
+	Return the short name of a response code, such as 'ok' or 'isss'.
+
+	:param int code: The response code, or None if no response was received.
+	:rtype: str
+	"""
+	if code is None:
+		return 'none'
+	return _response_names.get(code, "0x{0:02x}".format(code))
+
+class Histogram(object):
+	"""
+	A histogram of observed values with fixed bucket boundaries.
+
+	:param tuple buckets: The sorted upper bounds of the buckets.
+	"""
+	__slots__ = ('buckets', 'counts', 'count', 'sum', 'min', 'max')
+	def __init__(self, buckets=LATENCY_BUCKETS):
+		self.buckets = tuple(buckets)
+		self.counts = [0] * (len(self.buckets) + 1)
+		self.count = 0
+		self.sum = 0.0
+		self.min = None
+		self.max = None
+
+	def __repr__(self):
+		return "<{0} count={1} mean={2!r} >".format(self.__class__.__name__, self.count, self.mean)
+
+	def observe(self, value):
+		"""
+		Add a value to the histogram.
+
+		:param float value: The value to add.
+		"""
+		self.counts[bisect.bisect_left(self.buckets, value)] += 1
+		self.count += 1
+		self.sum += value
+		if self.min is None or value < self.min:
+			self.min = value
+		if self.max is None or value > self.max:
+			self.max = value
+
+	def merge(self, other):
+		"""
+		Add the values of another histogram with the same buckets to this
+		one.
+
+		:param other: The histogram to merge.
+		:type other: :py:class:`.Histogram`
+		"""
+		if other.buckets != self.buckets:
+			raise ValueError('can not merge histograms with different buckets')
+		self.counts = [mine + theirs for mine, theirs in zip(self.counts, other.counts)]
+		self.count += other.count
+		self.sum += other.sum
+		if other.count:
+			self.min = other.min if self.min is None else min(self.min, other.min)
+			self.max = other.max if self.max is None else max(self.max, other.max)
+
+	@property
+	def mean(self):
+		if not self.count:
+			return None
+		return self.sum / self.count
+
+	def quantile(self, quantile):
+		"""
+		Estimate a quantile of the observed values by interpolating within
+		the bucket that contains it.
+
+		:param float quantile: The quantile to estimate (0 <= quantile <= 1).
+		:rtype: float
+		"""
+		if not self.count:
+			return None
+		rank = quantile * self.count
+		cumulative = 0
+		for index, count in enumerate(self.counts):
+			if count and cumulative + count >= rank:
+				lower = self.buckets[index - 1] if index else 0.0
+				upper = self.buckets[index] if index < len(self.buckets) else self.max
+				lower = max(lower, self.min)
+				upper = min(upper, self.max)
+				return lower + (upper - lower) * ((rank - cumulative) / count)
+			cumulative += count
+		return self.max
+
+class ConnectionMetrics(object):
+	"""
+	Counters of link layer events and the latency of each service request,
+	both per service and per table for the read and write services. One
+	instance may be shared by several connections to aggregate their
+	metrics.
+
+	:param tuple buckets: The upper bounds of the buckets of the latency histograms.
+	"""
+	def __init__(self, buckets=LATENCY_BUCKETS):
+		self.buckets = tuple(buckets)
+		self._lock = threading.Lock()
+		self.reset()
+
+	def __repr__(self):
+		return "<{0} requests={1} >".format(self.__class__.__name__, sum(histogram.count for histogram in self.services.values()))
+
+	def reset(self):
+		"""
+		Reset all of the metrics to their initial values.
+		"""
+		with self._lock:
+			self.started = time.time()
+			self.link = collections.OrderedDict((name, 0) for name in LINK_COUNTERS)
+			self.services = collections.OrderedDict()
+			self.responses = collections.Counter()
+			self.tables = collections.OrderedDict()
+
+	def increment(self, name, value=1):
+		"""
+		Increment a link layer counter.
+
+		:param str name: The name of the counter from :py:data:`.LINK_COUNTERS`.
+		:param int value: The value to increment the counter by.
+		"""
+		with self._lock:
+			self.link[name] += value
+
+	def observe_service(self, service, latency, code, tableid=None):
+		"""
+		Record the completion of a service request.
+
+		:param str service: The name of the service from :py:data:`.SERVICE_NAMES`.
+		:param float latency: The time in seconds from the request being sent to the response being received.
+		:param int code: The response code, or None if no response was received.
+		:param int tableid: The table that was read or written.
+		"""
+		with self._lock:
+			histogram = self.services.get(service)
+			if histogram is None:
+				histogram = self.services[service] = Histogram(self.buckets)
+			histogram.observe(latency)
+			self.responses[(service, response_name(code))] += 1
+			if tableid is None:
+				return
+			histogram = self.tables.get((service, tableid))
+			if histogram is None:
+				histogram = self.tables[(service, tableid)] = Histogram(self.buckets)
+			histogram.observe(latency)
+
+	def merge(self, other):
+		"""
+		Add the metrics of another instance to this one.
+
+		:param other: The metrics to merge.
+		:type other: :py:class:`.ConnectionMetrics`
+		"""
+		with self._lock:
+			for name, value in other.link.items():
+				self.link[name] += value
+			for attribute in ('services', 'tables'):
+				histograms = getattr(self, attribute)
+				for key, histogram in getattr(other, attribute).items():
+					if key not in histograms:
+						histograms[key] = Histogram(self.buckets)
+					histograms[key].merge(histogram)
+			self.responses.update(other.responses)
+
+	@property
+	def busy_time(self):
+		"""The total time in seconds spent waiting on service requests."""
+		return sum(histogram.sum for histogram in self.services.values())
+
+	@property
+	def link_errors(self):
+		"""The total number of link layer errors."""
+		return sum(self.link[name] for name in ('nacks_received', 'ack_timeouts', 'invalid_acks', 'crc_errors', 'response_timeouts', 'frame_timeouts'))
+
+	@property
+	def throughput(self):
+		"""The bytes sent and received per second of time spent on service requests."""
+		busy_time = self.busy_time
+		if not busy_time:
+			return None
+		return (self.link['bytes_sent'] + self.link['bytes_received']) / busy_time
+
+	def errors(self, service=None):
+		"""
+		Return the number of requests which were not answered with an ok
+		response.
+
+		:param str service: The service to count the errors of, or None for all services.
+		:rtype: int
+		"""
+		return sum(count for (name, code), count in self.responses.items() if code != 'ok' and (service is None or name == service))
+
+	def to_openmetrics(self, prefix='c1218', labels=None):
+		"""
+		Format the metrics in the OpenMetrics text format.
+
+		:param str prefix: The prefix of the name of each metric family.
+		:param dict labels: Labels to add to every sample, such as the device.
+		:rtype: str
+		"""
+		labels = labels or {}
+		def format_labels(**extra):
+			extra.update(labels)
+			if not extra:
+				return ''
+			return '{' + ','.join("{0}=\"{1}\"".format(key, str(value).replace('\\', '\\\\').replace('"', '\\"')) for key, value in sorted(extra.items())) + '}'
+		def format_histogram(name, histogram, **extra):
+			cumulative = 0
+			for bucket, count in zip(histogram.buckets + ('+Inf',), histogram.counts):
+				cumulative += count
+				lines.append("{0}_bucket{1} {2}".format(name, format_labels(le=bucket, **extra), cumulative))
+			lines.append("{0}_count{1} {2}".format(name, format_labels(**extra), histogram.count))
+			lines.append("{0}_sum{1} {2!r}".format(name, format_labels(**extra), histogram.sum))
+
+		lines = []
+		with self._lock:
+			for name, description in LINK_COUNTERS.items():
+				lines.append("# TYPE {0}_{1} counter".format(prefix, name))
+				lines.append("# HELP {0}_{1} The number of {2}.".format(prefix, name, description))
+				lines.append("{0}_{1}_total{2} {3}".format(prefix, name, format_labels(), self.link[name]))
+			lines.append("# TYPE {0}_responses counter".format(prefix))
+			lines.append("# HELP {0}_responses The number of responses by service and response code.".format(prefix))
+			for (service, code), count in sorted(self.responses.items()):
+				lines.append("{0}_responses_total{1} {2}".format(prefix, format_labels(service=service, code=code), count))
+			lines.append("# TYPE {0}_service_latency_seconds histogram".format(prefix))
+			lines.append("# HELP {0}_service_latency_seconds The latency of service requests.".format(prefix))
+			for service, histogram in self.services.items():
+				format_histogram(prefix + '_service_latency_seconds', histogram, service=service)
+			lines.append("# TYPE {0}_table_latency_seconds histogram".format(prefix))
+			lines.append("# HELP {0}_table_latency_seconds The latency of table read and write requests.".format(prefix))
+			for (service, tableid), histogram in sorted(self.tables.items()):
+				format_histogram(prefix + '_table_latency_seconds', histogram, service=service, table=tableid)
+		lines.append('# EOF')
+		return '\n'.join(lines) + '\n'
+
+	def write_openmetrics(self, path, prefix='c1218', labels=None):
+		"""
+		Write the metrics in the OpenMetrics text format to a file, such as
+		for the textfile collector of a node exporter. The file is replaced
+		atomically so it is never read while partially written.
+
+		:param str path: The path of the file to write.
+		:param str prefix: The prefix of the name of each metric family.
+		:param dict labels: Labels to add to every sample, such as the device.
+		"""
+		text = self.to_openmetrics(prefix=prefix, labels=labels)
+		directory = os.path.dirname(os.path.abspath(path))
+		file_d, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+		try:
+			with os.fdopen(file_d, 'w') as file_h:
+				file_h.write(text)
+			# temporary files are created readable only by the owner
+			os.chmod(tmp_path, 0o644)
+			os.replace(tmp_path, path)
+		except Exception:
+			if os.path.exists(tmp_path):
+				os.unlink(tmp_path)
+			raise
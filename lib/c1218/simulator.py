@@ -0,0 +1,457 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  c1218/simulator.py
+#
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are
+#  met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following disclaimer
+#    in the documentation and/or other materials provided with the
+#    distribution.
+#  * Neither the name of the project nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+#  "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+#  LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+#  A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+#  OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+#  SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+#  LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+#  DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+#  THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+#  (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+#  OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+
+
+from __future__ import unicode_literals
+
+import binascii
+import collections
+import csv
+import logging
+import socket
+import struct
+import threading
+import time
+
+from c1218.data import *
+from c1218.decoder import FrameDecoder
+from c1218.utilities import data_checksum
+
+from c1219.constants import PROC_INITIATE_TBL, PROC_RESPONSE_TBL
+
+STATE_BASE = 0
+"""The device is waiting for an identification request."""
+STATE_ID = 1
+"""The device has been identified and is waiting for a session to start."""
+STATE_SESSION = 2
+"""A session has been started with a logon request."""
+
+_ident_response = struct.pack('BBBBB', C1218_RESPONSE_CODES['ok'], 0x00, 0x01, 0x00, 0x00)
+
+def load_tables(file_h):
+	"""
+	Load the table data from a CSV file which was written by the
+	dump_tables module. Each row is the table id, the table name, the length
+	of the data and the data as hex.
+
+	:param file_h: The file or path to read the tables from.
+	:return: The table data keyed by table id.
+	:rtype: dict
+	"""
+	if isinstance(file_h, str):
+		with open(file_h, 'r') as file_h:
+			return load_tables(file_h)
+	tables = {}
+	for row in csv.reader(file_h):
+		if not row or not row[0].strip().isdigit():
+			continue
+		data = binascii.a2b_hex(row[-1].strip())
+		if len(data) != int(row[-2]):
+			raise ValueError("the data length of table {0} does not match the recorded length".format(row[0]))
+		tables[int(row[0])] = data
+	return tables
+
+class MeterSimulator(object):
+	"""
+	A simulated C12.18 device which serves the tables loaded from a
+	dump_tables CSV file. The simulator implements the link layer and the
+	identification, negotiate, logon, security, read, write, wait, logoff
+	and terminate services. Writes to table 7 run procedures, the response
+	of which is placed in table 8.
+
+	Each instance has its own tables so several simulators can be run in
+	the same process. Every connection to a simulator has its own session
+	through a :py:class:`.MeterSession` instance.
+
+	:param dict tables: The table data keyed by table id.
+	:param float latency: The time in seconds to wait before each response.
+	:param int pktsize: The largest packet size the simulator will accept.
+	:param int nbrpkts: The largest number of packets the simulator will accept.
+	:param password: The password required by the security service, or None to accept any password.
+	:type password: bytes, str
+	"""
+	def __init__(self, tables, latency=0.0, pktsize=1024, nbrpkts=8, password=None):
+		self.logger = logging.getLogger('c1218.simulator')
+		self.tables = dict(tables)
+		self.latency = latency
+		self.pktsize = pktsize
+		self.nbrpkts = nbrpkts
+		if isinstance(password, str):
+			password = password.encode('utf-8')
+		if password is not None:
+			password = password + (b'\x00' * (20 - len(password)))
+		self.password = password
+		self.procedures = {}
+		self.lock = threading.RLock()
+		self._sockets = []
+		self._threads = []
+
+	def __repr__(self):
+		return "<{0} tables={1} latency={2} >".format(self.__class__.__name__, len(self.tables), self.latency)
+
+	@classmethod
+	def from_csv(cls, file_h, **kwargs):
+		"""
+		Create a simulator with the tables loaded from a CSV file written by
+		the dump_tables module. Keyword arguments are passed to the
+		constructor.
+
+		:param file_h: The file or path to read the tables from.
+		:rtype: :py:class:`.MeterSimulator`
+		"""
+		return cls(load_tables(file_h), **kwargs)
+
+	@property
+	def c1219_endian(self):
+		table = self.tables.get(0)
+		if table and table[0] & 0x01:
+			return '>'
+		return '<'
+
+	def register_procedure(self, proc_nbr, handler, std_vs_mfg=False):
+		"""
+		Register a handler for a procedure. The handler is called with the
+		simulator and the procedure parameters when the procedure is run and
+		must return a tuple of the result code and the response data.
+		Procedures without a handler are answered with the unrecognized
+		procedure result code.
+
+		:param int proc_nbr: The numeric procedure identifier.
+		:param handler: The function to call when the procedure is run.
+		:param bool std_vs_mfg: Whether the procedure is manufacturer specified.
+		"""
+		self.procedures[(proc_nbr, bool(std_vs_mfg))] = handler
+
+	def run_procedure(self, request):
+		"""
+		Run the procedure described by the data written to table 7 and
+		return the contents of table 8 for its response.
+
+		:param bytes request: The procedure initiation request.
+		:rtype: bytes
+		"""
+		bfld = struct.unpack(self.c1219_endian + 'H', request[:2])[0]
+		handler = self.procedures.get((bfld & 0x7ff, bool(bfld & 0x800)))
+		if handler is None:
+			result, response = 6, b''
+		else:
+			result, response = handler(self, request[3:])
+		return request[:3] + struct.pack('B', result) + response
+
+	def session(self):
+		"""
+		Create a new session with the simulator for a connection.
+
+		:rtype: :py:class:`.MeterSession`
+		"""
+		return MeterSession(self)
+
+	def serve_socket(self, sock):
+		"""
+		Serve a session over a connected stream socket until the host closes
+		the connection.
+
+		:param sock: The connected socket.
+		:type sock: :py:class:`socket.socket`
+		"""
+		session = self.session()
+		# hosts rarely disable nagle's algorithm, so acknowledge their data
+		# right away instead of delaying their next write
+		quickack = getattr(socket, 'TCP_QUICKACK', None) if sock.family != getattr(socket, 'AF_UNIX', None) else None
+		try:
+			while True:
+				data = sock.recv(4096)
+				if not data:
+					break
+				if quickack is not None:
+					sock.setsockopt(socket.IPPROTO_TCP, quickack, 1)
+				pending = b''
+				for delay, output in session.feed(data):
+					if delay:
+						if pending:
+							sock.sendall(pending)
+							pending = b''
+						time.sleep(delay)
+					pending += output
+				if pending:
+					sock.sendall(pending)
+		except socket.error as error:
+			self.logger.debug('the connection was closed: ' + str(error))
+		finally:
+			sock.close()
+
+	def connect(self, address, family=socket.AF_UNIX):
+		"""
+		Connect to a host which is waiting for a device and serve it from a
+		background thread. This is the counterpart of a unix socket opened
+		with ``mode=server``.
+
+		:param address: The address to connect to.
+		:param int family: The address family of the socket.
+		"""
+		sock = socket.socket(family, socket.SOCK_STREAM)
+		sock.connect(address)
+		self._start_thread(self.serve_socket, sock)
+
+	def listen(self, address=('127.0.0.1', 0), family=socket.AF_INET):
+		"""
+		Listen for hosts and serve each connection with its own session from
+		a background thread. With the default address, a free TCP port is
+		chosen which can be connected to with a ``socket://`` URL.
+
+		:param address: The address to listen on.
+		:param int family: The address family of the socket.
+		:return: The address that is being listened on.
+		"""
+		server = socket.socket(family, socket.SOCK_STREAM)
+		if family != getattr(socket, 'AF_UNIX', None):
+			server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+		server.bind(address)
+		server.listen(16)
+		self._sockets.append(server)
+		self._start_thread(self._accept_loop, server)
+		return server.getsockname()
+
+	def close(self):
+		"""
+		Stop listening for new connections.
+		"""
+		while self._sockets:
+			server = self._sockets.pop()
+			try:
+				server.shutdown(socket.SHUT_RDWR)
+			except socket.error:
+				pass
+			server.close()
+
+	def _accept_loop(self, server):
+		while True:
+			try:
+				sock = server.accept()[0]
+			except (OSError, socket.error):
+				break
+			if sock.family != getattr(socket, 'AF_UNIX', None):
+				sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+			self._start_thread(self.serve_socket, sock)
+
+	def _start_thread(self, target, *args):
+		thread = threading.Thread(target=target, args=args, name='c1218-simulator')
+		thread.daemon = True
+		thread.start()
+		self._threads = [thread for thread in self._threads if thread.is_alive()]
+		self._threads.append(thread)
+
+class MeterSession(object):
+	"""
+	The state of a single connection to a :py:class:`.MeterSimulator`. Data
+	written by the host is passed to :py:meth:`.feed` which returns the data
+	to be sent back, this allows the session to be used with any transport.
+
+	:param simulator: The simulator the session is for.
+	:type simulator: :py:class:`.MeterSimulator`
+	"""
+	def __init__(self, simulator):
+		self.simulator = simulator
+		self.state = STATE_BASE
+		self.secured = False
+		self.pktsize = DEFAULT_PACKET_SIZE
+		self.nbrpkts = DEFAULT_NUMBER_PACKETS
+		# each session sees the response to the procedures that it ran
+		self.procedure_response = None
+		self._decoder = FrameDecoder()
+		self._request = bytearray()
+		self._last_received = None
+		self._pending = collections.deque()
+		self._last_sent = None
+		self._toggle = False
+
+	def feed(self, data):
+		"""
+		Process data written by the host and return the data which should be
+		sent back. The result is a list of tuples of the time to wait before
+		sending the data, which is the response latency of the simulator,
+		and the data itself.
+
+		:param bytes data: The data written by the host.
+		:rtype: list
+		"""
+		output = []
+		for item in self._decoder.feed(data):
+			if item == ACK:
+				self._last_sent = None
+				if self._pending:
+					self._last_sent = self._pending.popleft()
+					output.append((0, self._last_sent))
+				continue
+			if item == NACK:
+				if self._last_sent is not None:
+					output.append((0, self._last_sent))
+				continue
+			if not item.valid:
+				output.append((0, NACK))
+				continue
+			output.append((0, ACK))
+			if item.data == self._last_received:
+				# a retransmission of a packet which was already acknowledged
+				continue
+			self._last_received = item.data
+			if item.control & CONTROL_FIRST_PACKET:
+				self._request = bytearray()
+			self._request += item.payload
+			if item.sequence != 0:
+				continue
+			request = bytes(self._request)
+			self._request = bytearray()
+			with self.simulator.lock:
+				response = self.handle(request)
+			self._queue(response)
+			self._last_sent = self._pending.popleft()
+			output.append((self.simulator.latency, self._last_sent))
+		return output
+
+	def _queue(self, response):
+		packets = C1218Packet.segment(response, self.pktsize - PACKET_OVERHEAD)
+		for packet in packets:
+			control = ord(packet.control)
+			if self._toggle:
+				control |= CONTROL_TOGGLE
+			self._toggle = not self._toggle
+			packet.set_control(control)
+			self._pending.append(packet.build())
+
+	def handle(self, data):
+		"""
+		Handle a complete request from the host and return the response.
+
+		:param bytes data: The request data.
+		:rtype: bytes
+		"""
+		request_class = C1218_REQUEST_IDS.get(data[0])
+		if request_class is None:
+			return self._code('sns')
+		try:
+			request = request_class.from_bytes(data)
+		except Exception as error:
+			self.simulator.logger.warning("received an invalid {0} request: {1}".format(request_class.__name__, error))
+			return self._code('err')
+		handler = getattr(self, '_handle_' + request.name.lower())
+		return handler(request)
+
+	def _code(self, name):
+		return struct.pack('B', C1218_RESPONSE_CODES[name])
+
+	def _handle_ident(self, request):
+		self.state = STATE_ID
+		self.secured = False
+		self.pktsize = DEFAULT_PACKET_SIZE
+		self.nbrpkts = DEFAULT_NUMBER_PACKETS
+		return _ident_response
+
+	def _handle_negotiate(self, request):
+		if self.state != STATE_ID:
+			return self._code('isss')
+		self.pktsize = max(min(request.pktsize, self.simulator.pktsize), PACKET_OVERHEAD + 1)
+		self.nbrpkts = max(min(request.nbrpkt, self.simulator.nbrpkts), 1)
+		response = self._code('ok') + struct.pack('>HB', self.pktsize, self.nbrpkts)
+		if request.baudrate is not None:
+			response += struct.pack('B', C1218_BAUDRATE_CODES[request.baudrate])
+		return response
+
+	def _handle_wait(self, request):
+		if self.state == STATE_BASE:
+			return self._code('isss')
+		return self._code('ok')
+
+	def _handle_logon(self, request):
+		if self.state != STATE_ID:
+			return self._code('isss')
+		self.state = STATE_SESSION
+		return self._code('ok')
+
+	def _handle_security(self, request):
+		if self.state != STATE_SESSION:
+			return self._code('isss')
+		password = self.simulator.password
+		if password is not None and request.password != password:
+			return self._code('err')
+		self.secured = True
+		return self._code('ok')
+
+	def _handle_logoff(self, request):
+		if self.state != STATE_SESSION:
+			return self._code('isss')
+		self.state = STATE_ID
+		self.secured = False
+		return self._code('ok')
+
+	def _handle_terminate(self, request):
+		self.state = STATE_BASE
+		self.secured = False
+		return self._code('ok')
+
+	def _handle_read(self, request):
+		if self.state != STATE_SESSION:
+			return self._code('isss')
+		if request.tableid == PROC_RESPONSE_TBL and self.procedure_response is not None:
+			table = self.procedure_response
+		else:
+			table = self.simulator.tables.get(request.tableid)
+		if table is None:
+			return self._code('iar')
+		if request.offset is not None:
+			if request.offset > len(table):
+				return self._code('onp')
+			table = table[request.offset:request.offset + request.octetcount]
+		response = self._code('ok') + struct.pack('>H', len(table)) + table + data_checksum(table)
+		if len(response) > (self.pktsize - PACKET_OVERHEAD) * self.nbrpkts:
+			return self._code('onp')
+		return response
+
+	def _handle_write(self, request):
+		if self.state != STATE_SESSION:
+			return self._code('isss')
+		if self.simulator.password is not None and not self.secured:
+			return self._code('isc')
+		tableid = request.tableid
+		if tableid == PROC_INITIATE_TBL:
+			if len(request.data) < 3:
+				return self._code('err')
+			self.procedure_response = self.simulator.run_procedure(request.data)
+			return self._code('ok')
+		table = self.simulator.tables.get(tableid)
+		if table is None:
+			return self._code('iar')
+		offset = request.offset or 0
+		if offset + len(request.data) > len(table):
+			return self._code('onp')
+		self.simulator.tables[tableid] = table[:offset] + request.data + table[offset + len(request.data):]
+		return self._code('ok')
@@ -0,0 +1,295 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  c1218/sniffer.py
+#
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are
+#  met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following disclaimer
+#    in the documentation and/or other materials provided with the
+#    distribution.
+#  * Neither the name of the project nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+#  "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+#  LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+#  A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+#  OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+#  SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+#  LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+#  DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+#  THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+#  (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+#  OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+
+from __future__ import unicode_literals
+
+import binascii
+import collections
+import json
+import struct
+
+from c1218.data import *
+from c1218.decoder import Frame, FrameDecoder
+from c1218.metrics import SERVICE_NAMES, response_name
+from c1218.trace import TRACE_MAGIC, TRACE_RX, TRACE_RX_FRAME, TRACE_TX, read_trace
+from c1218.utilities import check_data_checksum
+
+DEFAULT_CHUNK_SIZE = 65536
+
+Message = collections.namedtuple('Message', ('timestamp', 'direction', 'payload', 'frames'))
+"""A complete, reassembled C12.18 request or response."""
+
+def _hex(data):
+	return binascii.b2a_hex(data).decode('ascii')
+
+def is_trace(path):
+	"""
+	Check whether a capture file is a trace written by a
+	:py:class:`~c1218.trace.TraceRecorder` instead of a raw byte stream.
+
+	:param str path: The path of the capture file.
+	:rtype: bool
+	"""
+	with open(path, 'rb') as file_h:
+		return file_h.read(len(TRACE_MAGIC)) == TRACE_MAGIC
+
+def read_raw_capture(file_h, direction, chunk_size=DEFAULT_CHUNK_SIZE):
+	"""
+	Read a raw capture of the data sent in one direction, such as the
+	output of a serial tap. Raw captures have no timestamps.
+
+	:param file_h: The path or the binary file object to read the capture from.
+	:param int direction: The direction of the data, :py:data:`~c1218.trace.TRACE_TX`
+	  for data sent by the host and :py:data:`~c1218.trace.TRACE_RX` for
+	  data sent by the device.
+	:param int chunk_size: The number of bytes to read at a time.
+	:return: A generator yielding tuples of the timestamp, direction and data.
+	"""
+	if isinstance(file_h, str):
+		with open(file_h, 'rb') as file_h:
+			for chunk in read_raw_capture(file_h, direction, chunk_size=chunk_size):
+				yield chunk
+		return
+	while True:
+		data = file_h.read(chunk_size)
+		if not data:
+			return
+		yield None, direction, data
+
+def read_trace_capture(file_h):
+	"""
+	Read the data of both directions from a trace file. The complete frames
+	which the connection records in addition to the raw data it received
+	are skipped.
+
+	:param file_h: The path or the binary file object to read the trace from.
+	:return: A generator yielding tuples of the timestamp, direction and data.
+	"""
+	for record in read_trace(file_h):
+		if record.direction == TRACE_RX_FRAME:
+			continue
+		yield record
+
+def interleave(requests, responses):
+	"""
+	Combine the messages decoded from separate captures of each direction,
+	alternating between requests and responses. This relies on C12.18 being
+	a strict request and response protocol.
+
+	:param requests: The messages sent by the host.
+	:param responses: The messages sent by the device.
+	:return: A generator yielding the messages.
+	"""
+	responses = iter(responses)
+	for message in requests:
+		yield message
+		response = next(responses, None)
+		if response is not None:
+			yield response
+	for response in responses:
+		yield response
+
+class CaptureDecoder(object):
+	"""
+	Decode captured C12.18 traffic into transactions. The data is processed
+	as a pipeline of generators so captures of any size are decoded in
+	constant memory. Counters of the frames which were decoded, corrupt and
+	retransmitted are kept as attributes.
+	"""
+	def __init__(self):
+		self._decoders = {TRACE_TX: FrameDecoder(), TRACE_RX: FrameDecoder()}
+		self._packets = {TRACE_TX: None, TRACE_RX: None}
+		self._last_frame = {TRACE_TX: None, TRACE_RX: None}
+		self.frames = 0
+		self.crc_errors = 0
+		self.retransmissions = 0
+		self.transactions = 0
+
+	@property
+	def discarded(self):
+		return sum(decoder.discarded for decoder in self._decoders.values())
+
+	def decode(self, chunks):
+		"""
+		Decode the chunks of data from a capture of both directions into
+		transactions.
+
+		:param chunks: Tuples of the timestamp, direction and data, in the order it was sent.
+		:return: A generator yielding the transactions, see :py:meth:`.decode_transaction`.
+		"""
+		return self.iter_transactions(self.iter_messages(chunks))
+
+	def iter_messages(self, chunks, interleaved=True):
+		"""
+		Decode chunks of data into messages. Multi-packet transmissions are
+		reassembled and frames which are corrupt or retransmitted are
+		dropped. A frame which is identical to the previous one sent in the
+		same direction is a retransmission unless the previous one was
+		acknowledged in between. When the directions were captured separately
+		and are not *interleaved*, the acknowledgements can not be placed so
+		identical consecutive frames are always considered retransmissions.
+
+		:param chunks: Tuples of the timestamp, direction and data.
+		:param bool interleaved: Whether the chunks of both directions are in the order they were sent.
+		:return: A generator yielding :py:class:`.Message` instances.
+		"""
+		for timestamp, direction, data in chunks:
+			other = TRACE_RX if direction == TRACE_TX else TRACE_TX
+			for item in self._decoders[direction].feed(data):
+				if not isinstance(item, Frame):
+					if item == ACK and interleaved:
+						self._last_frame[other] = None
+					continue
+				if not item.valid:
+					self.crc_errors += 1
+					continue
+				self.frames += 1
+				if item.data == self._last_frame[direction]:
+					self.retransmissions += 1
+					continue
+				self._last_frame[direction] = item.data
+				message = self._reassemble(timestamp, direction, item)
+				if message is not None:
+					yield message
+
+	def _reassemble(self, timestamp, direction, frame):
+		packets = self._packets[direction]
+		if not frame.control & CONTROL_MULTI_PACKET:
+			self._packets[direction] = None
+			return Message(timestamp, direction, frame.payload, 1)
+		if frame.control & CONTROL_FIRST_PACKET:
+			packets = self._packets[direction] = [timestamp, bytearray(), 0]
+		elif packets is None:
+			return None
+		packets[1] += frame.payload
+		packets[2] += 1
+		if frame.sequence != 0:
+			return None
+		self._packets[direction] = None
+		return Message(packets[0], direction, bytes(packets[1]), packets[2])
+
+	def iter_transactions(self, messages):
+		"""
+		Pair each request with the response which follows it.
+
+		:param messages: The messages of both directions, in the order they were sent.
+		:return: A generator yielding the transactions, see :py:meth:`.decode_transaction`.
+		"""
+		request = None
+		for message in messages:
+			if message.direction == TRACE_TX:
+				if request is not None:
+					yield self.decode_transaction(request, None)
+				request = message
+				continue
+			yield self.decode_transaction(request, message)
+			request = None
+		if request is not None:
+			yield self.decode_transaction(request, None)
+
+	def decode_transaction(self, request, response):
+		"""
+		Decode a request and its response into a dictionary suitable for
+		serializing to JSON. The fields of the request are included and for
+		table reads and writes, the table data is included as well.
+
+		:param request: The request message, or None for an unsolicited response.
+		:type request: :py:class:`.Message`
+		:param response: The response message, or None if there was none.
+		:type response: :py:class:`.Message`
+		:rtype: :py:class:`collections.OrderedDict`
+		"""
+		self.transactions += 1
+		record = collections.OrderedDict()
+		record['timestamp'] = (request or response).timestamp
+		record['service'] = None
+		if request is not None:
+			record['service'] = SERVICE_NAMES.get(request.payload[0], "0x{0:02x}".format(request.payload[0])) if request.payload else None
+			record['request'] = _hex(request.payload)
+		code = None
+		if response is not None:
+			code = response.payload[0] if response.payload else None
+			record['response'] = _hex(response.payload)
+			if request is not None and request.timestamp is not None and response.timestamp is not None:
+				record['latency'] = round(response.timestamp - request.timestamp, 6)
+		record['code'] = response_name(code)
+		if request is not None and request.payload:
+			request_class = C1218_REQUEST_IDS.get(request.payload[0])
+			if request_class is not None:
+				try:
+					self._decode_fields(record, request_class.from_bytes(request.payload), response, code)
+				except Exception as error:
+					record['error'] = "failed to parse the request: {0}".format(error)
+		return record
+
+	def _decode_fields(self, record, request, response, code):
+		if isinstance(request, C1218ReadRequest):
+			record['tableid'] = request.tableid
+			if request.offset is not None:
+				record['offset'] = request.offset
+				record['octetcount'] = request.octetcount
+			if code != C1218_RESPONSE_CODES['ok'] or len(response.payload) < READ_RESPONSE_OVERHEAD:
+				return
+			length = struct.unpack('>H', response.payload[1:3])[0]
+			data = response.payload[3:-1]
+			record['data'] = _hex(data)
+			record['valid'] = len(data) == length and check_data_checksum(data, response.payload[-1])
+		elif isinstance(request, C1218WriteRequest):
+			record['tableid'] = request.tableid
+			if request.offset is not None:
+				record['offset'] = request.offset
+			record['data'] = _hex(request.data)
+		elif isinstance(request, C1218LogonRequest):
+			record['userid'] = request.userid
+			record['username'] = request.username.decode('utf-8', 'replace').rstrip()
+		elif isinstance(request, C1218SecurityRequest):
+			record['password'] = _hex(request.password)
+		elif isinstance(request, C1218NegotiateRequest):
+			record['pktsize'] = request.pktsize
+			record['nbrpkt'] = request.nbrpkt
+			record['baudrate'] = request.baudrate
+
+def write_json_lines(records, file_h):
+	"""
+	Write records to a file as JSON, one per line.
+
+	:param records: The records to write.
+	:param file_h: The text file object to write the records to.
+	:return: The number of records which were written.
+	:rtype: int
+	"""
+	count = 0
+	for record in records:
+		file_h.write(json.dumps(record, separators=(',', ':')))
+		file_h.write('\n')
+		count += 1
+	return count
@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  c1218/trace.py
+#
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are
+#  met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following disclaimer
+#    in the documentation and/or other materials provided with the
+#    distribution.
+#  * Neither the name of the project nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+#  "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+#  LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+#  A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+#  OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+#  SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+#  LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+#  DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+#  THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+#  (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+#  OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+
+from __future__ import unicode_literals
+
+
+import collections
+import struct
+import threading
+import time
+
+TRACE_MAGIC = b'C1218TRC'
+TRACE_VERSION = 1
+
+TRACE_TX = 0
+"""Raw data written by the host to the device."""
+TRACE_RX = 1
+"""Raw data read by the host from the device."""
+TRACE_RX_FRAME = 2
+"""A complete and valid frame received from the device."""
+
+_header = struct.Struct('<8sB')
+_record_header = struct.Struct('<dBI')
+
+TraceRecord = collections.namedtuple('TraceRecord', ('timestamp', 'direction', 'data'))
+
+class TraceRecorder(object):
+	"""
+	Record the traffic of a connection to a compact binary trace file. The
+	file starts with a header followed by records, each of which is the
+	timestamp as a double, the direction as a byte and the length of the
+	data as a 32-bit integer (all little-endian) followed by the data.
+
+	:param file_h: The path or the binary file object to write the trace to.
+	"""
+	def __init__(self, file_h):
+		if isinstance(file_h, str):
+			file_h = open(file_h, 'wb')
+		self.file_h = file_h
+		self._lock = threading.Lock()
+		self.file_h.write(_header.pack(TRACE_MAGIC, TRACE_VERSION))
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.close()
+
+	def close(self):
+		with self._lock:
+			if not self.file_h.closed:
+				self.file_h.close()
+
+	def record(self, direction, data, timestamp=None):
+		"""
+		Add a record to the trace.
+
+		:param int direction: The direction of the data, one of :py:data:`.TRACE_TX`,
+		  :py:data:`.TRACE_RX` or :py:data:`.TRACE_RX_FRAME`.
+		:param bytes data: The raw data.
+		:param float timestamp: The time the data was sent or received, defaults to now.
+		"""
+		if timestamp is None:
+			timestamp = time.time()
+		with self._lock:
+			self.file_h.write(_record_header.pack(timestamp, direction, len(data)))
+			self.file_h.write(data)
+			self.file_h.flush()
+
+def read_trace(file_h):
+	"""
+	Read the records from a trace file which was written by a
+	:py:class:`.TraceRecorder`.
+
+	:param file_h: The path or the binary file object to read the trace from.
+	:return: A generator yielding :py:class:`.TraceRecord` instances.
+	"""
+	if isinstance(file_h, str):
+		with open(file_h, 'rb') as file_h:
+			for record in read_trace(file_h):
+				yield record
+		return
+	header = file_h.read(_header.size)
+	if len(header) != _header.size:
+		raise ValueError('invalid trace file (missing header)')
+	magic, version = _header.unpack(header)
+	if magic != TRACE_MAGIC:
+		raise ValueError('invalid trace file (bad magic)')
+	if version != TRACE_VERSION:
+		raise ValueError("unsupported trace file version: {0}".format(version))
+	while True:
+		header = file_h.read(_record_header.size)
+		if not header:
+			return
+		if len(header) != _record_header.size:
+			raise ValueError('invalid trace file (truncated record)')
+		timestamp, direction, length = _record_header.unpack(header)
+		data = file_h.read(length)
+		if len(data) != length:
+			raise ValueError('invalid trace file (truncated record)')
+		yield TraceRecord(timestamp, direction, data)
@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  c1218/urlhandler/protocol_replay.py
+#
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are
+#  met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following disclaimer
+#    in the documentation and/or other materials provided with the
+#    distribution.
+#  * Neither the name of the project nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+#  "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+#  LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+#  A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+#  OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+#  SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+#  LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+#  DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+#  THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+#  (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+#  OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+
+from __future__ import unicode_literals
+
+import logging
+import threading
+import urllib.parse
+
+from c1218.trace import TRACE_RX, TRACE_TX, read_trace
+
+from serial.serialutil import PortNotOpenError, SerialBase, SerialException
+
+# the position in each trace file, later connections to the same trace
+# continue from where the previous one stopped so a trace recorded across
+# several connections can be replayed
+_positions = {}
+_positions_lock = threading.Lock()
+
+class Serial(SerialBase):
+	"""
+	Serial port implementation which replays a trace recorded by a
+	:py:class:`~c1218.trace.TraceRecorder`. Each write by the host consumes
+	the next recorded write and makes the data the device sent in response
+	available to be read. Reads never block, so a session is replayed as
+	fast as the host can process it.
+
+	The URL is in the form ``replay:///path/to/file.trace`` and accepts the
+	following options:
+
+	* ``strict=1`` raise an error when the host writes data which differs
+	  from what was recorded.
+	* ``rewind=1`` start from the beginning of the trace instead of where
+	  the previous connection to it stopped.
+	"""
+	def __init__(self, *args, **kwargs):
+		self.logger = logging.getLogger('c1218.urlhandler.replay')
+		self.strict = False
+		self._path = None
+		self._records = []
+		self._cursor = 0
+		self._available = bytearray()
+		super(Serial, self).__init__(*args, **kwargs)
+
+	def open(self):
+		if self._port is None:
+			raise SerialException('Port must be configured before it can be used.')
+		if self.is_open:
+			raise SerialException('Port is already open.')
+		rewind = self.from_url(self.portstr)
+		try:
+			self._records = [record for record in read_trace(self._path) if record.direction in (TRACE_TX, TRACE_RX)]
+		except (IOError, ValueError) as error:
+			raise SerialException("Could not open port {0}: {1}".format(self.portstr, error))
+		with _positions_lock:
+			self._cursor = 0 if rewind else _positions.get(self._path, 0)
+			if self._cursor >= len(self._records):
+				self._cursor = 0
+		self._available = bytearray()
+		self._release()
+		self.is_open = True
+
+	def close(self):
+		if not self.is_open:
+			return
+		with _positions_lock:
+			_positions[self._path] = self._cursor
+		self.is_open = False
+
+	def from_url(self, url):
+		url = urllib.parse.urlsplit(url)
+		if url.scheme != 'replay':
+			raise SerialException('expected a string in the form "replay:///path/to/file.trace[?strict=1][&rewind=1]"')
+		options = urllib.parse.parse_qs(url.query)
+		self._path = url.netloc + url.path
+		self.strict = options.get('strict', ['0'])[0].lower() in ('1', 'true')
+		return options.get('rewind', ['0'])[0].lower() in ('1', 'true')
+
+	def _reconfigure_port(self):
+		pass
+
+	def _release(self):
+		# make everything which was received before the next write available
+		records = self._records
+		while self._cursor < len(records) and records[self._cursor].direction == TRACE_RX:
+			self._available += records[self._cursor].data
+			self._cursor += 1
+
+	@property
+	def in_waiting(self):
+		if not self.is_open:
+			raise PortNotOpenError()
+		return len(self._available)
+
+	def read(self, size=1):
+		if not self.is_open:
+			raise PortNotOpenError()
+		data = bytes(self._available[:size])
+		del self._available[:size]
+		return data
+
+	def write(self, data):
+		if not self.is_open:
+			raise PortNotOpenError()
+		data = bytes(data)
+		self._release()
+		if self._cursor >= len(self._records):
+			if self.strict:
+				raise SerialException('the host wrote data after the end of the trace')
+			self.logger.warning('the host wrote data after the end of the trace')
+			return len(data)
+		record = self._records[self._cursor]
+		self._cursor += 1
+		if record.data != data:
+			if self.strict:
+				raise SerialException("the host wrote data which differs from record #{0} of the trace".format(self._cursor - 1))
+			self.logger.debug("the host wrote data which differs from record #{0} of the trace".format(self._cursor - 1))
+		self._release()
+		return len(data)
+
+	def reset_input_buffer(self):
+		self._available = bytearray()
+
+	def reset_output_buffer(self):
+		pass
+
+	def _update_rts_state(self):
+		pass
+
+	def _update_dtr_state(self):
+		pass
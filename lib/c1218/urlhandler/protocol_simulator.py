@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  c1218/urlhandler/protocol_simulator.py
+#
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are
+#  met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following disclaimer
+#    in the documentation and/or other materials provided with the
+#    distribution.
+#  * Neither the name of the project nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+#  "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+#  LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+#  A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+#  OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+#  SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+#  LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+#  DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+#  THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+#  (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+#  OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+
+
+from __future__ import unicode_literals
+
+import collections
+import logging
+import time
+import urllib.parse
+import weakref
+
+from c1218.simulator import MeterSimulator
+
+from serial.serialutil import PortNotOpenError, SerialBase, SerialException
+
+# simulators which can be connected to by name, entries are removed when the
+# simulator is no longer referenced elsewhere
+_simulators = weakref.WeakValueDictionary()
+
+def register(name, simulator):
+	"""
+	Register a simulator so it can be connected to with a URL in the form
+	``simulator://name``.
+
+	:param str name: The name to register the simulator as.
+	:param simulator: The simulator to register.
+	:type simulator: :py:class:`~c1218.simulator.MeterSimulator`
+	"""
+	_simulators[name] = simulator
+
+def unregister(name):
+	"""
+	Remove a simulator which was registered with :py:func:`.register`.
+
+	:param str name: The name the simulator was registered as.
+	"""
+	_simulators.pop(name, None)
+
+class Serial(SerialBase):
+	"""
+	Serial port implementation which connects to a
+	:py:class:`~c1218.simulator.MeterSimulator` in the same process. The
+	response latency of the simulator is honored, but no time is spent
+	transmitting data.
+
+	The URL is either in the form ``simulator://name`` to connect to a
+	simulator that was registered with :py:func:`.register`, or in the form
+	``simulator:///path/to/tables.csv`` to connect to a new simulator
+	serving the tables of a dump_tables CSV file. The following options are
+	accepted when a new simulator is created:
+
+	* ``latency=0.05`` the time in seconds the simulator waits before each response.
+	* ``password=secret`` the password required by the simulator.
+	"""
+	def __init__(self, *args, **kwargs):
+		self.logger = logging.getLogger('c1218.urlhandler.simulator')
+		self.simulator = None
+		self._session = None
+		self._available = bytearray()
+		self._scheduled = collections.deque()
+		super(Serial, self).__init__(*args, **kwargs)
+
+	def open(self):
+		if self._port is None:
+			raise SerialException('Port must be configured before it can be used.')
+		if self.is_open:
+			raise SerialException('Port is already open.')
+		self.simulator = self.from_url(self.portstr)
+		self._session = self.simulator.session()
+		self._available = bytearray()
+		self._scheduled.clear()
+		self.is_open = True
+
+	def close(self):
+		self._session = None
+		self.is_open = False
+
+	def from_url(self, url):
+		url = urllib.parse.urlsplit(url)
+		if url.scheme != 'simulator':
+			raise SerialException('expected a string in the form "simulator://name" or "simulator:///path/to/tables.csv[?latency=0.05]"')
+		if url.netloc:
+			simulator = _simulators.get(url.netloc)
+			if simulator is None:
+				raise SerialException("Could not open port {0}: no simulator is registered as '{1}'".format(self.portstr, url.netloc))
+			return simulator
+		options = urllib.parse.parse_qs(url.query)
+		try:
+			return MeterSimulator.from_csv(
+				url.path,
+				latency=float(options.get('latency', ['0'])[0]),
+				password=options.get('password', [None])[0]
+			)
+		except (IOError, ValueError) as error:
+			raise SerialException("Could not open port {0}: {1}".format(self.portstr, error))
+
+	def _reconfigure_port(self):
+		pass
+
+	def _release(self):
+		now = time.monotonic()
+		scheduled = self._scheduled
+		while scheduled and scheduled[0][0] <= now:
+			self._available += scheduled.popleft()[1]
+
+	@property
+	def in_waiting(self):
+		if not self.is_open:
+			raise PortNotOpenError()
+		self._release()
+		return len(self._available)
+
+	def read(self, size=1):
+		if not self.is_open:
+			raise PortNotOpenError()
+		deadline = None if self._timeout is None else time.monotonic() + self._timeout
+		self._release()
+		while len(self._available) < size and self._scheduled:
+			delay = self._scheduled[0][0] - time.monotonic()
+			if deadline is not None:
+				delay = min(delay, deadline - time.monotonic())
+				if delay < 0:
+					break
+			if delay > 0:
+				time.sleep(delay)
+			self._release()
+		data = bytes(self._available[:size])
+		del self._available[:size]
+		return data
+
+	def write(self, data):
+		if not self.is_open:
+			raise PortNotOpenError()
+		data = bytes(data)
+		ready = time.monotonic()
+		for delay, output in self._session.feed(data):
+			if self._scheduled:
+				ready = max(ready, self._scheduled[-1][0])
+			self._scheduled.append((ready + delay, output))
+		return len(data)
+
+	def reset_input_buffer(self):
+		self._release()
+		self._available = bytearray()
+
+	def reset_output_buffer(self):
+		pass
+
+	def _update_rts_state(self):
+		pass
+
+	def _update_dtr_state(self):
+		pass
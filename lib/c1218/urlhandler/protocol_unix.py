@@ -36,10 +36,10 @@ import logging
 import os
 import socket
 import time
-import urlparse
+import urllib.parse
 
 from serial.serialutil import *
-from serial.urlhandler.protocol_socket import SocketSerial
+from serial.urlhandler.protocol_socket import Serial as SocketSerial
 
 class UnixSerial(SocketSerial):
 	"""
@@ -49,7 +49,7 @@ class UnixSerial(SocketSerial):
 		self.logger = None
 		if self._port is None:
 			raise SerialException('Port must be configured before it can be used.')
-		if self._isOpen:
+		if self.is_open:
 			raise SerialException('Port is already open.')
 		try:
 			self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
@@ -68,10 +68,10 @@ class UnixSerial(SocketSerial):
 			self._socket = None
 			raise SerialException("Could not open port {0}: {1}".format(self.portstr, repr(error)))
 		self._socket.settimeout(2)
-		self._isOpen = True
+		self.is_open = True
 
 	def close(self):
-		if not self._isOpen:
+		if not self.is_open:
 			return
 		if self._socket:
 			try:
@@ -89,12 +89,12 @@ class UnixSerial(SocketSerial):
 				pass
 			delattr(self, '_server_socket')
 			os.unlink(socket_file)
-		self._isOpen = False
+		self.is_open = False
 
 	def from_url(self, url):
 		details = {}
-		url = urlparse.urlparse(url)
-		options = urlparse.parse_qs(url.query)
+		url = urllib.parse.urlparse(url)
+		options = urllib.parse.parse_qs(url.query)
 		options_get = lambda key, default: options.get(key, [default])[0]
 		details['path'] = url.path
 		details['mode'] = options_get('mode', 'client')
@@ -106,16 +106,18 @@ class UnixSerial(SocketSerial):
 		return details
 
 	def read(self, size=1):
-		if not self._isOpen:
-			raise portNotOpenError
+		if not self.is_open:
+			raise PortNotOpenError()
 		data = bytearray()
 		if self._timeout != None:
 			timeout = time.time() + self._timeout
 		else:
 			timeout = float('inf')
 		while len(data) < size and time.time() < timeout:
+			# wait no longer than the remaining time for the data to arrive
+			self._socket.settimeout(min(timeout - time.time(), 2) if timeout != float('inf') else None)
 			try:
-				data = self._socket.recv(size - len(data))
+				data += self._socket.recv(size - len(data))
 			except socket.timeout:
 				continue
 			except socket.error as error:
@@ -32,9 +32,114 @@
 
 from __future__ import unicode_literals
 
+import binascii
 import struct
 
-import crcelk
+# maps each byte to its bit-reversed value, the HDLC crc is the bit-reflected
+# form of the CCITT crc that binascii.crc_hqx calculates from its own table
+_REFLECT_TABLE = bytearray(int('{0:08b}'.format(value)[::-1], 2) for value in range(256))
+
+class CRC16HDLC(object):
+	"""
+	An incremental CRC-16/HDLC (also known as CRC-16/X-25) calculator, this
+	is the checksum used by C12.18 and C12.22 packets. Data can be passed
+	in chunks as it is received and the checksum retrieved at any point.
+
+	:param bytes data: Optional initial data to update the checksum with.
+	"""
+	__slots__ = ('_value',)
+	def __init__(self, data=None):
+		self._value = 0xffff
+		if data:
+			self.update(data)
+
+	def copy(self):
+		"""
+		Return a copy of the calculator in its current state.
+
+		:rtype: :py:class:`.CRC16HDLC`
+		"""
+		other = self.__class__()
+		other._value = self._value
+		return other
+
+	def update(self, data):
+		"""
+		Update the checksum with the data.
+
+		:param bytes data: The next chunk of data.
+		"""
+		if not isinstance(data, (bytes, bytearray)):
+			data = bytes(data)
+		self._value = binascii.crc_hqx(data.translate(_REFLECT_TABLE), self._value)
+
+	def digest(self):
+		"""
+		Return the checksum packed as it appears at the end of a packet.
+
+		:rtype: bytes
+		"""
+		return struct.pack('<H', self.value)
+
+	def hexdigest(self):
+		return binascii.b2a_hex(self.digest()).decode('utf-8')
+
+	@property
+	def value(self):
+		value = self._value
+		return ((_REFLECT_TABLE[value & 0xff] << 8) | _REFLECT_TABLE[value >> 8]) ^ 0xffff
+
+class RoundTripEstimator(object):
+	"""
+	Estimate how long to wait for a device to respond from a smoothed round
+	trip time and its variance, in the same manner as the TCP retransmission
+	timer (RFC 6298). Until a sample has been taken, the initial timeout is
+	used.
+
+	:param float initial: The timeout to use before any samples are taken.
+	:param float minimum: The smallest timeout that will be returned.
+	:param float maximum: The largest timeout that will be returned.
+	"""
+	__slots__ = ('initial', 'minimum', 'maximum', 'srtt', 'rttvar', '_backoff')
+	def __init__(self, initial=1.0, minimum=0.05, maximum=2.0):
+		self.initial = initial
+		self.minimum = minimum
+		self.maximum = maximum
+		self.srtt = None
+		self.rttvar = None
+		self._backoff = 1
+
+	def __repr__(self):
+		return "<{0} srtt={1!r} rttvar={2!r} timeout={3:.3f} >".format(self.__class__.__name__, self.srtt, self.rttvar, self.timeout)
+
+	def backoff(self):
+		"""
+		Double the timeout after a response was not received in time, the
+		timeout is restored when the next sample is taken.
+		"""
+		self._backoff = min(self._backoff * 2, 64)
+
+	def update(self, sample):
+		"""
+		Update the estimate with a new round trip time sample.
+
+		:param float sample: The measured round trip time in seconds.
+		"""
+		if self.srtt is None:
+			self.srtt = sample
+			self.rttvar = sample / 2.0
+		else:
+			self.rttvar = (0.75 * self.rttvar) + (0.25 * abs(self.srtt - sample))
+			self.srtt = (0.875 * self.srtt) + (0.125 * sample)
+		self._backoff = 1
+
+	@property
+	def timeout(self):
+		if self.srtt is None:
+			timeout = self.initial
+		else:
+			timeout = self.srtt + max(4 * self.rttvar, self.minimum)
+		return min(max(timeout * self._backoff, self.minimum), self.maximum)
 
 def check_data_checksum(data, checksum):
 	if isinstance(checksum, int):
@@ -42,12 +147,21 @@ def check_data_checksum(data, checksum):
 	return data_checksum(data) == checksum
 
 def data_checksum(data):
-	chksum = 0
-	for i in struct.unpack('B' * len(data), data):
-		chksum += i
+	chksum = sum(bytearray(data))
 	chksum = ((chksum - 1) & 0xff) ^ 0xff
 	return struct.pack('B', chksum)
 
 def packet_checksum(data):
-	chksum = crcelk.CRC_HDLC.calc_bytes(data)
-	return struct.pack('<H', chksum)
+	return CRC16HDLC(data).digest()
+
+def packet_checksum_into(buffer, size):
+	"""
+	Calculate the checksum of the first *size* bytes of a packet which is
+	being built and write it into the two bytes which follow them.
+
+	:param bytearray buffer: The buffer the packet is being built in.
+	:param int size: The size of the packet without its checksum.
+	"""
+	value = binascii.crc_hqx(memoryview(buffer.translate(_REFLECT_TABLE))[:size], 0xffff)
+	value = ((_REFLECT_TABLE[value & 0xff] << 8) | _REFLECT_TABLE[value >> 8]) ^ 0xffff
+	struct.pack_into('<H', buffer, size, value)
@@ -63,16 +63,11 @@ class C1219GeneralAccess(object):  # Corresponds To Decade 0x
 		self._std_status = None
 		self._device_id = None
 		self.conn = conn
-		general_config_table = conn.get_table_data(GEN_CONFIG_TBL)
-		general_mfg_table = conn.get_table_data(GENERAL_MFG_ID_TBL)
-		try:
-			mode_status_table = conn.get_table_data(ED_MODE_STATUS_TBL)
-		except C1218ReadTableError:
-			mode_status_table = None
-		try:
-			ident_table = conn.get_table_data(DEVICE_IDENT_TBL)
-		except C1218ReadTableError:
-			ident_table = None
+		tables, _ = conn.get_tables((GEN_CONFIG_TBL, GENERAL_MFG_ID_TBL), optional=(ED_MODE_STATUS_TBL, DEVICE_IDENT_TBL))
+		general_config_table = tables[GEN_CONFIG_TBL]
+		general_mfg_table = tables[GENERAL_MFG_ID_TBL]
+		mode_status_table = tables.get(ED_MODE_STATUS_TBL)
+		ident_table = tables.get(DEVICE_IDENT_TBL)
 
 		if len(general_config_table) < 19:
 			raise C1219ParseError('expected to read more data from GEN_CONFIG_TBL', GEN_CONFIG_TBL)
@@ -68,7 +68,8 @@ class C1219LocalDisplayAccess(BaseC1219TableAccess):  # Corresponds To Decade 3x
 		necessary tables.
 		"""
 		self.conn = conn
-		act_disp = conn.get_table_data(ACT_DISP_TBL)
+		tables, _ = conn.get_tables((ACT_DISP_TBL, PRI_DISP_LIST_TBL))
+		act_disp = tables[ACT_DISP_TBL]
 		unpacked = struct.unpack('<BHBHBHB', act_disp)
 		bfld = unpacked[0]
 		self._on_time_flag = bool(bfld & 1)
@@ -82,7 +83,7 @@ class C1219LocalDisplayAccess(BaseC1219TableAccess):  # Corresponds To Decade 3x
 		self._nbr_sec_disp_lists = unpacked[6]
 
 		self.pri_disp_list = []
-		pri_disp_list = conn.get_table_data(PRI_DISP_LIST_TBL)
+		pri_disp_list = tables[PRI_DISP_LIST_TBL]
 		for _ in range(self._nbr_pri_disp_lists):
 			bfld = pri_disp_list[0]
 			on_time = bfld & 0b1111
@@ -38,12 +38,37 @@
 
 from __future__ import unicode_literals
 
+import logging
 import struct
 
+from c1218.cache import device_cache_key
 from c1219.constants import *
 from c1219.data import get_history_entry_record
 from c1219.errors import C1219ParseError
 
+HISTORY_LOG_HEADER_LENGTH = 11  # LIST_STATUS_BFLD + NBR_VALID_ENTRIES + LAST_ENTRY_ELEMENT + LAST_ENTRY_SEQ_NBR + NBR_UNREAD_ENTRIES
+
+def get_history_record_size(hist_data_length, tm_format, hist_date_time_flag, event_number_flag, hist_seq_nbr_flag):
+	"""
+	Return the size in bytes of each entry in the history log.
+
+	:param int hist_data_length: The size of the arguments of each entry.
+	:param int tm_format: The format that time stamps are packed in.
+	:param bool hist_date_time_flag: Whether or not a time stamp is included.
+	:param bool event_number_flag: Whether or not an event number is included.
+	:param bool hist_seq_nbr_flag: Whether or not an history sequence number
+	  is included.
+	:rtype: int
+	"""
+	size_of_log_rcd = hist_data_length + 4  # hist_data_length + (SIZEOF(USER_ID) + SIZEOF(TABLE_IDB_BFLD))
+	if hist_date_time_flag:
+		size_of_log_rcd += LTIME_LENGTH[tm_format]
+	if event_number_flag:
+		size_of_log_rcd += 2
+	if hist_seq_nbr_flag:
+		size_of_log_rcd += 2
+	return size_of_log_rcd
+
 class C1219LogAccess(object):  # Corresponds To Decade 7x
 	"""
 	This class provides generic access to the log data tables that are
@@ -59,15 +84,16 @@ class C1219LogAccess(object):  # Corresponds To Decade 7x
 		necessary tables.
 		"""
 		self.conn = conn
-		general_config_table = self.conn.get_table_data(GEN_CONFIG_TBL)
-		actual_log_table = self.conn.get_table_data(ACT_LOG_TBL)
-		history_log_data_table = self.conn.get_table_data(HISTORY_LOG_DATA_TBL)
+		tables, _ = self.conn.get_tables((GEN_CONFIG_TBL, ACT_LOG_TBL, HISTORY_LOG_DATA_TBL))
+		general_config_table = tables[GEN_CONFIG_TBL]
+		actual_log_table = tables[ACT_LOG_TBL]
+		history_log_data_table = tables[HISTORY_LOG_DATA_TBL]
 
 		if len(general_config_table) < 19:
 			raise C1219ParseError('expected to read more data from GEN_CONFIG_TBL', GEN_CONFIG_TBL)
 		if len(actual_log_table) < 9:
 			raise C1219ParseError('expected to read more data from ACT_LOG_TBL', ACT_LOG_TBL)
-		if len(history_log_data_table) < 11:
+		if len(history_log_data_table) < HISTORY_LOG_HEADER_LENGTH:
 			raise C1219ParseError('expected to read more data from HISTORY_LOG_DATA_TBL', HISTORY_LOG_DATA_TBL)
 
 		### Parse GEN_CONFIG_TBL ###
@@ -100,14 +126,8 @@ class C1219LogAccess(object):  # Corresponds To Decade 7x
 		inhibit_overflow_flag = history_log_data_table[0] & 8
 		nbr_valid_entries, last_entry_element, last_entry_seq_num, nbr_unread_entries = struct.unpack(self.conn.c1219_endian + 'HHIH', history_log_data_table[1:11])
 
-		log_data = history_log_data_table[11:]
-		size_of_log_rcd = hist_data_length + 4  # hist_data_length + (SIZEOF(USER_ID) + SIZEOF(TABLE_IDB_BFLD))
-		if hist_date_time_flag:
-			size_of_log_rcd += LTIME_LENGTH[tm_format]
-		if event_number_flag:
-			size_of_log_rcd += 2
-		if hist_seq_nbr_flag:
-			size_of_log_rcd += 2
+		log_data = history_log_data_table[HISTORY_LOG_HEADER_LENGTH:]
+		size_of_log_rcd = get_history_record_size(hist_data_length, tm_format, hist_date_time_flag, event_number_flag, hist_seq_nbr_flag)
 
 		if len(log_data) != (size_of_log_rcd * self.nbr_history_entries):
 			raise C1219ParseError('log data size does not align with expected record size, possibly corrupt', HISTORY_LOG_DATA_TBL)
@@ -130,3 +150,143 @@ class C1219LogAccess(object):  # Corresponds To Decade 7x
 	@property
 	def logs(self):
 		return self._logs
+
+class C1219HistoryLogReader(object):
+	"""
+	This class reads the entries of the history log incrementally. The
+	sequence number of the newest entry read from each device is remembered
+	and subsequent reads only request the entries which have been added since
+	then, using partial reads of HISTORY_LOG_DATA_TBL at the offsets of the
+	new records within the list. If the device does not support partial
+	reads, the table is read once for each call and the new records are
+	taken from it.
+	"""
+	def __init__(self, conn, state=None):
+		"""
+		@type conn: c1218.connection.Connection
+		@param conn: The driver to be used for interacting with the
+		necessary tables.
+		@type state: dict
+		@param state: A dictionary of device keys to the sequence number of
+		the last entry which was read from the device. It is updated as
+		entries are read so it can be persisted and passed in again later.
+		"""
+		self.logger = logging.getLogger('c1219.access.log')
+		self.conn = conn
+		self.state = {} if state is None else state
+		self.last_entry_seq_num = None
+		self.nbr_unread_entries = None
+		self.nbr_valid_entries = None
+		self.nbr_missed_entries = 0
+
+	def read(self, device_key=None):
+		"""
+		Read the entries which have been added to the history log since it was
+		last read from the device. The first time a device is read, all of
+		the valid entries are returned. Entries are returned oldest first in
+		the same format as :py:attr:`.C1219LogAccess.logs`.
+
+		@type device_key: str
+		@param device_key: The key to track the device by, if not specified
+		it is built from the GENERAL_MFG_ID_TBL.
+		@rtype: list
+		"""
+		endian = self.conn.c1219_endian
+		tables, _ = self.conn.get_tables((GEN_CONFIG_TBL, GENERAL_MFG_ID_TBL, ACT_LOG_TBL))
+		general_config_table = tables[GEN_CONFIG_TBL]
+		actual_log_table = tables[ACT_LOG_TBL]
+		if len(general_config_table) < 19:
+			raise C1219ParseError('expected to read more data from GEN_CONFIG_TBL', GEN_CONFIG_TBL)
+		if len(actual_log_table) < 9:
+			raise C1219ParseError('expected to read more data from ACT_LOG_TBL', ACT_LOG_TBL)
+		if device_key is None:
+			device_key = device_cache_key(tables[GENERAL_MFG_ID_TBL])
+
+		### Parse GEN_CONFIG_TBL ###
+		tm_format = general_config_table[1] & 7
+
+		### Parse ACT_LOG_TBL ###
+		log_flags = actual_log_table[0]
+		event_number_flag = bool(log_flags & 1)
+		hist_date_time_flag = bool(log_flags & 2)
+		hist_seq_nbr_flag = bool(log_flags & 4)
+		hist_data_length = actual_log_table[3]
+		nbr_history_entries = struct.unpack(endian + 'H', actual_log_table[5:7])[0]
+		size_of_log_rcd = get_history_record_size(hist_data_length, tm_format, hist_date_time_flag, event_number_flag, hist_seq_nbr_flag)
+
+		### Parse the HISTORY_LOG_DATA_TBL header ###
+		# when the device does not support partial reads, the table is read
+		# once and the header and records are taken from it
+		log_table = None
+		if getattr(self.conn, 'partial_reads_supported', None) is False:
+			log_table = self.conn.get_table_data(HISTORY_LOG_DATA_TBL)
+			header = log_table[:HISTORY_LOG_HEADER_LENGTH]
+		else:
+			header = b''.join(self.conn.iter_table_data(HISTORY_LOG_DATA_TBL, octetcount=HISTORY_LOG_HEADER_LENGTH))
+		if len(header) < HISTORY_LOG_HEADER_LENGTH:
+			raise C1219ParseError('expected to read more data from HISTORY_LOG_DATA_TBL', HISTORY_LOG_DATA_TBL)
+		order_flag = header[0] & 1
+		nbr_valid_entries, last_entry_element, last_entry_seq_num, nbr_unread_entries = struct.unpack(endian + 'HHIH', header[1:HISTORY_LOG_HEADER_LENGTH])
+		self.last_entry_seq_num = last_entry_seq_num
+		self.nbr_unread_entries = nbr_unread_entries
+		self.nbr_valid_entries = nbr_valid_entries
+		self.nbr_missed_entries = 0
+		nbr_valid_entries = min(nbr_valid_entries, nbr_history_entries)
+		if nbr_valid_entries and last_entry_element >= nbr_history_entries:
+			raise C1219ParseError('the last entry element is outside of the history log', HISTORY_LOG_DATA_TBL)
+
+		previous_seq_num = self.state.get(device_key)
+		if previous_seq_num is None:
+			nbr_new_entries = nbr_valid_entries
+		else:
+			nbr_new_entries = (last_entry_seq_num - previous_seq_num) & 0xffffffff
+			if nbr_new_entries & 0x80000000:
+				# the sequence number moved backwards so the log has been reset
+				self.logger.warning("the history log sequence number of device {0} moved backwards, reading all entries".format(device_key))
+				nbr_new_entries = nbr_valid_entries
+			elif nbr_new_entries > nbr_valid_entries:
+				self.nbr_missed_entries = nbr_new_entries - nbr_valid_entries
+				self.logger.warning("{0} history log entries of device {1} were overwritten before they could be read".format(self.nbr_missed_entries, device_key))
+				nbr_new_entries = nbr_valid_entries
+
+		# the newest entry is at last_entry_element and the older ones precede
+		# it in the direction of the list's order, wrapping around the end
+		if order_flag:
+			elements = [(last_entry_element + idx) % nbr_history_entries for idx in range(nbr_new_entries - 1, -1, -1)]
+		else:
+			elements = [(last_entry_element - idx) % nbr_history_entries for idx in range(nbr_new_entries - 1, -1, -1)]
+
+		if elements and log_table is None and getattr(self.conn, 'partial_reads_supported', None) is False:
+			# reading the header determined that partial reads are not supported
+			log_table = self.conn.get_table_data(HISTORY_LOG_DATA_TBL)
+
+		records = {}
+		for first_element, nbr_elements in self._get_element_runs(elements):
+			octetcount = nbr_elements * size_of_log_rcd
+			offset = HISTORY_LOG_HEADER_LENGTH + (first_element * size_of_log_rcd)
+			self.logger.debug("reading {0} history log entries at offset {1}".format(nbr_elements, offset))
+			if log_table is None:
+				log_data = b''.join(self.conn.iter_table_data(HISTORY_LOG_DATA_TBL, offset=offset, octetcount=octetcount))
+			else:
+				log_data = log_table[offset:offset + octetcount]
+			if len(log_data) != octetcount:
+				raise C1219ParseError('log data size does not align with expected record size, possibly corrupt', HISTORY_LOG_DATA_TBL)
+			for idx in range(nbr_elements):
+				records[first_element + idx] = log_data[idx * size_of_log_rcd:(idx + 1) * size_of_log_rcd]
+
+		logs = [get_history_entry_record(endian, hist_date_time_flag, tm_format, event_number_flag, hist_seq_nbr_flag, records[element]) for element in elements]
+		if logs and hist_seq_nbr_flag and logs[-1]['History Sequence Number'] != last_entry_seq_num & 0xffff:
+			self.logger.warning('the history log was changed while it was being read')
+		if device_key is not None:
+			self.state[device_key] = last_entry_seq_num
+		return logs
+
+	@staticmethod
+	def _get_element_runs(elements):
+		runs = []
+		for element in sorted(elements):
+			if runs and runs[-1][0] + runs[-1][1] == element:
+				runs[-1][1] += 1
+			else:
+				runs.append([element, 1])
+		return runs
@@ -40,7 +40,6 @@ from __future__ import unicode_literals
 
 import struct
 
-from c1218.errors import C1218ReadTableError
 from c1219.constants import *
 from c1219.data import get_table_idcb_field
 from c1219.errors import C1219ParseError
@@ -60,13 +59,11 @@ class C1219SecurityAccess(object):  # Corresponds To Decade 4x
 		necessary tables.
 		"""
 		self.conn = conn
-		act_security_table = conn.get_table_data(ACT_SECURITY_LIMITING_TBL)
-		security_table = conn.get_table_data(SECURITY_TBL)
-		access_ctl_table = conn.get_table_data(ACCESS_CONTROL_TBL)
-		try:
-			key_table = conn.get_table_data(KEY_TBL)
-		except C1218ReadTableError:
-			key_table = None
+		tables, _ = conn.get_tables((ACT_SECURITY_LIMITING_TBL, SECURITY_TBL, ACCESS_CONTROL_TBL), optional=(KEY_TBL,))
+		act_security_table = tables[ACT_SECURITY_LIMITING_TBL]
+		security_table = tables[SECURITY_TBL]
+		access_ctl_table = tables[ACCESS_CONTROL_TBL]
+		key_table = tables.get(KEY_TBL)
 
 		if len(act_security_table) < 6:
 			raise C1219ParseError('expected to read more data from ACT_SECURITY_LIMITING_TBL', ACT_SECURITY_LIMITING_TBL)
@@ -64,11 +64,18 @@ class C1219TelephoneAccess(object):	# Corresponds To Decade 9x
 		self._primary_phone_number_idx = None
 		self._secondary_phone_number_idx = None
 		self.conn = conn
-		actual_telephone_table = self.conn.get_table_data(ACT_TELEPHONE_TBL)
-		global_parameters_table = self.conn.get_table_data(GLOBAL_PARAMETERS_TBL)
-		originate_parameters_table = self.conn.get_table_data(ORIGINATE_PARAMETERS_TBL)
-		originate_schedule_table = self.conn.get_table_data(ORIGINATE_SCHEDULE_TBL)
-		answer_parameters_table = self.conn.get_table_data(ANSWER_PARAMETERS_TBL)
+		tables, _ = self.conn.get_tables((
+			ACT_TELEPHONE_TBL,
+			GLOBAL_PARAMETERS_TBL,
+			ORIGINATE_PARAMETERS_TBL,
+			ORIGINATE_SCHEDULE_TBL,
+			ANSWER_PARAMETERS_TBL
+		))
+		actual_telephone_table = tables[ACT_TELEPHONE_TBL]
+		global_parameters_table = tables[GLOBAL_PARAMETERS_TBL]
+		originate_parameters_table = tables[ORIGINATE_PARAMETERS_TBL]
+		originate_schedule_table = tables[ORIGINATE_SCHEDULE_TBL]
+		answer_parameters_table = tables[ANSWER_PARAMETERS_TBL]
 
 		if (actual_telephone_table) < 14:
 			raise C1219ParseError('expected to read more data from ACT_TELEPHONE_TBL', ACT_TELEPHONE_TBL)
@@ -36,25 +36,60 @@ import logging
 import random
 import select
 import socket
+import struct
+import threading
 
+from c1218.cache import DEFAULT_CACHE_SIZE
+from c1218.connection import TableAccessMixin
 from c1222.data import *
-from c1222.errors import C1222IOError
+from c1222.errors import C1222IOError, C1222ReadTableError, C1222WriteTableError
+from c1222.utilities import ber_decode_length, data_checksum
 
 if hasattr(logging, 'NullHandler'):
 	logging.getLogger('c1222').addHandler(logging.NullHandler())
 
+# the number of octets in each partial read or write when accessing a
+# table in chunks, C12.22 has no negotiated packet size to derive it from
+DEFAULT_CHUNK_SIZE = 1024
+
+# the initial size of the receive buffer, it is grown to fit larger packets
+RECEIVE_BUFFER_SIZE = 8192
+# the largest packet which will be received, larger lengths are treated as
+# corrupt data instead of allocating a buffer for them
+MAX_PACKET_SIZE = 1048576
+
 def sock_read_ready(socket, timeout):
 	readys = select.select([socket.fileno()], [], [], timeout)
 	return len(readys[0]) == 1
 
-class Connection(object):
-	def __init__(self, host, called_ap, calling_ap, enable_cache=True, bind_host=('', 1153)):
+class Connection(TableAccessMixin):
+	def __init__(self, host, called_ap, calling_ap, enable_cache=True, bind_host=('', 1153), cache_size=DEFAULT_CACHE_SIZE, cache_directory=None):
+		"""
+		This is a C12.22 driver for TCP connections. It provides the same
+		session interface as :py:class:`c1218.connection.Connection` so the
+		C12.19 access classes can be used with network attached devices.
+
+		:param tuple host: The address and port of the device to connect to.
+		:param called_ap: The AP title of the device.
+		:param calling_ap: The AP title to send requests with.
+		:param bool enable_cache: Cache tables in memory according to their
+		  policies (see :py:class:`~c1218.cache.TableCache`).
+		:param tuple bind_host: The address and port to listen on for
+		  responses which are sent over a new connection.
+		:param int cache_size: The maximum number of bytes of table data to cache.
+		:param str cache_directory: A directory in which to persist the static
+		  tables of each device between connections.
+		"""
 		self.logger = logging.getLogger('c1222.connection')
 		self.loggerio = logging.getLogger('c1222.connection.io')
 
 		self.read_timeout = 3.0
 		self.server_sock_h = None
 		self.read_sock_h = None
+		# received data is kept between rx_start and rx_end of the buffer
+		self._rx_buffer = bytearray(RECEIVE_BUFFER_SIZE)
+		self._rx_start = 0
+		self._rx_end = 0
 		self.bind_host = bind_host
 		self.start_listener()
 
@@ -69,15 +104,14 @@ class Connection(object):
 		if not isinstance(calling_ap, C1222CallingAPTitle):
 			calling_ap = C1222CallingAPTitle(calling_ap)
 		self.calling_ap = calling_ap
+		# the ap titles are the same for every packet of the association
+		self._ap_titles = encode_ap_titles(called_ap, calling_ap)
 
 		self.logged_in = False
 		self._initialized = False
+		self._lock = threading.RLock()
 		self.c1219_endian = '<'
-		self.caching_enabled = enable_cache
-		self._cacheable_tables = [0, 1]
-		self._table_cache = {}
-		if enable_cache:
-			self.logger.info('selective table caching has been enabled')
+		self._init_table_cache(enable_cache, cache_size, cache_directory)
 
 	def start_listener(self):
 		if self.server_sock_h is not None:
@@ -93,7 +127,15 @@ class Connection(object):
 		self.server_sock_h.close()
 		self.server_sock_h = None
 
-	def recv(self):
+	def recv(self, full_frame=False):
+		"""
+		Receive a response from the device.
+
+		:param bool full_frame: Return the entire packet instead of only the
+		  service response it contains.
+		:return: The service response data, or the :py:class:`~c1222.data.C1222Packet`
+		  if *full_frame* is True.
+		"""
 		if self.read_sock_h is None:
 			readable = select.select([self.sock_h.fileno(), self.server_sock_h.fileno()], [], [], self.read_timeout)
 			readable = readable[0]
@@ -111,32 +153,246 @@ class Connection(object):
 				self.stop_listener()
 			else:
 				raise C1222IOError('unknown file handle is available for reading')
-		data = b''
-		while sock_read_ready(self.read_sock_h, self.read_timeout):
-			tmp_data = self.read_sock_h.recv(8192)
-			data += tmp_data
-			if len(tmp_data) != 8192:
-				break
-		pkt = C1222Packet.from_bytes(data)
+		data = self._recv_packet()
+		try:
+			# a returned packet must not refer to the reused receive buffer
+			pkt = C1222Packet.from_bytes(bytes(data) if full_frame else data)
+		except Exception as error:
+			raise C1222IOError("received an invalid packet ({0})".format(error))
+		if full_frame:
+			return pkt
 		if not isinstance(pkt.data, C1222UserInformation):
 			return pkt.data
-		return C1222EPSEM.from_bytes(pkt.data.data)
+		try:
+			epsem = C1222EPSEM.from_bytes(pkt.data.data)
+		except Exception as error:
+			raise C1222IOError("received an invalid epsem ({0})".format(error))
+		# the packet is decoded without copying, only the response is copied
+		return bytes(epsem.data)
+
+	def _recv_packet(self):
+		# read exactly one packet using the length from its header, any data
+		# which follows it is kept for the next call
+		self._rx_fill(2)
+		buffer = self._rx_buffer
+		start = self._rx_start
+		if buffer[start] != 0x60:
+			self._rx_discard()
+			raise C1222IOError('received an invalid start byte')
+		header_size = 2
+		if buffer[start + 1] & 0x80:
+			header_size += buffer[start + 1] & 0x7f
+			self._rx_fill(header_size)
+			buffer = self._rx_buffer
+			start = self._rx_start
+		try:
+			length, position = ber_decode_length(buffer, start + 1)
+		except ValueError:
+			self._rx_discard()
+			raise C1222IOError('received an invalid packet length')
+		size = position - start + length
+		if size > MAX_PACKET_SIZE:
+			self._rx_discard()
+			raise C1222IOError("received a packet which is too large ({0} bytes)".format(size))
+		self._rx_fill(size)
+		start = self._rx_start
+		self._rx_start += size
+		if self._rx_start == self._rx_end:
+			self._rx_start = self._rx_end = 0
+		return memoryview(self._rx_buffer)[start:start + size]
+
+	def _rx_fill(self, size):
+		# read until at least size bytes are buffered, data which has been
+		# received is kept when this times out since tcp will deliver the rest
+		while self._rx_end - self._rx_start < size:
+			if self._rx_start + size > len(self._rx_buffer):
+				self._rx_compact(size)
+			if not sock_read_ready(self.read_sock_h, self.read_timeout):
+				raise C1222IOError('timed out while waiting for data')
+			try:
+				with memoryview(self._rx_buffer) as view:
+					received = self.read_sock_h.recv_into(view[self._rx_end:])
+			except socket.error as error:
+				raise C1222IOError("failed to receive data ({0})".format(error))
+			if not received:
+				raise C1222IOError('the connection was closed')
+			self._rx_end += received
+
+	def _rx_compact(self, size):
+		# move the buffered data to the start of a buffer which can hold size
+		# bytes, a new buffer is used because packets which were returned
+		# may still refer to the current one
+		pending = self._rx_end - self._rx_start
+		buffer = bytearray(max(size, len(self._rx_buffer)))
+		buffer[:pending] = self._rx_buffer[self._rx_start:self._rx_end]
+		self._rx_buffer = buffer
+		self._rx_start = 0
+		self._rx_end = pending
+
+	def _rx_discard(self):
+		# the stream can not be resynchronized so any buffered data is dropped
+		self._rx_start = self._rx_end = 0
 
 	def send(self, data):
-		pkt = C1222Packet(self.called_ap, self.calling_ap, random.randint(0, 999999), data=C1222UserInformation(C1222EPSEM(data)))
-		self.sock_h.send(pkt.build())
+		"""
+		Send a request to the device.
+
+		:param data: The service request to send.
+		"""
+		pkt = build_packet(self._ap_titles, random.randint(0, 999999), C1222UserInformation(C1222EPSEM(data)))
+		self.sock_h.sendall(pkt)
+
+	def _get_read_chunk_size(self):
+		return DEFAULT_CHUNK_SIZE
+
+	def _get_write_chunk_size(self):
+		return DEFAULT_CHUNK_SIZE
+
+	def _request(self, request):
+		with self._lock:
+			self.send(request)
+			return self.recv()
 
 	def start(self):
-		self.send(C1222IdentRequest())
+		"""
+		Send an identification request.
+
+		:rtype: bool
+		"""
 		try:
-			self.recv()
+			data = self._request(C1222IdentRequest())
 		except C1222IOError:
+			data = None
+		if not data or data[0] != 0x00:
 			self.logger.error('received incorrect response to identification service request')
-		else:
+			return False
+		self._initialized = True
+		return True
+
+	def stop(self, force=False):
+		"""
+		Send a terminate request.
+
+		:param bool force: ignore the remote devices response
+		"""
+		# the next session may be with a different device
+		self._table_cache.save()
+		self._table_cache.clear()
+		if self._initialized:
+			try:
+				data = self._request(C1222TerminateRequest())
+			except C1222IOError:
+				if not force:
+					raise
+				self.logger.warning('the device did not respond to the terminate request')
+				data = None
+			if data == b'\x00' or force:
+				self._initialized = False
+				self.logged_in = False
+				return True
+		return False
+
+	def login(self, username='0000', userid=0, password=None):
+		"""
+		Log into the connected device.
+
+		:param str username: the username to log in with (len(username) <= 10)
+		:param int userid: the userid to log in with (0x0000 <= userid <= 0xffff)
+		:param str password: password to log in with (len(password) <= 20)
+		:rtype: bool
+		"""
+		if password and len(password) > 20:
+			self.logger.error('password longer than 20 characters received')
+			raise Exception('password longer than 20 characters, login failed')
+
+		# the logon response includes the session idle timeout after the status
+		data = self._request(C1222LogonRequest(username, userid))
+		if data[:1] != b'\x00':
+			self.logger.warning('login failed, username and user id rejected')
+			return False
+
+		if password is not None:
+			data = self._request(C1222SecurityRequest(password, userid))
+			if data != b'\x00':
+				self.logger.warning('login failed, password rejected')
+				return False
+
+		self.logged_in = True
+		return True
+
+	def logoff(self):
+		"""
+		Send a logoff request.
+
+		:rtype: bool
+		"""
+		data = self._request(C1222LogoffRequest())
+		if data == b'\x00':
+			self.logged_in = False
 			return True
 		return False
 
+	def get_table_data(self, tableid, octetcount=None, offset=None):
+		"""
+		Read data from a table. If successful, all of the data from the
+		requested table will be returned.
+
+		:param int tableid: The table number to read from (0x0000 <= tableid <= 0xffff)
+		:param int octetcount: Limit the amount of data read, only works if
+		  the meter supports this type of reading.
+		:param int offset: The offset at which to start to read the data from.
+		"""
+		partial = octetcount is not None or offset is not None
+		if self.caching_enabled and not partial:
+			data = self._table_cache.get(tableid)
+			if data is not None:
+				self.logger.info('returning cached table #' + str(tableid))
+				return data
+		data = self._request(C1222ReadRequest(tableid, offset, octetcount))
+		if not data:
+			self.logger.error('could not read table id: ' + str(tableid) + ', error: no data was returned')
+			raise C1222ReadTableError('could not read table id: ' + str(tableid) + ', error: no data was returned')
+		status = data[0]
+		if status != 0x00:
+			details = (C1222_RESPONSE_CODES.get(status) or 'unknown response code')
+			self.logger.error('could not read table id: ' + str(tableid) + ', error: ' + details)
+			raise C1222ReadTableError('could not read table id: ' + str(tableid) + ', error: ' + details, status)
+		if len(data) < 4:
+			self.logger.error('could not read table id: ' + str(tableid) + ', error: data read was corrupt, invalid length (less than 4)')
+			raise C1222ReadTableError('could not read table id: ' + str(tableid) + ', error: data read was corrupt, invalid length (less than 4)')
+		length = struct.unpack('>H', data[1:3])[0]
+		chksum = data[-1:]
+		data = data[3:-1]
+		if len(data) != length:
+			self.logger.error('could not read table id: ' + str(tableid) + ', error: data read was corrupt, invalid length')
+			raise C1222ReadTableError('could not read table id: ' + str(tableid) + ', error: data read was corrupt, invalid length')
+		if data_checksum(data) != chksum:
+			self.logger.error('could not read table id: ' + str(tableid) + ', error: data read was corrupt, invalid check sum')
+			raise C1222ReadTableError('could not read table id: ' + str(tableid) + ', error: data read was corrupt, invalid checksum')
+
+		if self.caching_enabled and not partial:
+			self._cache_table(tableid, data)
+		return data
+
+	def set_table_data(self, tableid, data, offset=None):
+		"""
+		Write data to a table.
+
+		:param int tableid: The table number to write to (0x0000 <= tableid <= 0xffff)
+		:param bytes data: The data to write into the table.
+		:param int offset: The offset at which to start to write the data (0x000000 <= octetcount <= 0xffffff).
+		"""
+		self._table_cache.invalidate(tableid)
+		data = self._request(C1222WriteRequest(tableid, data, offset))
+		if not data or data[0] != 0x00:
+			status = data[0] if data else None
+			details = (C1222_RESPONSE_CODES.get(status) or 'unknown response code')
+			self.logger.error('could not write data to the table, error: ' + details)
+			raise C1222WriteTableError('could not write data to the table, error: ' + details, status)
+		return
+
 	def close(self):
+		self._table_cache.save()
 		self.sock_h.close()
 		if self.read_sock_h is not None:
 			self.read_sock_h.close()
@@ -35,10 +35,10 @@ from __future__ import unicode_literals
 import binascii
 import struct
 
-from c1222.utilities import data_checksum
+from c1222.decoder import TAG_CALLED_AP_TITLE, TAG_CALLING_AP_INVOCATION_ID, TAG_CALLING_AP_TITLE, decode_acse, decode_element, decode_integer, decode_oid, decode_tagged, decode_user_information
+from c1222.utilities import ber_decode_length, ber_encode_integer, ber_encode_length, data_checksum
 
 from pyasn1.codec.ber import encoder as ber_encoder
-from pyasn1.codec.ber import decoder as ber_decoder
 from pyasn1.type import tag
 from pyasn1.type import univ
 
@@ -60,6 +60,54 @@ class C1222CalledAPTitle(univ.ObjectIdentifier):
 	def encode(self):
 		return ber_encoder.encode(self)
 
+C1222_RESPONSE_CODES = {
+	0: 'ok (Acknowledge)',
+	1: 'err (Error)',
+	2: 'sns (Service Not Supported)',
+	3: 'isc (Insufficient Security Clearance)',
+	4: 'onp (Operation Not Possible)',
+	5: 'iar (Inappropriate Action Requested)',
+	6: 'bsy (Device Busy)',
+	7: 'dnr (Data Not Ready)',
+	8: 'dlk (Data Locked)',
+	9: 'rno (Renegotiate Request)',
+	10: 'isss (Invalid Service Sequence State)',
+	11: 'sme (Security Mechanism Error)',
+	12: 'uat (Unknown Application Title)',
+	13: 'nett (Network Time-out)',
+	14: 'netr (Network Not Reachable)',
+	15: 'rqtl (Request Too Large)',
+	16: 'rstl (Response Too Large)',
+	17: 'sgnp (Segmentation Not Possible)',
+	18: 'sgerr (Segmentation Error)',
+
+	'ok':    0,
+	'err':   1,
+	'sns':   2,
+	'isc':   3,
+	'onp':   4,
+	'iar':   5,
+	'bsy':   6,
+	'dnr':   7,
+	'dlk':   8,
+	'rno':   9,
+	'isss':  10,
+	'sme':   11,
+	'uat':   12,
+	'nett':  13,
+	'netr':  14,
+	'rqtl':  15,
+	'rstl':  16,
+	'sgnp':  17,
+	'sgerr': 18,
+}
+
+def _to_bytes(data):
+	# requests built by other modules such as c1218.data are accepted as well
+	if hasattr(data, 'build'):
+		return data.build()
+	return data
+
 class C1222Data(object):
 	"""
 	This class provides basic methods for constructable data fragments of the
@@ -71,6 +119,9 @@ class C1222Data(object):
 	def __str__(self):
 		return self.build()
 
+	def __bytes__(self):
+		return self.build()
+
 	def __len__(self):
 		return len(self.build())
 
@@ -89,7 +140,7 @@ class C1222EPSEM(C1222Data):
 		self.response_mode = 0
 
 	def __repr__(self):
-		return '<C1222EPSEM data=0x' + binascii.b2a_hex(self.data).decode('utf-8') + ' data_len=' + str(len(self.data)) + ' >'
+		return '<C1222EPSEM data=0x' + binascii.b2a_hex(_to_bytes(self.data)).decode('utf-8') + ' data_len=' + str(len(self.data)) + ' >'
 
 	@classmethod
 	def from_bytes(cls, data):
@@ -105,12 +156,11 @@ class C1222EPSEM(C1222Data):
 		response_mode = (flags & 3)
 		if ed_class:
 			ed_class = data[1:5]
-			length = data[5]
-			data = data[6:]
+			length, position = ber_decode_length(data, 5)
 		else:
 			ed_class = b''
-			length = data[1]
-			data = data[2:]
+			length, position = ber_decode_length(data, 1)
+		data = data[position:]
 		if length != len(data):
 			raise Exception('invalid data (size)')
 		epsem = cls(data, ed_class)
@@ -130,38 +180,35 @@ class C1222EPSEM(C1222Data):
 		flags |= (self.security_mode << 2)
 		flags |= self.response_mode
 		flags = struct.pack('B', flags)
-		data = str(self.data)
-		return flags + self.ed_class + struct.pack('B', len(data)) + data
+		data = _to_bytes(self.data)
+		return flags + self.ed_class + ber_encode_length(len(data)) + data
 
 class C1222UserInformation(C1222Data):
 	def __init__(self, data):
 		self.data = data
 
+	def __len__(self):
+		# the size is calculated without building the data, which may be a
+		# view of a large received packet
+		length = len(self.data)
+		for _ in range(3):
+			length += 1 + len(ber_encode_length(length))
+		return length
+
 	@classmethod
 	def from_bytes(cls, data):
-		if len(data) < 6:
-			raise Exception('invalid data (size)')
-		if data[0] != 0xbe:
+		tag, value, end = decode_element(data)
+		if tag != 0xbe:
 			raise Exception('invalid start byte')
-		if data[1] != len(data[2:]):
+		if end != len(data):
 			raise Exception('invalid data (size)')
-
-		if data[2] != 0x28:
-			raise Exception('invalid start byte')
-		if ord(data[3]) != len(data[4:]):
-			raise Exception('invalid data (size)')
-
-		if data[4] != 0x81:
-			raise Exception('invalid start byte')
-		if data[5] != len(data[6:]):
-			raise Exception('invalid data (size)')
-		return cls(data[6:])
+		return cls(decode_user_information(value))
 
 	def build(self):
-		data = self.data
-		data = b'\x81' + struct.pack('B', len(data)) + data
-		data = b'\x28' + struct.pack('B', len(data)) + data
-		data = b'\xbe' + struct.pack('B', len(data)) + data
+		data = _to_bytes(self.data)
+		data = b'\x81' + ber_encode_length(len(data)) + data
+		data = b'\x28' + ber_encode_length(len(data)) + data
+		data = b'\xbe' + ber_encode_length(len(data)) + data
 		return data
 
 class C1222Request(C1222Data):
@@ -177,9 +224,10 @@ class C1222Request(C1222Data):
 	def set_ap_title(self, ap_title):
 		if not hasattr(self, '_ap_title'):
 			raise Exception(self.__class__.__name__ + ' does not support the ap_title element')
+		# titles which are already encoded are used as they are
 		if isinstance(ap_title, univ.ObjectIdentifier):
 			self._ap_title = ber_encoder.encode(ap_title)
-		if isinstance(ap_title, str):
+		elif isinstance(ap_title, bytes):
 			self._ap_title = ap_title
 		else:
 			self._ap_title = ber_encoder.encode(univ.ObjectIdentifier(ap_title))
@@ -243,10 +291,10 @@ class C1222ReadRequest(C1222Request):
 		self._offset = b''
 		self._octetcount = b''
 		self.set_tableid(tableid)
-		if (offset is not None and offset != 0) and (octetcount is not None and octetcount != 0):
+		if offset is not None or octetcount is not None:
 			self.read = b'\x3f'
-			self.set_offset(offset)
-			self.set_octetcount(octetcount)
+			self.set_offset(offset or 0)
+			self.set_octetcount(octetcount or 0)
 
 	def build(self):
 		return self.read + self._tableid + self._offset + self._octetcount
@@ -321,7 +369,7 @@ class C1222WriteRequest(C1222Request):
 		self._data = b''
 		self.set_tableid(tableid)
 		self.set_data(data)
-		if offset is not None and offset != 0:
+		if offset is not None:
 			self.write = b'\x4f'
 			self.set_offset(offset)
 
@@ -344,21 +392,65 @@ class C1222WriteRequest(C1222Request):
 		self._data = data
 		self._datalen = struct.pack('>H', len(data))
 
+def _encode_element(tag, value):
+	return struct.pack('B', tag) + ber_encode_length(len(value)) + value
+
+def _decode_ap_title(data):
+	return decode_oid(decode_tagged(decode_element(data)[1], 0x06))
+
+def encode_ap_titles(called_ap, calling_ap):
+	"""
+	Encode the called and calling AP title elements of the ACSE header. These
+	remain the same for every packet of an association so they can be
+	encoded once and passed to :py:func:`.build_packet`.
+
+	:param called_ap: The AP title of the device.
+	:param calling_ap: The AP title of the requester.
+	:rtype: bytes
+	"""
+	if not isinstance(called_ap, C1222CalledAPTitle):
+		called_ap = C1222CalledAPTitle(called_ap)
+	if not isinstance(calling_ap, C1222CallingAPTitle):
+		calling_ap = C1222CallingAPTitle(calling_ap)
+	return called_ap.encode() + calling_ap.encode()
+
+def encode_invocation_id(calling_ap_invocation_id):
+	"""
+	Encode the calling AP invocation ID element of the ACSE header without
+	using pyasn1, the element is always an explicitly tagged integer.
+
+	:param int calling_ap_invocation_id: The invocation ID to encode.
+	:rtype: bytes
+	"""
+	value = ber_encode_integer(int(calling_ap_invocation_id))
+	return b'\xa8' + ber_encode_length(len(value) + 2) + b'\x02' + ber_encode_length(len(value)) + value
+
+def build_packet(ap_titles, calling_ap_invocation_id, data):
+	"""
+	Build a packet from AP title elements which were encoded with
+	:py:func:`.encode_ap_titles`.
+
+	:param bytes ap_titles: The encoded called and calling AP titles.
+	:param int calling_ap_invocation_id: The invocation ID of the packet.
+	:param data: The user information of the packet.
+	:rtype: bytes
+	"""
+	invocation_id = encode_invocation_id(calling_ap_invocation_id)
+	data = _to_bytes(data)
+	length = ber_encode_length(len(ap_titles) + len(invocation_id) + len(data))
+	return b''.join((b'\x60', length, ap_titles, invocation_id, data))
+
 class C1222Packet(C1222Request):
+	"""
+	A C12.22 ACSE packet. The elements of the header are encoded when they
+	are set and reused each time that the packet is built.
+	"""
 	start = b'\x60'
 	def __init__(self, called_ap, calling_ap, calling_ap_invocation_id, data=None, length=None):
 		self._length = b'\x00'
 		self._data = b''
-		if not isinstance(called_ap, C1222CalledAPTitle):
-			called_ap = C1222CalledAPTitle(called_ap)
 		self.called_ap = called_ap
-
-		if not isinstance(calling_ap, C1222CallingAPTitle):
-			calling_ap = C1222CallingAPTitle(calling_ap)
 		self.calling_ap = calling_ap
-
-		if not isinstance(calling_ap_invocation_id, C1222CallingAPInvocationID):
-			calling_ap_invocation_id = C1222CallingAPInvocationID(calling_ap_invocation_id)
 		self.calling_ap_invocation_id = calling_ap_invocation_id
 
 		if data:
@@ -368,28 +460,74 @@ class C1222Packet(C1222Request):
 		if length:
 			self.set_length(length)
 
+	# the ap titles may be set to encoded elements, such as those of a
+	# decoded packet, in which case they are only decoded when accessed
+	@property
+	def called_ap(self):
+		if self._called_ap is None:
+			self._called_ap = C1222CalledAPTitle(_decode_ap_title(self._called_ap_data))
+		return self._called_ap
+
+	@called_ap.setter
+	def called_ap(self, value):
+		if isinstance(value, (bytes, memoryview)):
+			self._called_ap = None
+			self._called_ap_data = value
+			return
+		if not isinstance(value, C1222CalledAPTitle):
+			value = C1222CalledAPTitle(value)
+		self._called_ap = value
+		self._called_ap_data = value.encode()
+
+	@property
+	def calling_ap(self):
+		if self._calling_ap is None:
+			self._calling_ap = C1222CallingAPTitle(_decode_ap_title(self._calling_ap_data))
+		return self._calling_ap
+
+	@calling_ap.setter
+	def calling_ap(self, value):
+		if isinstance(value, (bytes, memoryview)):
+			self._calling_ap = None
+			self._calling_ap_data = value
+			return
+		if not isinstance(value, C1222CallingAPTitle):
+			value = C1222CallingAPTitle(value)
+		self._calling_ap = value
+		self._calling_ap_data = value.encode()
+
+	@property
+	def calling_ap_invocation_id(self):
+		return self._calling_ap_invocation_id
+
+	@calling_ap_invocation_id.setter
+	def calling_ap_invocation_id(self, value):
+		value = int(value)
+		self._calling_ap_invocation_id = value
+		self._calling_ap_invocation_id_data = encode_invocation_id(value)
+
 	def __repr__(self):
 		if isinstance(self._data, C1222Data):
 			return '<C1222Packet data=' + repr(self._data) + ' data_len=' + str(len(self._data)) + ' >'
 		else:
-			return '<C1222Packet data=0x' + str(self._data).encode('hex') + ' data_len=' + str(len(self._data)) + ' >'
+			return '<C1222Packet data=0x' + binascii.b2a_hex(self._data).decode('utf-8') + ' data_len=' + str(len(self._data)) + ' >'
 
 	@classmethod
 	def from_bytes(cls, data):
-		if data[0] != 0x60:
-			raise Exception('invalid start byte')
-
-		(called_ap, data) = ber_decoder.decode(data)
-		(called_ap_invocation_id, data) = ber_decoder.decode(data)
-		(calling_ap, data) = ber_decoder.decode(data)
-		(calling_ap_invocation_id, data) = ber_decoder.decode(data)
-
-		if data[0] == 0xbe:
-			data = C1222UserInformation.from_bytes(data)
-
-		called_ap = C1222CalledAPTitle(called_ap)
-		calling_ap = C1222CallingAPTitle(calling_ap)
-		calling_ap_invocation_id = C1222CallingAPInvocationID(calling_ap_invocation_id)
+		try:
+			message = decode_acse(data)
+		except ValueError as error:
+			raise Exception(str(error))
+		elements = message.elements
+		if TAG_CALLED_AP_TITLE not in elements or TAG_CALLING_AP_TITLE not in elements:
+			raise Exception('missing the called or calling ap title')
+		called_ap = _encode_element(TAG_CALLED_AP_TITLE, elements[TAG_CALLED_AP_TITLE])
+		calling_ap = _encode_element(TAG_CALLING_AP_TITLE, elements[TAG_CALLING_AP_TITLE])
+		if TAG_CALLING_AP_INVOCATION_ID in elements:
+			calling_ap_invocation_id = decode_integer(decode_tagged(elements[TAG_CALLING_AP_INVOCATION_ID], 0x02))
+		else:
+			calling_ap_invocation_id = 0
+		data = b'' if message.user_information is None else C1222UserInformation(message.user_information)
 
 		frame = cls(called_ap, calling_ap, calling_ap_invocation_id, data)
 		return frame
@@ -404,20 +542,14 @@ class C1222Packet(C1222Request):
 
 	def set_data(self, value):
 		self._data = value
-		length = len(self.called_ap.encode())
-		length += len(self.calling_ap.encode())
-		length += len(self.calling_ap_invocation_id.encode())
+		length = len(self._called_ap_data)
+		length += len(self._calling_ap_data)
+		length += len(self._calling_ap_invocation_id_data)
 		length += len(self._data)
 		self.set_length(length)
 
 	def set_length(self, length):
-		self._length = struct.pack('B', length)
+		self._length = ber_encode_length(length)
 
 	def build(self):
-		packet = self.start
-		packet += self._length
-		packet += self.called_ap.encode()
-		packet += self.calling_ap.encode()
-		packet += self.calling_ap_invocation_id.encode()
-		packet += self._data
-		return packet
+		return b''.join((self.start, self._length, self._called_ap_data, self._calling_ap_data, self._calling_ap_invocation_id_data, _to_bytes(self._data)))
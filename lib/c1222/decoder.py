@@ -0,0 +1,192 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  c1222/decoder.py
+#
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are
+#  met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following disclaimer
+#    in the documentation and/or other materials provided with the
+#    distribution.
+#  * Neither the name of the project nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+#  "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+#  LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+#  A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+#  OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+#  SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+#  LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+#  DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+#  THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+#  (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+#  OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+
+from __future__ import unicode_literals
+
+import collections
+
+from c1222.utilities import ber_decode_length
+
+TAG_APPLICATION_CONTEXT = 0xa1
+TAG_CALLED_AP_TITLE = 0xa2
+TAG_CALLED_AP_INVOCATION_ID = 0xa4
+TAG_CALLING_AP_TITLE = 0xa6
+TAG_CALLING_AP_INVOCATION_ID = 0xa8
+TAG_CALLING_AUTHENTICATION_VALUE = 0xac
+TAG_USER_INFORMATION = 0xbe
+
+ACSEMessage = collections.namedtuple('ACSEMessage', ('elements', 'user_information'))
+"""
+The elements of a decoded ACSE packet. *elements* is an ordered dictionary
+of the contents of each header element keyed by tag and *user_information*
+is the EPSEM data carried by the packet, or None if it has none.
+"""
+
+def _view(data):
+	if isinstance(data, memoryview):
+		return data
+	return memoryview(data)
+
+def decode_element(data, position=0):
+	"""
+	Decode the BER element which starts at *position*. Only the single octet
+	tags which are used by C12.22 are supported, lengths may be in either
+	the short or the long form.
+
+	:param memoryview data: The data containing the element.
+	:param int position: The position of the tag of the element in *data*.
+	:return: The tag, a view of the contents and the position after the element.
+	:rtype: tuple
+	"""
+	data = _view(data)
+	if position + 1 >= len(data):
+		raise ValueError('invalid data (size)')
+	tag = data[position]
+	if tag & 0x1f == 0x1f:
+		raise ValueError('unsupported tag')
+	length = data[position + 1]
+	if length < 0x80:
+		start = position + 2
+	else:
+		length, start = ber_decode_length(data, position + 1)
+	end = start + length
+	if end > len(data):
+		raise ValueError('invalid data (size)')
+	return tag, data[start:end], end
+
+def iter_elements(data):
+	"""
+	Decode consecutive BER elements, such as the contents of a constructed
+	element.
+
+	:param memoryview data: The data containing the elements.
+	:return: A generator yielding tuples of the tag and a view of the contents.
+	"""
+	data = _view(data)
+	position = 0
+	while position < len(data):
+		tag, value, position = decode_element(data, position)
+		yield tag, value
+
+def decode_integer(data):
+	"""
+	Decode the contents of an integer element.
+
+	:param memoryview data: The contents of the element.
+	:rtype: int
+	"""
+	if not len(data):
+		raise ValueError('invalid data (size)')
+	value = 0
+	for octet in bytearray(data):
+		value = (value << 8) | octet
+	if data[0] & 0x80:
+		value -= 1 << (len(data) * 8)
+	return value
+
+def decode_oid(data):
+	"""
+	Decode the contents of an object identifier element into its dotted
+	string form.
+
+	:param memoryview data: The contents of the element.
+	:rtype: str
+	"""
+	if not len(data) or data[len(data) - 1] & 0x80:
+		raise ValueError('invalid data (size)')
+	arcs = []
+	value = 0
+	for octet in bytearray(data):
+		value = (value << 7) | (octet & 0x7f)
+		if octet & 0x80:
+			continue
+		if not arcs:
+			first = min(value // 40, 2)
+			arcs.extend((first, value - first * 40))
+		else:
+			arcs.append(value)
+		value = 0
+	return '.'.join(str(arc) for arc in arcs)
+
+def decode_tagged(data, tag):
+	"""
+	Decode the single element contained in an explicitly tagged element,
+	such as the integer within a calling AP invocation ID.
+
+	:param memoryview data: The contents of the explicitly tagged element.
+	:param int tag: The tag which the contained element must have.
+	:return: A view of the contents of the contained element.
+	:rtype: memoryview
+	"""
+	inner_tag, value, end = decode_element(data)
+	if inner_tag != tag or end != len(data):
+		raise ValueError('invalid tagged element')
+	return value
+
+def decode_user_information(data):
+	"""
+	Decode the contents of a user information element, which wraps the EPSEM
+	data in an external element.
+
+	:param memoryview data: The contents of the user information element.
+	:return: A view of the EPSEM data.
+	:rtype: memoryview
+	"""
+	tag, value, end = decode_element(data)
+	if tag != 0x28 or end != len(data):
+		raise ValueError('invalid user information')
+	for tag, value in iter_elements(value):
+		if tag == 0x81:
+			return value
+	raise ValueError('invalid user information')
+
+def decode_acse(data):
+	"""
+	Decode a C12.22 ACSE packet. No data is copied, the elements are views
+	into *data*.
+
+	:param data: The data of the entire packet.
+	:rtype: :py:class:`.ACSEMessage`
+	"""
+	tag, value, end = decode_element(data)
+	if tag != 0x60:
+		raise ValueError('invalid start byte')
+	if end != len(data):
+		raise ValueError('invalid data (size)')
+	elements = collections.OrderedDict()
+	user_information = None
+	for tag, element in iter_elements(value):
+		if tag == TAG_USER_INFORMATION:
+			user_information = decode_user_information(element)
+		else:
+			elements[tag] = element
+	return ACSEMessage(elements, user_information)
@@ -32,31 +32,39 @@
 
 from __future__ import unicode_literals
 
+from c1218.errors import C1218IOError, C1218NegotiateError, C1218ReadTableError, C1218WriteTableError
+
+# the errors which correspond to those of C12.18 inherit from them so code
+# written for a C12.18 connection handles them the same way
+
 class C1222Error(Exception):
 	"""
 	This is a generic C1222 Error.
 	"""
 	def __init__(self, msg, error_code=None):
 		self.message = msg
+		self.code = error_code
 		self.err_code = error_code
 
 	def __str__(self):
 		return repr(self.message)
 
-class C1222IOError(C1222Error):
+class C1222IOError(C1222Error, C1218IOError):
 	"""
 	Raised when there is a problem sending or receiving data.
 	"""
 	def __init__(self, msg):
 		self.message = msg
+		self.code = None
+		self.err_code = None
 
-class C1222NegotiateError(C1222Error):
+class C1222NegotiateError(C1222Error, C1218NegotiateError):
 	"""
 	Raised in response to an invalid reply to a Negotiate request.
 	"""
 	pass
 
-class C1222ReadTableError(C1222Error):
+class C1222ReadTableError(C1222Error, C1218ReadTableError):
 	"""
 	Raised when a table is not successfully read.
 
@@ -65,7 +73,7 @@ class C1222ReadTableError(C1222Error):
 	"""
 	pass
 
-class C1222WriteTableError(C1222Error):
+class C1222WriteTableError(C1222Error, C1218WriteTableError):
 	"""
 	Raised when a table is not successfully written to.
 
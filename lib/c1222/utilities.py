@@ -34,7 +34,7 @@ from __future__ import unicode_literals
 
 import struct
 
-import crcelk
+from c1218.utilities import CRC16HDLC
 
 def data_checksum(data):
 	chksum = 0
@@ -44,5 +44,57 @@ def data_checksum(data):
 	return struct.pack('B', chksum)
 
 def packet_checksum(data):
-	chksum = crcelk.CRC_HDLC.calc_bytes(data)
-	return struct.pack('<H', chksum)
+	return CRC16HDLC(data).digest()
+
+def ber_encode_length(length):
+	"""
+	Encode a length for a BER element, using the short form for lengths
+	less than 128 and the long form otherwise.
+
+	:param int length: The length to encode.
+	:rtype: bytes
+	"""
+	if length < 0x80:
+		return struct.pack('B', length)
+	octets = b''
+	while length:
+		octets = struct.pack('B', length & 0xff) + octets
+		length >>= 8
+	return struct.pack('B', 0x80 | len(octets)) + octets
+
+def ber_decode_length(data, position):
+	"""
+	Decode the length of a BER element in either the short or the long form.
+
+	:param bytes data: The data containing the encoded length.
+	:param int position: The position of the first octet of the length in *data*.
+	:return: The length and the position of the first octet after it.
+	:rtype: tuple
+	"""
+	if position >= len(data):
+		raise ValueError('invalid data (size)')
+	length = data[position]
+	position += 1
+	if length < 0x80:
+		return length, position
+	count = length & 0x7f
+	if not count or position + count > len(data):
+		raise ValueError('invalid data (size)')
+	length = 0
+	for octet in bytearray(data[position:position + count]):
+		length = (length << 8) | octet
+	return length, position + count
+
+def ber_encode_integer(value):
+	"""
+	Encode the contents of a BER integer element using the fewest octets
+	which represent the value in two's complement.
+
+	:param int value: The value to encode.
+	:rtype: bytes
+	"""
+	size = 1
+	while not -(1 << (size * 8 - 1)) <= value < (1 << (size * 8 - 1)):
+		size += 1
+	value &= (1 << (size * 8)) - 1
+	return bytes(bytearray((value >> (8 * shift)) & 0xff for shift in range(size - 1, -1, -1)))
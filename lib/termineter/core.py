@@ -42,6 +42,8 @@ import sys
 
 import c1218.connection
 import c1218.errors
+import c1218.metrics
+import c1218.trace
 import termineter.module
 import termineter.errors
 import termineter.options
@@ -77,6 +79,9 @@ class Framework(object):
 
 		self.serial_connection = None
 		self._serial_connected = False
+		self._serial_settings_key = None
+		self._trace_recorder = None
+		self.metrics = c1218.metrics.ConnectionMetrics()
 
 		# setup logging stuff
 		main_file_handler = logging.handlers.RotatingFileHandler(os.path.join(self.directories.user_data, self.__package__ + '.log'), maxBytes=262144, backupCount=5)
@@ -97,15 +102,25 @@ class Framework(object):
 		self.options.add_boolean('PASSWORD_HEX', 'if the password is in hex', default=True)
 		self.advanced_options = termineter.options.AdvancedOptions(self.directories)
 		self.advanced_options.add_boolean('AUTO_CONNECT', 'automatically handle connections for modules', default=True)
-		self.advanced_options.add_boolean('CACHE_TABLES', 'cache certain read-only tables', default=True)
+		self.advanced_options.add_boolean('CACHE_TABLES', 'cache tables according to their policies', default=True)
 		self.advanced_options.set_callback('CACHE_TABLES', self._opt_callback_set_cache_tables)
+		self.advanced_options.add_integer('CACHE_SIZE', 'maximum number of bytes of table data to cache', default=262144)
+		self.advanced_options.add_boolean('CACHE_PERSIST', 'persist cached static tables between connections', default=False)
 		self.advanced_options.add_integer('C1218_MAX_PACKETS', 'c12.18 maximum packets for reassembly', default=2)
 		self.advanced_options.add_integer('C1218_PACKET_SIZE', 'c12.18 maximum packet size', default=512)
+		self.advanced_options.add_integer('C1218_BAUD_RATE', 'c12.18 baud rate to negotiate', default=9600)
+		self.advanced_options.add_float('C1218_KEEPALIVE', 'fraction of the channel timeout to keep an idle session open at (0 to disable)', default=0.0)
+		self.advanced_options.set_callback('C1218_KEEPALIVE', self._opt_callback_set_keepalive)
 		self.advanced_options.add_integer('SERIAL_BAUD_RATE', 'serial connection baud rate', default=9600)
 		self.advanced_options.add_integer('SERIAL_BYTE_SIZE', 'serial connection byte size', default=serial.EIGHTBITS)
 		self.advanced_options.add_integer('SERIAL_STOP_BITS', 'serial connection stop bits', default=serial.STOPBITS_ONE)
 		self.advanced_options.add_string('TABLE_FORMAT', 'the format to print tables in', default='simple')
 		self.advanced_options.set_callback('TABLE_FORMAT', self._opt_callback_set_table_format)
+		self.advanced_options.add_boolean('STICKY_SESSION', 'keep the c12.18 session open between module runs', default=False)
+		self.advanced_options.set_callback('STICKY_SESSION', self._opt_callback_set_sticky_session)
+		self.advanced_options.add_string('TRACE_FILE', 'record the serial link traffic to this file', required=False)
+		self.advanced_options.set_callback('TRACE_FILE', self._opt_callback_set_trace_file)
+		self.advanced_options.add_string('METRICS_FILE', 'write the connection metrics to this file in the openmetrics format', required=False)
 		if sys.platform.startswith('linux'):
 			self.options.set_option_value('USE_COLOR', 'True')
 
@@ -126,6 +141,33 @@ class Framework(object):
 			self.serial_connection.set_table_cache_policy(policy)
 		return True
 
+	def _opt_callback_set_keepalive(self, fraction, _):
+		if not 0 <= fraction < 1:
+			self.print_error('C1218_KEEPALIVE must be at least 0 and less than 1')
+			return False
+		if self.is_serial_connected():
+			self.serial_connection.keepalive = fraction or None
+			if fraction:
+				self.serial_connection.start_keepalive(fraction, self.serial_connection.channel_timeout)
+			else:
+				self.serial_connection.stop_keepalive()
+		return True
+
+	def _opt_callback_set_sticky_session(self, sticky, _):
+		if not sticky and self.serial_connection and self.serial_connection._initialized:
+			try:
+				self.serial_connection.stop(force=True)
+			except c1218.errors.C1218IOError as error:
+				self.logger.warning('failed to stop the sticky session: ' + str(error))
+		return True
+
+	def _opt_callback_set_trace_file(self, path, _):
+		# the new file is opened by the next connection
+		if self._trace_recorder is not None:
+			self._trace_recorder.close()
+			self._trace_recorder = None
+		return True
+
 	def _opt_callback_set_table_format(self, table_format, _):
 		if table_format not in tabulate.tabulate_formats:
 			self.print_error('TABLE_FORMAT must be one of: ' + ', '.join(tabulate.tabulate_formats))
@@ -137,34 +179,54 @@ class Framework(object):
 			self.print_error('The serial interface has not been connected')
 			return False
 
-		try:
-			self.serial_get()
-		except Exception as error:
-			self.print_exception(error)
-			return False
+		if self.advanced_options['STICKY_SESSION'] and self._serial_session_reusable():
+			self.logger.info('reusing the open serial connection')
+		else:
+			try:
+				self.serial_get()
+			except Exception as error:
+				self.print_exception(error)
+				return False
 
 		ConnectionState = termineter.module.ConnectionState
 		if not self.advanced_options['AUTO_CONNECT']:
 			return True
 		if module.connection_state == ConnectionState.none:
+			# the module expects the device to be in its base state
+			if self.serial_connection._initialized:
+				self.serial_connection.stop(force=True)
 			return True
 
-		try:
-			self.serial_connect()
-		except Exception as error:
-			self.print_exception(error)
-			return
-		self.print_good('Successfully connected and the device is responding')
+		if self.serial_connection._initialized:
+			# the session is re-established if the meter rejects the next request
+			self.serial_connection.resume_session()
+		else:
+			try:
+				self.serial_connect()
+			except Exception as error:
+				self.print_exception(error)
+				return
+			self.print_good('Successfully connected and the device is responding')
 		if module.connection_state == ConnectionState.connected:
 			return True
 
-		if not self.serial_login():
+		if not self.serial_connection.logged_in and not self.serial_login():
 			self.logger.warning('meter login failed, some tables may not be accessible')
 		if module.connection_state == ConnectionState.authenticated:
 			return True
 		self.logger.warning('unknown optical connection state: ' + module.connection_state.name)
 		return True
 
+	def _serial_session_reusable(self):
+		conn = self.serial_connection
+		if conn is None or not conn.serial_h.is_open:
+			return False
+		return self._serial_settings_key == self._get_serial_settings_key()
+
+	def _get_serial_settings_key(self):
+		options = ('C1218_MAX_PACKETS', 'C1218_PACKET_SIZE', 'C1218_BAUD_RATE', 'SERIAL_BAUD_RATE', 'SERIAL_BYTE_SIZE', 'SERIAL_STOP_BITS', 'CACHE_PERSIST', 'CACHE_SIZE')
+		return (self.options['SERIAL_CONNECTION'], self.options['USERNAME'], self.options['USER_ID'], self.options['PASSWORD']) + tuple(self.advanced_options[option] for option in options)
+
 	def reload_module(self, module_path=None):
 		"""
 		Reloads a module into the framework.  If module_path is not
@@ -211,13 +273,29 @@ class Framework(object):
 		if isinstance(module, termineter.module.TermineterModuleOptical) and not self._run_optical(module):
 			return
 		self.logger.info('running module: ' + module.path)
+		optical = isinstance(module, termineter.module.TermineterModuleOptical)
 		try:
 			result = module.run()
 		finally:
-			if isinstance(module, termineter.module.TermineterModuleOptical) and self.serial_connection and self.advanced_options['AUTO_CONNECT']:
+			if optical and self.serial_connection and self.advanced_options['AUTO_CONNECT'] and not self.advanced_options['STICKY_SESSION']:
 				self.serial_connection.stop()
+			if optical:
+				self.export_metrics()
 		return result
 
+	def export_metrics(self):
+		"""
+		Write the connection metrics to the file configured by the
+		METRICS_FILE option if it is set.
+		"""
+		path = self.advanced_options['METRICS_FILE']
+		if not path:
+			return
+		try:
+			self.metrics.write_openmetrics(os.path.expanduser(path))
+		except (IOError, OSError) as error:
+			self.logger.error('failed to write the metrics file: ' + str(error))
+
 	@property
 	def use_colors(self):
 		return self.options['USE_COLOR']
@@ -344,7 +422,8 @@ class Framework(object):
 		"""
 		frmwk_c1218_settings = {
 			'nbrpkts': self.advanced_options['C1218_MAX_PACKETS'],
-			'pktsize': self.advanced_options['C1218_PACKET_SIZE']
+			'pktsize': self.advanced_options['C1218_PACKET_SIZE'],
+			'baudrate': self.advanced_options['C1218_BAUD_RATE']
 		}
 
 		frmwk_serial_settings = termineter.utilities.get_default_serial_settings()
@@ -352,24 +431,64 @@ class Framework(object):
 		frmwk_serial_settings['bytesize'] = self.advanced_options['SERIAL_BYTE_SIZE']
 		frmwk_serial_settings['stopbits'] = self.advanced_options['SERIAL_STOP_BITS']
 
+		cache_directory = None
+		if self.advanced_options['CACHE_PERSIST']:
+			cache_directory = os.path.join(self.directories.user_data, 'table_cache')
+
+		if self.serial_connection is not None:
+			try:
+				self.serial_connection.close(force_stop=True)
+			except (c1218.errors.C1218IOError, serial.serialutil.SerialException) as error:
+				self.logger.warning('failed to close the previous serial connection: ' + str(error))
+			self.serial_connection = None
+
 		self.logger.info('opening serial device: ' + self.options['SERIAL_CONNECTION'])
 		try:
-			self.serial_connection = c1218.connection.Connection(self.options['SERIAL_CONNECTION'], c1218_settings=frmwk_c1218_settings, serial_settings=frmwk_serial_settings, enable_cache=self.advanced_options['CACHE_TABLES'])
+			self.serial_connection = c1218.connection.Connection(
+				self.options['SERIAL_CONNECTION'],
+				c1218_settings=frmwk_c1218_settings,
+				serial_settings=frmwk_serial_settings,
+				enable_cache=self.advanced_options['CACHE_TABLES'],
+				cache_size=self.advanced_options['CACHE_SIZE'],
+				cache_directory=cache_directory,
+				keepalive=(self.advanced_options['C1218_KEEPALIVE'] or None),
+				trace=self._get_trace_recorder(),
+				metrics=self.metrics
+			)
 		except Exception as error:
 			self.logger.error('could not open the serial device')
 			raise error
+		self._serial_settings_key = self._get_serial_settings_key()
 		return self.serial_connection
 
+	def _get_trace_recorder(self):
+		path = self.advanced_options['TRACE_FILE']
+		if not path:
+			return None
+		if self._trace_recorder is None:
+			self.logger.info('recording the serial link traffic to: ' + path)
+			self._trace_recorder = c1218.trace.TraceRecorder(os.path.expanduser(path))
+		return self._trace_recorder
+
 	def serial_connect(self):
 		"""
-		Connect to the serial device.
+		Connect to the serial device, the open serial connection is used if
+		there is one and any session which is active on it is ended first.
 		"""
-		self.serial_get()
+		if self.serial_connection is None or not self.serial_connection.serial_h.is_open:
+			self.serial_get()
+		elif self.serial_connection._initialized:
+			# end the current session so the new one starts from the base state
+			self.serial_connection.stop(force=True)
 		try:
-			self.serial_connection.start()
+			started = self.serial_connection.start()
 		except c1218.errors.C1218IOError as error:
 			self.logger.error('serial connection has been opened but the meter is unresponsive')
 			raise error
+		if not started:
+			self._serial_connected = False
+			self.logger.error('serial connection has been opened but the meter rejected the session')
+			raise termineter.errors.FrameworkRuntimeError('the meter rejected the identification or negotiation request')
 		self._serial_connected = True
 		return True
 
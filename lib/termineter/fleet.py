@@ -0,0 +1,286 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  termineter/fleet.py
+#
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are
+#  met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following disclaimer
+#    in the documentation and/or other materials provided with the
+#    distribution.
+#  * Neither the name of the project nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+#  "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+#  LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+#  A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+#  OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+#  SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+#  LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+#  DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+#  THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+#  (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+#  OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+
+from __future__ import unicode_literals
+
+import collections
+import csv
+import io
+import logging
+import threading
+import time
+
+import c1218.errors
+import c1218.metrics
+import termineter.core
+import termineter.errors
+import termineter.module
+
+import serial
+
+FleetTarget = collections.namedtuple('FleetTarget', ('connection', 'username', 'user_id', 'password'))
+FleetTarget.__new__.__defaults__ = (None, None, None)
+
+FleetResult = collections.namedtuple('FleetResult', ('target', 'success', 'result', 'error', 'output', 'elapsed', 'attempts', 'metrics'))
+
+# errors which indicate a problem communicating with the device, targets which
+# fail with these are retried and count towards reducing the concurrency
+COMMUNICATION_ERRORS = (c1218.errors.C1218IOError, serial.SerialException, IOError)
+
+def load_targets(file_h):
+	"""
+	Load targets from a CSV file. Each row contains the connection string and
+	optionally the username, user id and password to use for the device.
+	Empty rows and rows starting with a # are ignored.
+
+	:param file_h: The file object to read the targets from.
+	:return: The targets which were loaded.
+	:rtype: list
+	"""
+	targets = []
+	for row in csv.reader(file_h):
+		row = [column.strip() for column in row]
+		if not row or not row[0] or row[0].startswith('#'):
+			continue
+		connection, username, user_id, password = (row + [None] * 4)[:4]
+		user_id = int(user_id, 0) if user_id else None
+		targets.append(FleetTarget(connection, username or None, user_id, password or None))
+	return targets
+
+class _WorkerFramework(object):
+	"""
+	A stand in for the framework which is given to each module instance run
+	by a worker. It provides the worker's own serial connection, options for
+	the target and output buffer while everything else is taken from the
+	real framework.
+	"""
+	print_error = termineter.core.Framework.print_error
+	print_exception = termineter.core.Framework.print_exception
+	print_good = termineter.core.Framework.print_good
+	print_hexdump = termineter.core.Framework.print_hexdump
+	print_line = termineter.core.Framework.print_line
+	print_status = termineter.core.Framework.print_status
+	print_table = termineter.core.Framework.print_table
+	print_warning = termineter.core.Framework.print_warning
+	# the methods which manage the connection operate on the worker's own
+	# connection so modules which reconnect do not affect the framework's
+	serial_connect = termineter.core.Framework.serial_connect
+	serial_disconnect = termineter.core.Framework.serial_disconnect
+	serial_get = termineter.core.Framework.serial_get
+	serial_login = termineter.core.Framework.serial_login
+	test_serial_connection = termineter.core.Framework.test_serial_connection
+	def __init__(self, frmwk, target, metrics=None):
+		self._frmwk = frmwk
+		overrides = {'SERIAL_CONNECTION': target.connection, 'USE_COLOR': False}
+		if target.username is not None:
+			overrides['USERNAME'] = target.username
+		if target.user_id is not None:
+			overrides['USER_ID'] = target.user_id
+		if target.password is not None:
+			overrides['PASSWORD'] = target.password
+		self.options = collections.ChainMap(overrides, frmwk.options)
+		self.stdout = io.StringIO()
+		self.serial_connection = None
+		self._serial_connected = False
+		# each device has its own metrics so degraded links can be identified
+		self.metrics = c1218.metrics.ConnectionMetrics() if metrics is None else metrics
+
+	def __getattr__(self, name):
+		return getattr(self._frmwk, name)
+
+	@property
+	def use_colors(self):
+		return self.options['USE_COLOR']
+
+	def _get_trace_recorder(self):
+		# the traffic of concurrent devices can not be recorded to a single trace
+		return None
+
+	def is_serial_connected(self):
+		return self._serial_connected
+
+class FleetExecutor(object):
+	"""
+	Run an optical module against many devices at once. Each device is
+	handled by a worker thread with its own connection and instance of the
+	module. The number of devices which are communicated with concurrently
+	is adjusted based on the rate of communication errors, it is halved when
+	too many errors occur and increased by one after each run of successes.
+	This backs off when the devices share a resource which is being
+	overwhelmed, such as a USB hub.
+	"""
+	def __init__(self, frmwk, module, targets, max_workers=8, min_workers=1, retries=1, error_threshold=0.25, window=8):
+		"""
+		:param frmwk: The framework instance.
+		:type frmwk: :py:class:`~termineter.core.Framework`
+		:param module: The configured module to run, each worker uses a copy of it.
+		:type module: :py:class:`~termineter.module.TermineterModuleOptical`
+		:param list targets: The :py:class:`.FleetTarget` instances to run the module against.
+		:param int max_workers: The maximum number of devices to communicate with at once.
+		:param int min_workers: The minimum number of devices to communicate with at once.
+		:param int retries: The number of times to retry a target which fails
+		  because of a communication error.
+		:param float error_threshold: The rate of errors at which the concurrency is reduced.
+		:param int window: The number of recent results the error rate is calculated from.
+		"""
+		if not isinstance(module, termineter.module.TermineterModuleOptical):
+			raise termineter.errors.FrameworkRuntimeError('fleet execution requires an optical module')
+		self.logger = logging.getLogger('termineter.fleet')
+		self.frmwk = frmwk
+		self.module = module
+		self.targets = list(targets)
+		self.max_workers = max(max_workers, 1)
+		self.min_workers = min(max(min_workers, 1), self.max_workers)
+		self.retries = retries
+		self.error_threshold = error_threshold
+		self.concurrency = self.min_workers
+		self._window = collections.deque(maxlen=window)
+		self._successes = 0
+		self._active = 0
+		self._condition = threading.Condition()
+		self._pending = collections.deque()
+		self._results = {}
+		self._metrics = {}
+
+	def _new_module(self, worker_frmwk):
+		module = self.module.__class__(worker_frmwk)
+		for options in ('options', 'advanced_options'):
+			source = getattr(self.module, options)
+			destination = getattr(module, options)
+			for name in source:
+				destination.get_option(name).value = source[name]
+		return module
+
+	def _record(self, failed):
+		# called with the condition held
+		self._window.append(failed)
+		if failed:
+			self._successes = 0
+			error_rate = sum(self._window) / float(len(self._window))
+			if len(self._window) >= 2 and error_rate >= self.error_threshold and self.concurrency > self.min_workers:
+				self.concurrency = max(self.concurrency // 2, self.min_workers)
+				self._window.clear()
+				self.logger.warning("error rate {0:.0%} exceeded the threshold, reducing concurrency to {1}".format(error_rate, self.concurrency))
+		else:
+			self._successes += 1
+			if self._successes >= self.concurrency and self.concurrency < self.max_workers:
+				self.concurrency += 1
+				self._successes = 0
+				self.logger.info("increasing concurrency to {0}".format(self.concurrency))
+
+	def run_target(self, target, metrics=None):
+		"""
+		Run the module against a single target.
+
+		:param target: The target to run the module against.
+		:type target: :py:class:`.FleetTarget`
+		:param metrics: The metrics to record the connection statistics in.
+		:type metrics: :py:class:`~c1218.metrics.ConnectionMetrics`
+		:return: The value returned by the module.
+		"""
+		worker_frmwk = _WorkerFramework(self.frmwk, target, metrics=metrics)
+		module = self._new_module(worker_frmwk)
+		ConnectionState = termineter.module.ConnectionState
+		conn = worker_frmwk.serial_get()
+		try:
+			if module.connection_state != ConnectionState.none:
+				if not conn.start():
+					raise c1218.errors.C1218IOError('the device did not respond to the identification request')
+				worker_frmwk._serial_connected = True
+				if module.connection_state == ConnectionState.authenticated and not worker_frmwk.serial_login():
+					self.logger.warning("meter login failed for {0}, some tables may not be accessible".format(target.connection))
+			else:
+				worker_frmwk._serial_connected = True
+			return module.run(), worker_frmwk.stdout.getvalue()
+		finally:
+			# the module may have reconnected, replacing the original connection
+			try:
+				worker_frmwk.serial_connection.close()
+			except COMMUNICATION_ERRORS as error:
+				self.logger.warning("failed to cleanly close the connection to {0}: {1}".format(target.connection, error))
+
+	def _worker(self):
+		while True:
+			with self._condition:
+				while self._pending and self._active >= self.concurrency:
+					self._condition.wait()
+				if not self._pending:
+					return
+				index, attempt = self._pending.popleft()
+				self._active += 1
+				metrics = self._metrics.setdefault(index, c1218.metrics.ConnectionMetrics())
+			target = self.targets[index]
+			self.logger.info("running module {0} against {1} (attempt {2})".format(self.module.name, target.connection, attempt))
+			started = time.monotonic()
+			retry = False
+			attempt_metrics = c1218.metrics.ConnectionMetrics()
+			try:
+				result, output = self.run_target(target, metrics=attempt_metrics)
+			except Exception as error:
+				failed = isinstance(error, COMMUNICATION_ERRORS)
+				retry = failed and attempt <= self.retries
+				if not retry:
+					self.logger.error("module {0} failed against {1}".format(self.module.name, target.connection), exc_info=True)
+				fleet_result = FleetResult(target, False, None, error, '', time.monotonic() - started, attempt, metrics)
+			else:
+				failed = False
+				fleet_result = FleetResult(target, True, result, None, output, time.monotonic() - started, attempt, metrics)
+			metrics.merge(attempt_metrics)
+			self.frmwk.metrics.merge(attempt_metrics)
+			with self._condition:
+				self._active -= 1
+				self._record(failed)
+				if retry:
+					self._pending.append((index, attempt + 1))
+				else:
+					self._results[index] = fleet_result
+				self._condition.notify_all()
+
+	def run(self):
+		"""
+		Run the module against all of the targets and wait for it to finish.
+
+		:return: A list of :py:class:`.FleetResult` instances in the order of the targets.
+		:rtype: list
+		"""
+		self._pending.extend((index, 1) for index in range(len(self.targets)))
+		self._results = {}
+		self._metrics = {}
+		threads = []
+		for _ in range(min(self.max_workers, len(self.targets))):
+			thread = threading.Thread(target=self._worker)
+			thread.daemon = True
+			thread.start()
+			threads.append(thread)
+		for thread in threads:
+			thread.join()
+		return [self._results[index] for index in range(len(self.targets))]
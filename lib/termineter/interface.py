@@ -46,7 +46,9 @@ import termineter
 import termineter.cmd
 import termineter.core
 import termineter.errors
+import termineter.fleet
 import termineter.its
+import termineter.module
 
 import termcolor
 
@@ -230,6 +232,65 @@ class InteractiveInterpreter(termineter.cmd.Cmd):
 		"""Alias of the 'run' command"""
 		self.do_run(args)
 
+	@termineter.cmd.command('Run a module against many devices in parallel')
+	@termineter.cmd.argument('-r', '--retries', type=int, default=1, help='the number of times to retry a device after a communication error')
+	@termineter.cmd.argument('-w', '--workers', type=int, default=8, help='the maximum number of devices to communicate with at once')
+	@termineter.cmd.argument('targets_file', help='a csv file of connection strings and optionally usernames, user ids and passwords')
+	@termineter.cmd.argument('module', nargs='?', help='the module to run')
+	def do_fleet(self, args):
+		module = self.frmwk.current_module
+		if args.module is not None:
+			if args.module not in self.frmwk.modules:
+				self.print_error('Invalid module specified: ' + args.module)
+				return
+			module = self.frmwk.modules[args.module]
+		if module is None:
+			self.print_error('Must \'use\' module first')
+			return
+		if not isinstance(module, termineter.module.TermineterModuleOptical):
+			self.print_error('Only optical modules can be run against a fleet')
+			return
+		missing_options = [option for option in module.get_missing_options() if option != 'SERIAL_CONNECTION']
+		if missing_options:
+			self.print_error('The following options must be set: ' + ', '.join(missing_options))
+			return
+		try:
+			with open(args.targets_file, 'r') as file_h:
+				targets = termineter.fleet.load_targets(file_h)
+		except (IOError, ValueError) as error:
+			self.print_exception(error)
+			return
+		if not targets:
+			self.print_error('No targets were loaded from: ' + args.targets_file)
+			return
+
+		self.print_status("Running {0} against {1:,} devices with up to {2} workers".format(module.name, len(targets), args.workers))
+		executor = termineter.fleet.FleetExecutor(self.frmwk, module, targets, max_workers=args.workers, retries=args.retries)
+		try:
+			results = executor.run()
+		except KeyboardInterrupt:
+			self.print_line('')
+			return
+		rows = []
+		for result in results:
+			if result.success:
+				self.print_good('Results for ' + result.target.connection + ':')
+				if result.output:
+					self.print_line(result.output.rstrip())
+			rows.append((
+				result.target.connection,
+				'success' if result.success else 'failed: ' + result.error.__class__.__name__,
+				"{0:.2f}s".format(result.elapsed),
+				result.attempts,
+				result.metrics.link_errors
+			))
+		self.print_table(rows, headers=('Device', 'Status', 'Time', 'Attempts', 'Link Errors'))
+		successes = sum(1 for result in results if result.success)
+		self.print_status("Completed {0:,} of {1:,} devices successfully".format(successes, len(results)))
+
+	def complete_fleet(self, text, line, begidx, endidx):
+		return complete_path(text, allow_files=True)
+
 	def do_help(self, args):
 		super(InteractiveInterpreter, self).do_help(args)
 		self.print_line('')
@@ -564,6 +625,63 @@ class InteractiveInterpreter(termineter.cmd.Cmd):
 	def complete_show(self, text, line, begidx, endidx):
 		return [i for i in ['advanced', 'modules', 'options'] if i.startswith(text.lower())]
 
+	@termineter.cmd.command('Show the connection link and service statistics')
+	@termineter.cmd.argument('-e', '--export', dest='export_file', help='write the statistics to a file in the openmetrics format')
+	@termineter.cmd.argument('-r', '--reset', action='store_true', default=False, help='reset the statistics after showing them')
+	@termineter.cmd.argument('-t', '--tables', action='store_true', default=False, help='show the latency of each table')
+	def do_stats(self, args):
+		metrics = self.frmwk.metrics
+		milliseconds = lambda value: '' if value is None else "{0:.1f}".format(value * 1000)
+		self.print_line('')
+		self.print_line('Link Statistics' + os.linesep + '===============')
+		self.print_line('')
+		rows = [(name.replace('_', ' ').capitalize(), "{0:,}".format(value)) for name, value in metrics.link.items()]
+		throughput = metrics.throughput
+		rows.append(('Throughput', '' if throughput is None else "{0:,.0f} bytes/s".format(throughput)))
+		self.frmwk.print_table(rows, headers=('Counter', 'Value'), line_prefix='  ')
+		self.print_line('')
+		if metrics.services:
+			self.print_line('Service Statistics' + os.linesep + '==================')
+			self.print_line('')
+			rows = []
+			for service, histogram in metrics.services.items():
+				rows.append((
+					service,
+					histogram.count,
+					metrics.errors(service),
+					milliseconds(histogram.mean),
+					milliseconds(histogram.quantile(0.95)),
+					milliseconds(histogram.max)
+				))
+			self.frmwk.print_table(rows, headers=('Service', 'Requests', 'Errors', 'Mean (ms)', 'P95 (ms)', 'Max (ms)'), line_prefix='  ')
+			self.print_line('')
+			errors = sorted((count, service, code) for (service, code), count in metrics.responses.items() if code != 'ok')
+			if errors:
+				rows = [(service, code, count) for count, service, code in reversed(errors)]
+				self.frmwk.print_table(rows, headers=('Service', 'Response', 'Count'), line_prefix='  ')
+				self.print_line('')
+		if args.tables and metrics.tables:
+			self.print_line('Table Statistics' + os.linesep + '================')
+			self.print_line('')
+			rows = []
+			for (service, tableid), histogram in sorted(metrics.tables.items(), key=lambda item: (item[0][1], item[0][0])):
+				rows.append((tableid, service, histogram.count, milliseconds(histogram.mean), milliseconds(histogram.max)))
+			self.frmwk.print_table(rows, headers=('Table', 'Service', 'Requests', 'Mean (ms)', 'Max (ms)'), line_prefix='  ')
+			self.print_line('')
+		if args.export_file:
+			try:
+				metrics.write_openmetrics(args.export_file)
+			except (IOError, OSError) as error:
+				self.print_exception(error)
+			else:
+				self.print_status('Wrote the statistics to: ' + args.export_file)
+		if args.reset:
+			metrics.reset()
+			self.print_status('The statistics have been reset')
+
+	def complete_stats(self, text, line, begidx, endidx):
+		return complete_path(text, allow_files=True)
+
 	@termineter.cmd.command('Select a module to use')
 	@termineter.cmd.argument('module', help='the module to use')
 	def do_use(self, args):
@@ -61,7 +61,7 @@ class Module(TermineterModuleOptical):
 		self.frmwk.print_status('Starting dump, writing table data to: ' + self.options['FILE'])
 		for tableid in range(lower_boundary, (upper_boundary + 1)):
 			try:
-				data = conn.get_table_data(tableid)
+				data = b''.join(conn.iter_table_data(tableid))
 			except C1218ReadTableError as error:
 				data = None
 				if error.code == 10:  # ISSS
@@ -71,7 +71,7 @@ class Module(TermineterModuleOptical):
 					if not self.frmwk.serial_login():
 						logger.warning('meter login failed, some tables may not be accessible')
 					try:
-						data = conn.get_table_data(tableid)
+						data = b''.join(conn.iter_table_data(tableid))
 					except C1218ReadTableError as error:
 						data = None
 						if error.code == 10:
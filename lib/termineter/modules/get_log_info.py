@@ -32,9 +32,15 @@
 
 from __future__ import unicode_literals
 
+import binascii
+import json
+import os
+import tempfile
+
 from c1218.errors import C1218ReadTableError
-from c1219.access.log import C1219LogAccess
+from c1219.access.log import C1219HistoryLogReader, C1219LogAccess
 from c1219.data import C1219_EVENT_CODES
+from c1219.errors import C1219ParseError
 from termineter.module import TermineterModuleOptical
 
 class Module(TermineterModuleOptical):
@@ -44,24 +50,65 @@ class Module(TermineterModuleOptical):
 		self.description = 'Get Information About The Meter\'s Logs'
 		self.detailed_description = """\
 		This module reads various C1219 tables from decade 70 to gather log information from the smart meter. If
-		successful the parsed contents of the logs will be displayed.
+		successful the parsed contents of the logs will be displayed. When INCREMENTAL is set, the sequence number of
+		the newest entry is saved for each meter and only the entries that were added since the last run are read.
 		"""
+		self.options.add_boolean('INCREMENTAL', 'only read entries added since the last run', default=False)
 
-	def run(self):
-		conn = self.frmwk.serial_connection
+	@property
+	def state_path(self):
+		return os.path.join(self.frmwk.directories.user_data, 'history_log_state.json')
+
+	def load_state(self):
+		if not os.path.isfile(self.state_path):
+			return {}
+		try:
+			with open(self.state_path, 'r') as file_h:
+				return json.load(file_h)
+		except (IOError, OSError, ValueError) as error:
+			self.logger.warning("failed to load the history log state from {0}: {1}".format(self.state_path, error))
+		return {}
 
+	def save_state(self, state):
 		try:
-			log_ctl = C1219LogAccess(conn)
-		except C1218ReadTableError:
-			self.frmwk.print_error('Could not read necessary tables, logging may not be enabled')
-			return
+			file_d, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.state_path), suffix='.tmp')
+			with os.fdopen(file_d, 'w') as file_h:
+				json.dump(state, file_h)
+			os.replace(tmp_path, self.state_path)
+		except (IOError, OSError) as error:
+			self.logger.warning("failed to save the history log state to {0}: {1}".format(self.state_path, error))
 
-		if len(log_ctl.logs) == 0:
-			self.frmwk.print_status('Log History Table Contains No Entries')
-			return
+	def run(self):
+		conn = self.frmwk.serial_connection
+
+		if self.options['INCREMENTAL']:
+			state = self.load_state()
+			reader = C1219HistoryLogReader(conn, state=state)
+			try:
+				logs = reader.read()
+			except (C1218ReadTableError, C1219ParseError):
+				self.frmwk.print_error('Could not read necessary tables, logging may not be enabled')
+				return
+			self.save_state(state)
+			if reader.nbr_missed_entries:
+				self.frmwk.print_error(str(reader.nbr_missed_entries) + ' Entries Were Overwritten Since The Last Run')
+			if len(logs) == 0:
+				self.frmwk.print_status('Log History Table Contains No New Entries')
+				return
+			self.frmwk.print_status('Log History Table Contains ' + str(len(logs)) + ' New Entries')
 		else:
+			try:
+				log_ctl = C1219LogAccess(conn)
+			except C1218ReadTableError:
+				self.frmwk.print_error('Could not read necessary tables, logging may not be enabled')
+				return
+			logs = log_ctl.logs
+			if len(logs) == 0:
+				self.frmwk.print_status('Log History Table Contains No Entries')
+				return
 			self.frmwk.print_status('Log History Table Contains ' + str(log_ctl.nbr_history_entries) + ' Entries')
-		log_entry = log_ctl.logs[0]
+
+		log_entry = logs[0]
 		topline = ''
 		line = ''
 		if 'Time' in log_entry:
@@ -74,13 +121,11 @@ class Module(TermineterModuleOptical):
 		line += "{0:<6} {1:<58} {2}".format('---', '----------------', '---------')
 		self.frmwk.print_line(topline)
 		self.frmwk.print_line(line)
-		for log_entry in log_ctl.logs:
+		for log_entry in logs:
 			line = ''
 			if 'Time' in log_entry:
-				topline += "{0:<19} ".format('Time Stamp')
 				line += "{0:<19} ".format(log_entry['Time'])
 			if 'Event Number' in log_entry:
-				topline += "{0:<5} ".format('Event Number')
 				line += "{0:<5} ".format(log_entry['Event Number'])
-			line += "{0:<6} {1:<58} {2}".format(log_entry['User ID'], C1219_EVENT_CODES[log_entry['Procedure Number']], log_entry['Arguments'].encode('hex'))
+			line += "{0:<6} {1:<58} {2}".format(log_entry['User ID'], C1219_EVENT_CODES[log_entry['Procedure Number']], binascii.b2a_hex(log_entry['Arguments']).decode('ascii'))
 			self.frmwk.print_line(line)
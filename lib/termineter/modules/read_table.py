@@ -42,15 +42,30 @@ class Module(TermineterModuleOptical):
 		self.description = 'Read Data From A C12.19 Table'
 		self.detailed_description = 'This module allows individual tables to be read from the smart meter.'
 		self.options.add_integer('TABLE_ID', 'table to read from', True)
+		self.options.add_string('FILE', 'file to write the raw table data into', required=False)
 
 	def run(self):
 		conn = self.frmwk.serial_connection
 		tableid = self.options['TABLE_ID']
 
+		if self.options['FILE']:
+			size = 0
+			with open(self.options['FILE'], 'wb') as file_h:
+				try:
+					for chunk in conn.iter_table_data(tableid):
+						file_h.write(chunk)
+						size += len(chunk)
+				except C1218ReadTableError as error:
+					self.frmwk.print_error('Caught C1218ReadTableError: ' + str(error))
+					return
+			self.frmwk.print_status('Wrote ' + str(size) + ' bytes to: ' + self.options['FILE'])
+			return
+
 		try:
-			data = conn.get_table_data(tableid)
+			data = b''.join(conn.iter_table_data(tableid))
 		except C1218ReadTableError as error:
 			self.frmwk.print_error('Caught C1218ReadTableError: ' + str(error))
+			return
 
 		self.frmwk.print_status('Read ' + str(len(data)) + ' bytes')
 		self.frmwk.print_hexdump(data)
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  termineter/modules/sniff_decode.py
+#
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are
+#  met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following disclaimer
+#    in the documentation and/or other materials provided with the
+#    distribution.
+#  * Neither the name of the project nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+#  "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+#  LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+#  A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+#  OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+#  SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+#  LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+#  DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+#  THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+#  (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+#  OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+
+from __future__ import unicode_literals
+
+import os
+
+from c1218.sniffer import CaptureDecoder, interleave, is_trace, read_raw_capture, read_trace_capture, write_json_lines
+from c1218.trace import TRACE_RX, TRACE_TX
+from termineter.module import TermineterModule
+
+class Module(TermineterModule):
+	def __init__(self, *args, **kwargs):
+		TermineterModule.__init__(self, *args, **kwargs)
+		self.description = 'Decode Captured C12.18 Traffic'
+		self.detailed_description = """\
+		This module decodes captured C12.18 traffic between a host and a meter into request and response pairs and
+		writes them to a file as JSON lines. The capture can either be a trace file written while TRACE_FILE was set or
+		raw data captured from each direction of the link, in which case HOST_FILE holds the data sent by the host and
+		DEVICE_FILE holds the data sent by the meter. Captures are decoded as they are read so files of any size can be
+		processed.
+		"""
+		self.options.add_rfile('HOST_FILE', 'the trace file or the raw data sent by the host')
+		self.options.add_rfile('DEVICE_FILE', 'the raw data sent by the device', required=False)
+		self.options.add_string('OUTPUT_FILE', 'file to write the decoded json lines into', default='sniff_decode.jsonl')
+		self.advanced_options.add_boolean('TABLES_ONLY', 'only write table reads and writes', default=False)
+
+	def run(self):
+		host_file = self.options['HOST_FILE']
+		device_file = self.options['DEVICE_FILE']
+		if not os.path.isfile(host_file):
+			self.frmwk.print_error('The host file does not exist')
+			return
+		decoder = CaptureDecoder()
+		if is_trace(host_file):
+			if device_file:
+				self.frmwk.print_error('DEVICE_FILE can not be used with a trace file')
+				return
+			records = decoder.decode(read_trace_capture(host_file))
+		else:
+			if not device_file:
+				self.frmwk.print_error('DEVICE_FILE must be set when HOST_FILE is a raw capture')
+				return
+			if not os.path.isfile(device_file):
+				self.frmwk.print_error('The device file does not exist')
+				return
+			requests = decoder.iter_messages(read_raw_capture(host_file, TRACE_TX), interleaved=False)
+			responses = decoder.iter_messages(read_raw_capture(device_file, TRACE_RX), interleaved=False)
+			records = decoder.iter_transactions(interleave(requests, responses))
+		if self.advanced_options['TABLES_ONLY']:
+			records = (record for record in records if record['service'] in ('read', 'write'))
+
+		self.frmwk.print_status('Decoding the captured traffic...')
+		with open(self.options['OUTPUT_FILE'], 'w') as file_h:
+			count = write_json_lines(records, file_h)
+		self.frmwk.print_status("Decoded {0:,} transactions from {1:,} frames".format(decoder.transactions, decoder.frames))
+		if decoder.crc_errors or decoder.retransmissions:
+			self.frmwk.print_status("Dropped {0:,} corrupt and {1:,} retransmitted frames".format(decoder.crc_errors, decoder.retransmissions))
+		self.frmwk.print_good("Wrote {0:,} records to {1}".format(count, self.options['OUTPUT_FILE']))
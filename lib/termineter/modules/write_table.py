@@ -35,7 +35,7 @@ from __future__ import unicode_literals
 import binascii
 import re
 
-from c1218.errors import C1218WriteTableError
+from c1218.errors import C1218IOError, C1218WriteTableError
 from termineter.module import TermineterModuleOptical
 
 class Module(TermineterModuleOptical):
@@ -52,6 +52,7 @@ class Module(TermineterModuleOptical):
 		self.options.add_boolean('USE_HEX', 'specifies that the \'DATA\' option is represented in hex', default=True)
 		self.options.add_integer('OFFSET', 'offset to start writing data at', required=False, default=0)
 		self.advanced_options.add_boolean('VERIFY', 'verify that the data was written with a read request', default=True)
+		self._write_progress = {}
 
 	def run(self):
 		conn = self.frmwk.serial_connection
@@ -68,17 +69,21 @@ class Module(TermineterModuleOptical):
 		else:
 			data = data.encode('utf-8')
 
+		if self._write_progress.get('written'):
+			self.frmwk.print_status("Resuming the previous write after {0:,} bytes".format(self._write_progress['written']))
 		try:
-			conn.set_table_data(tableid, data, offset)
-		except C1218WriteTableError as error:
+			conn.set_table_data_chunked(tableid, data, offset, progress=self._write_progress)
+		except (C1218IOError, C1218WriteTableError) as error:
 			self.frmwk.print_exception(error)
-		else:
-			self.frmwk.print_status('Successfully Wrote Data')
+			if self._write_progress.get('written'):
+				self.frmwk.print_status("Wrote {0:,} of {1:,} bytes, run the module again to resume".format(self._write_progress['written'], len(data)))
+			return
+		self.frmwk.print_status('Successfully Wrote Data')
 
 		if self.advanced_options['VERIFY']:
-			table = conn.get_table_data(tableid)
-			if table[offset:offset + len(data)] == data:
+			written = b''.join(conn.iter_table_data(tableid, offset=offset, octetcount=len(data)))
+			if written == data:
 				self.frmwk.print_status('Table Write Verification Passed')
 			else:
 				self.frmwk.print_error('Table Write Verification Failed')
-			self.frmwk.print_hexdump(table)
+			self.frmwk.print_hexdump(written)
@@ -185,7 +185,7 @@ class Options(collections.abc.Mapping):
 				raise TypeError('invalid value type')
 		else:
 			raise Exception('unknown value type')
-		if option.callback and not option.callback(value, old_value):
+		if option.callback and not option.callback(option.value, old_value):
 			option.value = old_value
 			return False
 		return True
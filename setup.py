@@ -74,7 +74,6 @@ setup(
 	license='BSD',
 	# these are duplicated in requirements.txt
 	install_requires=[
-		'crcelk>=1.3',
 		'pluginbase>=1.0.0',
 		'pyasn1>=0.4.5',
 		'pyserial>=3.4',
@@ -82,6 +81,11 @@ setup(
 		'tabulate>=0.8.3',
 		'termcolor>=1.1.0'
 	],
+	extras_require={
+		'async': ['pyserial-asyncio>=0.6']
+	},
+	# c1218.async_connection uses async and await
+	python_requires='>=3.5',
 	package_dir={'': 'lib'},
 	packages=find_packages('lib'),
 	package_data={
@@ -92,7 +96,6 @@ setup(
 		'Environment :: Console',
 		'License :: OSI Approved :: BSD License',
 		'Operating System :: OS Independent',
-		'Programming Language :: Python :: 3.4',
 		'Programming Language :: Python :: 3.5',
 		'Programming Language :: Python :: 3.6',
 		'Programming Language :: Python :: 3.7',
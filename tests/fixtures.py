@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  tests/fixtures.py
+#
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are
+#  met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following disclaimer
+#    in the documentation and/or other materials provided with the
+#    distribution.
+#  * Neither the name of the project nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+#  "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+#  LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+#  A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+#  OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+#  SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+#  LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+#  DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+#  THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+#  (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+#  OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+
+
+from __future__ import unicode_literals
+
+import struct
+
+from c1219.constants import DEVICE_IDENT_TBL, ED_MODE_STATUS_TBL, GEN_CONFIG_TBL, GENERAL_MFG_ID_TBL
+
+def meter_tables():
+	"""
+	Build the tables of a minimal little endian device for a
+	:py:class:`~c1218.simulator.MeterSimulator`. Only the general
+	configuration, manufacturer identification, mode status and device
+	identification tables are included.
+
+	:return: The table data keyed by table id.
+	:rtype: dict
+	"""
+	tables = {}
+	# utf-8 characters, little endian, ltime format 2, an electric meter
+	# implementing version 1.0 of the standard
+	tables[GEN_CONFIG_TBL] = struct.pack('<BBBBBBBBBBBBBBBBBBB', 0x06, 0x02, 0, 0, 0, 0, 0, 2, 0, 0, 0, 1, 0, 2, 0, 1, 0, 0, 0) + b'\xff\x7f\x0f'
+	tables[GENERAL_MFG_ID_TBL] = b'SIML' + b'TEST    ' + b'\x01\x00\x02\x03' + b'0000000000001218'
+	tables[ED_MODE_STATUS_TBL] = b'\x01\x00\x00\x00\x00'
+	tables[DEVICE_IDENT_TBL] = b'TEST METER          '
+	return tables
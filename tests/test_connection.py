@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  tests/test_connection.py
+#
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are
+#  met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following disclaimer
+#    in the documentation and/or other materials provided with the
+#    distribution.
+#  * Neither the name of the project nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+#  "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+#  LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+#  A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+#  OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+#  SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+#  LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+#  DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+#  THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+#  (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+#  OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+
+
+from __future__ import unicode_literals
+
+import unittest
+
+from c1218.connection import Connection
+from c1218.simulator import MeterSession, MeterSimulator
+from c1218.urlhandler import protocol_simulator
+
+SHORT_TABLE = 100
+LONG_TABLE = 101
+
+class StrictMeterSession(MeterSession):
+	# rejects partial reads which extend past the end of the table, or all of
+	# them with the simulator's partial_read_code
+	def _handle_read(self, request):
+		if request.offset is not None:
+			self.simulator.partial_reads += 1
+			table = self.simulator.tables.get(request.tableid, b'')
+			if self.simulator.partial_read_code is not None:
+				return self._code(self.simulator.partial_read_code)
+			if request.offset + request.octetcount > len(table):
+				return self._code('iar')
+		return super(StrictMeterSession, self)._handle_read(request)
+
+class StrictMeterSimulator(MeterSimulator):
+	def __init__(self, *args, **kwargs):
+		super(StrictMeterSimulator, self).__init__(*args, **kwargs)
+		self.partial_read_code = None
+		self.partial_reads = 0
+
+	def session(self):
+		return StrictMeterSession(self)
+
+class IterTableDataTests(unittest.TestCase):
+	def setUp(self):
+		self.simulator = StrictMeterSimulator({SHORT_TABLE: b'short', LONG_TABLE: bytes(bytearray(range(256)))})
+		protocol_simulator.register('test-connection', self.simulator)
+		self.conn = Connection('simulator://test-connection', enable_cache=False)
+		self.assertTrue(self.conn.start())
+		self.assertTrue(self.conn.login())
+
+	def tearDown(self):
+		self.conn.close(force_stop=True)
+		protocol_simulator.unregister('test-connection')
+		self.simulator.close()
+
+	def _read_long_table(self):
+		self.simulator.partial_reads = 0
+		self.assertEqual(b''.join(self.conn.iter_table_data(LONG_TABLE, chunk_size=64)), self.simulator.tables[LONG_TABLE])
+		# the fifth read past the end of the table is rejected
+		self.assertEqual(self.simulator.partial_reads, 5)
+
+	def test_table_shorter_than_chunk_size(self):
+		self.assertEqual(b''.join(self.conn.iter_table_data(SHORT_TABLE, chunk_size=64)), b'short')
+		self.assertIsNone(self.conn.partial_reads_supported)
+		# the rejected partial read does not affect the other tables
+		self._read_long_table()
+		self.assertTrue(self.conn.partial_reads_supported)
+		self.assertEqual(b''.join(self.conn.iter_table_data(SHORT_TABLE, chunk_size=64)), b'short')
+		self.assertEqual(b''.join(self.conn.iter_table_data(SHORT_TABLE, chunk_size=64, offset=1, octetcount=3)), b'hor')
+
+	def test_partial_reads_not_supported(self):
+		self.simulator.partial_read_code = 'sns'
+		self.assertEqual(b''.join(self.conn.iter_table_data(LONG_TABLE, chunk_size=64)), self.simulator.tables[LONG_TABLE])
+		self.assertIs(self.conn.partial_reads_supported, False)
+		# the table is read in its entirety without trying a partial read
+		self.simulator.partial_reads = 0
+		self.assertEqual(b''.join(self.conn.iter_table_data(LONG_TABLE, chunk_size=64, offset=10, octetcount=5)), self.simulator.tables[LONG_TABLE][10:15])
+		self.assertEqual(self.simulator.partial_reads, 0)
+
+if __name__ == '__main__':
+	unittest.main()
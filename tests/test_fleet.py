@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+#  tests/test_fleet.py
+#
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are
+#  met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following disclaimer
+#    in the documentation and/or other materials provided with the
+#    distribution.
+#  * Neither the name of the project nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+#  "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+#  LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+#  A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+#  OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+#  SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+#  LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+#  DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+#  THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+#  (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+#  OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+
+
+from __future__ import unicode_literals
+
+import io
+import unittest
+
+from c1218.simulator import MeterSimulator
+from c1218.urlhandler import protocol_simulator
+import termineter.core
+import termineter.fleet
+
+from tests.fixtures import meter_tables
+
+class FleetExecutorTests(unittest.TestCase):
+	def setUp(self):
+		self.simulators = []
+		self.frmwk = termineter.core.Framework(stdout=io.StringIO())
+		self.frmwk.advanced_options.set_option_value('CACHE_TABLES', 'false')
+
+	def tearDown(self):
+		if self.frmwk.serial_connection is not None:
+			self.frmwk.serial_disconnect()
+		for name, simulator in self.simulators:
+			protocol_simulator.unregister(name)
+			simulator.close()
+
+	def _simulator_url(self):
+		# the tables between the mode status and device identification tables
+		# are missing so reading them fails
+		simulator = MeterSimulator(meter_tables())
+		name = "test-fleet-{0}".format(len(self.simulators))
+		protocol_simulator.register(name, simulator)
+		self.simulators.append((name, simulator))
+		return 'simulator://' + name
+
+	def test_enum_tables_reconnects_on_its_own_connection(self):
+		self.frmwk.options.set_option_value('SERIAL_CONNECTION', self._simulator_url())
+		self.frmwk.options.set_option_value('USE_COLOR', 'true')
+		self.frmwk.serial_connect()
+		self.frmwk.serial_login()
+		connection = self.frmwk.serial_connection
+
+		module = self.frmwk.modules['enum_tables']
+		module.options.set_option_value('LOWER', '0')
+		module.options.set_option_value('UPPER', '8')
+		targets = [termineter.fleet.FleetTarget(self._simulator_url()) for _ in range(3)]
+		results = termineter.fleet.FleetExecutor(self.frmwk, module, targets, max_workers=3, min_workers=3).run()
+
+		for result in results:
+			self.assertTrue(result.success, msg=repr(result.error))
+			self.assertIn('Found 4 tables in range 0-8.', result.output)
+			self.assertNotIn('\x1b[', result.output)
+		# the framework's connection was neither replaced nor closed
+		self.assertIs(self.frmwk.serial_connection, connection)
+		self.assertTrue(self.frmwk.is_serial_connected())
+		self.assertTrue(connection.serial_h.is_open)
+		self.assertEqual(connection.get_table_data(0)[:1], b'\x06')
+
+if __name__ == '__main__':
+	unittest.main()